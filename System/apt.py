@@ -1,10 +1,16 @@
 import discord
 from discord.ext import commands
-import json
-import aiosqlite
+from .terminal.config import CONFIG
+from .terminal.database import get_database
+from .terminal.migrations import migrate
 from .terminal.permissions import format_output, format_error, format_code_block
+from .terminal.commands import command, command_group, SUDO
 from .terminal.logger_manager import TerminalLogger
 
+command_group('apt', scope=SUDO, category='apt', usage='sudo apt <install|remove|list|search|update|show|help>',
+              description='APT package management', guild_only=True)
+
+
 class APT(commands.Cog):
     """APT Package Manager - Terminal Integration"""
 
@@ -12,13 +18,13 @@ class APT(commands.Cog):
         self.bot = bot
         self.config_path = "Data/apt_packages.json"
         self.db_path = "Data/apt.db"
-        self.config = self.load_config()
+        self.db = get_database(self.db_path)
         print("📦 APT Package Manager initialized")
 
-    def load_config(self):
-        """Load APT package configuration"""
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+    @property
+    def config(self):
+        """Current APT package configuration snapshot (read-only)"""
+        return CONFIG.get(self.config_path)
 
     @commands.Cog.listener()
     async def on_ready(self):
@@ -27,64 +33,11 @@ class APT(commands.Cog):
         print("✅ APT System ready!")
 
     async def setup_database(self):
-        """Initialize APT database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS installed_packages (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    user_id INTEGER NOT NULL,
-                    guild_id INTEGER NOT NULL,
-                    package_name TEXT NOT NULL,
-                    version TEXT NOT NULL,
-                    installed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    UNIQUE(user_id, guild_id, package_name)
-                )
-            """)
-
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS package_stats (
-                    package_name TEXT PRIMARY KEY,
-                    install_count INTEGER DEFAULT 0,
-                    last_installed DATETIME
-                )
-            """)
-
-            await db.commit()
-            print("✅ APT database initialized")
-
-    async def cmd_apt(self, discord_id: int, args: list, guild: discord.Guild) -> str:
-        """Main APT command router"""
-        if not guild:
-            return format_error("APT commands can only be used in a server")
-
-        if not args:
-            return format_error(
-                "Usage: apt <install|remove|list|search|update|show>\n"
-                "Type 'apt help' for more information"
-            )
-
-        subcommand = args[0].lower()
-        subargs = args[1:] if len(args) > 1 else []
-
-        if subcommand == 'install':
-            return await self.cmd_install(discord_id, subargs, guild)
-        elif subcommand == 'remove' or subcommand == 'uninstall':
-            return await self.cmd_remove(discord_id, subargs, guild)
-        elif subcommand == 'list':
-            return await self.cmd_list(discord_id, subargs, guild)
-        elif subcommand == 'search':
-            return await self.cmd_search(discord_id, subargs, guild)
-        elif subcommand == 'update':
-            return await self.cmd_update(discord_id, subargs, guild)
-        elif subcommand == 'show':
-            return await self.cmd_show(discord_id, subargs, guild)
-        elif subcommand == 'help':
-            return await self.cmd_help(discord_id, subargs, guild)
-        else:
-            return format_error(f"Unknown APT command: {subcommand}")
+        """Initialize APT database (runs pending migrations once)"""
+        await migrate(self.db_path)
 
+    @command('apt install', scope=SUDO, usage='sudo apt install <package_name>',
+             description='Install a package (grants channel/role access)', context=('guild',))
     async def cmd_install(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Install a package"""
         if not args:
@@ -135,7 +88,7 @@ class APT(commands.Cog):
                     pass
 
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             await db.execute("""
                 INSERT INTO installed_packages (user_id, guild_id, package_name, version)
                 VALUES (?, ?, ?, ?)
@@ -150,9 +103,7 @@ class APT(commands.Cog):
                     last_installed = CURRENT_TIMESTAMP
             """, (package_name,))
 
-            await db.commit()
 
-        
         TerminalLogger.log_system(
             f"APT: {member.name} installed package '{package_name}' v{package['version']}",
             level="INFO"
@@ -175,6 +126,8 @@ class APT(commands.Cog):
 
         return format_code_block("\n".join(output))
 
+    @command('apt remove', scope=SUDO, usage='sudo apt remove <package_name>',
+             description='Uninstall a package', aliases=('uninstall',), context=('guild',))
     async def cmd_remove(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Remove/uninstall a package"""
         if not args:
@@ -205,14 +158,12 @@ class APT(commands.Cog):
                     pass
 
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             await db.execute("""
                 DELETE FROM installed_packages
                 WHERE user_id = ? AND guild_id = ? AND package_name = ?
             """, (discord_id, guild.id, package_name))
-            await db.commit()
 
-        
         TerminalLogger.log_system(
             f"APT: {member.name} removed package '{package_name}'",
             level="INFO"
@@ -220,13 +171,15 @@ class APT(commands.Cog):
 
         return format_code_block(f"✅ Package '{package_name}' removed successfully")
 
+    @command('apt list', scope=SUDO, usage='sudo apt list [--installed]',
+             description='List installed or all packages', context=('guild',))
     async def cmd_list(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """List installed packages"""
         installed = '--installed' in args or len(args) == 0
 
         if installed:
             
-            async with aiosqlite.connect(self.db_path) as db:
+            async with self.db.read() as db:
                 cursor = await db.execute("""
                     SELECT package_name, version, installed_at FROM installed_packages
                     WHERE user_id = ? AND guild_id = ?
@@ -262,6 +215,8 @@ class APT(commands.Cog):
             
             return await self.cmd_search(discord_id, [], guild)
 
+    @command('apt search', scope=SUDO, usage='sudo apt search [term]',
+             description='Search for available packages', context=('guild',))
     async def cmd_search(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Search for packages"""
         search_term = args[0].lower() if args else None
@@ -309,6 +264,8 @@ class APT(commands.Cog):
 
         return format_code_block("\n".join(output))
 
+    @command('apt show', scope=SUDO, usage='sudo apt show <package_name>',
+             description='Show detailed package information', context=('guild',))
     async def cmd_show(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Show detailed package information"""
         if not args:
@@ -323,7 +280,7 @@ class APT(commands.Cog):
         installed = await self.is_installed(discord_id, guild.id, package_name)
 
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT install_count, last_installed FROM package_stats
                 WHERE package_name = ?
@@ -357,18 +314,25 @@ class APT(commands.Cog):
 
         return format_code_block("\n".join(output))
 
+    @command('apt update', scope=SUDO, usage='sudo apt update',
+             description='Update package list from repository', context=('guild',))
     async def cmd_update(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Update package list (reload config)"""
         try:
-            self.config = self.load_config()
+            previous = len(self.config['packages'])
+            if self.config_path not in await CONFIG.refresh(force=True):
+                return format_error(f"Failed to update package list: {self.config_path} could not be read, "
+                                    f"keeping the previous list ({previous} packages)")
 
             return format_code_block(
                 "✅ Package list updated\n"
-                f"Available packages: {len(self.config['packages'])}"
+                f"Available packages: {len(self.config['packages'])} (was {previous})"
             )
         except Exception as e:
             return format_error(f"Failed to update package list: {str(e)}")
 
+    @command('apt help', scope=SUDO, usage='sudo apt help',
+             description='Show detailed APT help', context=('guild',))
     async def cmd_help(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Show APT help"""
         help_text = """
@@ -402,7 +366,7 @@ NOTES:
 
     async def is_installed(self, user_id: int, guild_id: int, package_name: str) -> bool:
         """Check if package is installed for user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT id FROM installed_packages
                 WHERE user_id = ? AND guild_id = ? AND package_name = ?
@@ -411,7 +375,7 @@ NOTES:
 
     async def get_user_disk_usage(self, user_id: int, guild_id: int) -> int:
         """Calculate total disk usage for user's installed packages"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT package_name FROM installed_packages
                 WHERE user_id = ? AND guild_id = ?
@@ -427,7 +391,7 @@ NOTES:
 
     async def get_installed_count(self, user_id: int, guild_id: int) -> int:
         """Get count of installed packages for user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT COUNT(*) FROM installed_packages
                 WHERE user_id = ? AND guild_id = ?
@@ -2,6 +2,7 @@ import discord
 from discord.ext import commands
 from .terminal.mod_manager import ModerationManager
 from .terminal.permissions import format_output, format_error, format_code_block
+from .terminal.commands import command, ROOT
 from .terminal.logger_manager import TerminalLogger
 from datetime import datetime, timedelta
 
@@ -19,6 +20,8 @@ class Moderation(commands.Cog):
         await self.mod_manager.setup_database()
         print("✅ Moderation System ready!")
 
+    @command('warn', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root warn <@user|user_id> <reason>', description='Issue a warning to a user')
     async def cmd_warn(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Warn a user - Auto-actions at 3, 5, 10 warns"""
         if len(args) < 2:
@@ -43,12 +46,13 @@ class Moderation(commands.Cog):
             return format_error("Cannot warn yourself")
 
         
-        case_id = await self.mod_manager.create_case(
-            guild.id, user_id, discord_id, "WARN", reason
-        )
+        async with self.mod_manager.db.write():
+            case_id = await self.mod_manager.create_case(
+                guild.id, user_id, discord_id, "WARN", reason
+            )
 
-        
-        warn_count = await self.mod_manager.add_warning(guild.id, user_id)
+            
+            warn_count = await self.mod_manager.add_warning(guild.id, user_id)
 
         
         moderator = await guild.fetch_member(discord_id)
@@ -87,6 +91,8 @@ class Moderation(commands.Cog):
 
         return format_code_block("\n".join(output))
 
+    @command('kick', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root kick <@user|user_id> [reason]', description='Kick a user from the server')
     async def cmd_kick(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Kick a user from the guild"""
         if len(args) < 1:
@@ -144,6 +150,8 @@ class Moderation(commands.Cog):
             f"Reason: {reason}"
         )
 
+    @command('ban', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root ban <@user|user_id> [duration] [reason]', description='Ban a user (permanent or temporary)')
     async def cmd_ban(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Ban a user from the guild (permanent or temporary)"""
         if len(args) < 1:
@@ -225,6 +233,8 @@ class Moderation(commands.Cog):
             f"Reason: {reason}"
         )
 
+    @command('unban', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root unban <user_id> [reason]', description='Unban a user')
     async def cmd_unban(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Unban a user from the guild"""
         if len(args) < 1:
@@ -269,6 +279,8 @@ class Moderation(commands.Cog):
             f"Reason: {reason}"
         )
 
+    @command('timeout', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root timeout <@user|user_id> <duration> [reason]', description='Timeout a user (Discord native)')
     async def cmd_timeout(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Timeout a user (Discord native timeout)"""
         if len(args) < 2:
@@ -339,6 +351,8 @@ class Moderation(commands.Cog):
             f"Reason: {reason}"
         )
 
+    @command('untimeout', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root untimeout <@user|user_id> [reason]', description='Remove timeout from a user')
     async def cmd_untimeout(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Remove timeout from a user"""
         if len(args) < 1:
@@ -373,6 +387,8 @@ class Moderation(commands.Cog):
             f"Reason: {reason}"
         )
 
+    @command('delwarn', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root delwarn <@user|user_id>', description='Remove one warning from a user')
     async def cmd_delwarn(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Delete/remove a warning from a user"""
         if len(args) < 1:
@@ -383,15 +399,16 @@ class Moderation(commands.Cog):
             return format_error("Invalid user ID or mention")
 
         
-        success, new_count = await self.mod_manager.remove_warning(guild.id, user_id)
+        async with self.mod_manager.db.write():
+            success, new_count = await self.mod_manager.remove_warning(guild.id, user_id)
 
-        if not success:
-            return format_error("User has no warnings to remove")
+            if not success:
+                return format_error("User has no warnings to remove")
 
-        
-        case_id = await self.mod_manager.create_case(
-            guild.id, user_id, discord_id, "DELWARN", "Warning removed by admin"
-        )
+            
+            case_id = await self.mod_manager.create_case(
+                guild.id, user_id, discord_id, "DELWARN", "Warning removed by admin"
+            )
 
         return format_code_block(
             f"✅ Warning removed\n"
@@ -400,6 +417,8 @@ class Moderation(commands.Cog):
             f"Remaining Warnings: {new_count}"
         )
 
+    @command('modlog', scope=ROOT, category='moderation', context=('guild',), guild_only=True,
+             usage='root modlog <@user|user_id>', description='View moderation history for a user')
     async def cmd_modlog(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """View moderation history for a user"""
         if len(args) < 1:
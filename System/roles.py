@@ -2,9 +2,14 @@ import discord
 from discord.ext import commands
 from .terminal.role_manager import RoleManager
 from .terminal.permissions import format_output, format_error, format_code_block
+from .terminal.commands import command, command_group, ROOT
 from .terminal.role_modals import RoleCreateModal, RoleEditModal, RoleGiveModal, RoleRemoveModal
 from .terminal.logger_manager import TerminalLogger
 
+command_group('role', scope=ROOT, category='roles', usage='root role <create|delete|give|remove|list|info|edit>',
+              description='Discord role management', guild_only=True)
+
+
 class Roles(commands.Cog):
     """Role Management System - Terminal Integration"""
 
@@ -17,37 +22,8 @@ class Roles(commands.Cog):
     async def on_ready(self):
         print("✅ Role Management System ready!")
 
-    async def cmd_role(self, discord_id: int, args: list, guild: discord.Guild, channel=None) -> str:
-        """Main role command router"""
-        if not guild:
-            return format_error("Role commands can only be used in a server")
-
-        if not args:
-            return format_error(
-                "Usage: sudo role <create|delete|give|remove|list|info|edit>\n"
-                "Type 'help' for detailed role command information"
-            )
-
-        subcommand = args[0].lower()
-        subargs = args[1:] if len(args) > 1 else []
-
-        if subcommand == 'create':
-            return await self.cmd_role_create(discord_id, subargs, guild, channel)
-        elif subcommand == 'delete' or subcommand == 'del':
-            return await self.cmd_role_delete(discord_id, subargs, guild)
-        elif subcommand == 'give' or subcommand == 'add':
-            return await self.cmd_role_give(discord_id, subargs, guild, channel)
-        elif subcommand == 'remove' or subcommand == 'rem':
-            return await self.cmd_role_remove(discord_id, subargs, guild, channel)
-        elif subcommand == 'list' or subcommand == 'ls':
-            return await self.cmd_role_list(discord_id, subargs, guild)
-        elif subcommand == 'info':
-            return await self.cmd_role_info(discord_id, subargs, guild)
-        elif subcommand == 'edit':
-            return await self.cmd_role_edit(discord_id, subargs, guild, channel)
-        else:
-            return format_error(f"Unknown role subcommand: {subcommand}")
-
+    @command('role create', scope=ROOT, usage='root role create',
+             description='Create a new role (opens modal)', context=('guild', 'channel'))
     async def cmd_role_create(self, discord_id: int, args: list, guild: discord.Guild, channel=None) -> str:
         """Create a new role"""
         if not channel:
@@ -72,6 +48,8 @@ class Roles(commands.Cog):
         )
         return None  
 
+    @command('role delete', scope=ROOT, usage='root role delete <@role|role_id>',
+             description='Delete a role', aliases=('del',), context=('guild',))
     async def cmd_role_delete(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Delete a role"""
         if not args:
@@ -106,6 +84,8 @@ class Roles(commands.Cog):
         else:
             return format_error(message)
 
+    @command('role give', scope=ROOT, usage='root role give',
+             description='Give a role to a user (opens modal)', aliases=('add',), context=('guild', 'channel'))
     async def cmd_role_give(self, discord_id: int, args: list, guild: discord.Guild, channel=None) -> str:
         """Give a role to a user"""
         if not channel:
@@ -130,6 +110,8 @@ class Roles(commands.Cog):
         )
         return None  
 
+    @command('role remove', scope=ROOT, usage='root role remove',
+             description='Remove a role from a user (opens modal)', aliases=('rem',), context=('guild', 'channel'))
     async def cmd_role_remove(self, discord_id: int, args: list, guild: discord.Guild, channel=None) -> str:
         """Remove a role from a user"""
         if not channel:
@@ -154,6 +136,8 @@ class Roles(commands.Cog):
         )
         return None  
 
+    @command('role list', scope=ROOT, usage='root role list [-a]',
+             description='List all roles in the server', aliases=('ls',), context=('guild',))
     async def cmd_role_list(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """List all roles in the guild"""
         show_managed = '-a' in args or '--all' in args
@@ -187,6 +171,8 @@ class Roles(commands.Cog):
 
         return format_code_block("\n".join(output))
 
+    @command('role info', scope=ROOT, usage='root role info <@role|role_id>',
+             description='Show detailed role information', context=('guild',))
     async def cmd_role_info(self, discord_id: int, args: list, guild: discord.Guild) -> str:
         """Show detailed information about a role"""
         if not args:
@@ -206,6 +192,8 @@ class Roles(commands.Cog):
         info = self.role_manager.get_role_info(role)
         return format_code_block(info)
 
+    @command('role edit', scope=ROOT, usage='root role edit <@role|role_id>',
+             description='Edit role properties (opens modal)', context=('guild', 'channel'))
     async def cmd_role_edit(self, discord_id: int, args: list, guild: discord.Guild, channel=None) -> str:
         """Edit an existing role"""
         if not channel:
@@ -1,5 +1,9 @@
+import discord
 from .permissions import format_output, format_error, format_code_block
-import aiosqlite
+from .commands import command, ROOT
+from .hashing import HasherBusy
+from .archive import FilesystemArchive
+from .transfer import FileTransfer, TransferError
 
 class AdminCommands:
     """Admin-only commands"""
@@ -9,7 +13,11 @@ class AdminCommands:
         self.fs = filesystem
         self.pm = permission_manager
         self.bot = bot
+        self.archive = FilesystemArchive(filesystem)
+        self.transfer = FileTransfer(filesystem)
 
+    @command('useradd', scope=ROOT, category='admin', usage='root useradd <discord_id> [role]',
+             description='Promote existing terminal user to admin or change role')
     async def cmd_useradd(self, discord_id: int, args: list) -> str:
         """Promote existing user to admin/change role (does NOT create new users)"""
         session = self.um.get_session(discord_id)
@@ -30,7 +38,7 @@ class AdminCommands:
                 return format_error("Role must be 'user' or 'admin'")
 
             
-            async with aiosqlite.connect(self.um.db_path) as db:
+            async with self.um.db.write() as db:
                 cursor = await db.execute("SELECT username, role FROM users WHERE discord_id = ?", (target_discord_id,))
                 result = await cursor.fetchone()
 
@@ -55,11 +63,10 @@ class AdminCommands:
 
                 
                 await db.execute("UPDATE users SET role = ? WHERE discord_id = ?", (role, target_discord_id))
-                await db.commit()
 
-                
                 if target_discord_id in self.um.sessions:
                     self.um.sessions[target_discord_id]['role'] = role
+                self.um.revoke_sudo(target_discord_id)
 
                 return format_output(
                     f"✅ User role updated successfully\n"
@@ -74,6 +81,8 @@ class AdminCommands:
         except Exception as e:
             return format_error(f"Failed to update user role: {str(e)}")
 
+    @command('userdel', scope=ROOT, category='admin', usage='root userdel <discord_id>',
+             description='Remove root/admin rights from a user (demote to regular user)')
     async def cmd_userdel(self, discord_id: int, args: list) -> str:
         """Remove root/admin rights from user (does NOT delete the user account)"""
         session = self.um.get_session(discord_id)
@@ -95,7 +104,7 @@ class AdminCommands:
         if target_discord_id == discord_id:
             return format_error("Cannot remove your own admin rights")
 
-        async with aiosqlite.connect(self.um.db_path) as db:
+        async with self.um.db.write() as db:
             
             cursor = await db.execute("SELECT username, role FROM users WHERE discord_id = ?", (target_discord_id,))
             result = await cursor.fetchone()
@@ -121,11 +130,10 @@ class AdminCommands:
 
             
             await db.execute("UPDATE users SET role = 'user' WHERE discord_id = ?", (target_discord_id,))
-            await db.commit()
 
-            
             if target_discord_id in self.um.sessions:
                 self.um.sessions[target_discord_id]['role'] = 'user'
+            self.um.revoke_sudo(target_discord_id)
 
             return format_output(
                 f"✅ Admin rights removed successfully\n"
@@ -135,6 +143,7 @@ class AdminCommands:
                 f"New Role: user"
             )
 
+    @command('usermod', scope=ROOT, category='admin', usage='root usermod <username> <role>', description='Modify user role (user/admin)')
     async def cmd_usermod(self, discord_id: int, args: list) -> str:
         """Modify user account (admin only)"""
         session = self.um.get_session(discord_id)
@@ -155,7 +164,7 @@ class AdminCommands:
             if value not in ['user', 'admin']:
                 return format_error("Role must be 'user' or 'admin'")
 
-            async with aiosqlite.connect(self.um.db_path) as db:
+            async with self.um.db.write() as db:
                 cursor = await db.execute("SELECT discord_id FROM users WHERE username = ?", (username,))
                 result = await cursor.fetchone()
 
@@ -163,17 +172,17 @@ class AdminCommands:
                     return format_error(f"User '{username}' not found")
 
                 await db.execute("UPDATE users SET role = ? WHERE username = ?", (value, username))
-                await db.commit()
 
-                
                 target_discord_id = result[0]
                 if target_discord_id in self.um.sessions:
                     self.um.sessions[target_discord_id]['role'] = value
+                self.um.revoke_sudo(target_discord_id)
 
                 return format_output(f"User '{username}' role changed to '{value}'")
         else:
             return format_error(f"Unknown field: {field}")
 
+    @command('passwd', scope=ROOT, category='admin', usage='root passwd <username> <new_password>', description="Set another user's password")
     async def cmd_passwd_admin(self, discord_id: int, args: list) -> str:
         """Change user password (admin only)"""
         session = self.um.get_session(discord_id)
@@ -193,19 +202,24 @@ class AdminCommands:
         if len(new_password) < min_length:
             return format_error(f"Password must be at least {min_length} characters long")
 
-        async with aiosqlite.connect(self.um.db_path) as db:
+        try:
+            new_hash = await self.um.hash_password(new_password)
+        except HasherBusy as e:
+            return format_error(str(e))
+
+        async with self.um.db.write() as db:
             cursor = await db.execute("SELECT discord_id FROM users WHERE username = ?", (username,))
             result = await cursor.fetchone()
 
             if not result:
                 return format_error(f"User '{username}' not found")
 
-            new_hash = self.um.hash_password(new_password)
             await db.execute("UPDATE users SET password_hash = ? WHERE username = ?", (new_hash, username))
-            await db.commit()
+            self.um.revoke_sudo(result[0])
 
             return format_output(f"Password for '{username}' changed successfully")
 
+    @command('users', scope=ROOT, category='admin', usage='root users', description='List all registered users')
     async def cmd_users(self, discord_id: int, args: list) -> str:
         """List all users (admin only)"""
         session = self.um.get_session(discord_id)
@@ -215,7 +229,7 @@ class AdminCommands:
         if session['role'] != 'admin':
             return format_error("Permission denied. Admin privileges required.")
 
-        async with aiosqlite.connect(self.um.db_path) as db:
+        async with self.um.db.read() as db:
             cursor = await db.execute("""
                 SELECT username, role, created_at, last_login
                 FROM users
@@ -237,6 +251,7 @@ class AdminCommands:
 
             return format_code_block('\n'.join(output))
 
+    @command('logs', scope=ROOT, category='admin', usage='root logs [limit]', description='View system logs')
     async def cmd_logs(self, discord_id: int, args: list) -> str:
         """View login history (admin only)"""
         session = self.um.get_session(discord_id)
@@ -250,7 +265,7 @@ class AdminCommands:
         if args and args[0].isdigit():
             limit = int(args[0])
 
-        async with aiosqlite.connect(self.um.db_path) as db:
+        async with self.um.db.read() as db:
             cursor = await db.execute("""
                 SELECT username, action, timestamp, success
                 FROM login_history
@@ -272,3 +287,146 @@ class AdminCommands:
                 output.append(f"{username:<20} {action:<12} {time_str:<20} {status:<10}")
 
             return format_code_block('\n'.join(output))
+
+    @command('hashing', scope=ROOT, category='admin', usage='root hashing',
+             description='Show password hashing pool load and latency')
+    async def cmd_hashing(self, discord_id: int, args: list) -> str:
+        """Password hashing metrics (admin only)"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        if session['role'] != 'admin':
+            return format_error("Permission denied. Admin privileges required.")
+
+        stats = self.um.hasher.report()
+        return format_code_block('\n'.join([
+            "PASSWORD HASHING",
+            "=" * 40,
+            f"Workers:       {stats['workers']} (queue limit {stats['max_queue']})",
+            f"In progress:   {stats['pending']}",
+            f"Hashes:        {stats['hashes']}",
+            f"Verifications: {stats['verifies']}",
+            f"Rejected:      {stats['rejected']}",
+            f"Latency:       avg {stats['avg_ms']:.0f} ms, p95 {stats['p95_ms']:.0f} ms, max {stats['max_ms']:.0f} ms",
+            f"Queue wait:    avg {stats['avg_wait_ms']:.0f} ms",
+            "=" * 40
+        ]))
+
+    @command('fs', scope=ROOT, category='admin', usage='root fs <reconcile [discord_id]|cache|export <user>|import [discord_id]>',
+             description="Filesystem maintenance: recompute usage counters, show cache statistics, back up or restore a user's files",
+             context=('channel_id', 'attachments'))
+    async def cmd_fs(self, discord_id: int, args: list, channel_id: int = None, attachments: list = None) -> str:
+        """Filesystem maintenance (admin only)"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        if session['role'] != 'admin':
+            return format_error("Permission denied. Admin privileges required.")
+
+        if args and args[0] == 'cache':
+            stats = self.fs.cache.report()
+            chunks = self.fs.chunk_cache.report()
+            return format_code_block('\n'.join([
+                "FILESYSTEM METADATA CACHE",
+                "=" * 40,
+                f"Hit ratio:     {stats['hit_ratio'] * 100:.1f}% ({stats['hits']} hits, {stats['misses']} misses)",
+                f"Entries:       {stats['entries']} ({stats['users']} users)",
+                f"Memory:        {stats['bytes']:,} / {stats['max_bytes']:,} bytes",
+                f"Stores:        {stats['stores']}",
+                f"Evictions:     {stats['evictions']}",
+                f"Invalidations: {stats['invalidations']}",
+                "",
+                "DECOMPRESSED CHUNK CACHE",
+                "=" * 40,
+                f"Hit ratio:     {chunks['hit_ratio'] * 100:.1f}% ({chunks['hits']} hits, {chunks['misses']} misses)",
+                f"Entries:       {chunks['entries']}",
+                f"Memory:        {chunks['bytes']:,} / {chunks['max_bytes']:,} bytes",
+                "=" * 40
+            ]))
+
+        if args and args[0] == 'export':
+            return await self._fs_export(args[1:], channel_id)
+
+        if args and args[0] == 'import':
+            return await self._fs_import(args[1:], attachments)
+
+        if not args or args[0] != 'reconcile':
+            return format_error("Usage: root fs <reconcile [discord_id]|cache|export <user>|import [discord_id]>")
+
+        target_discord_id = None
+        if len(args) > 1:
+            try:
+                target_discord_id = int(args[1])
+            except ValueError:
+                return format_error("Invalid Discord ID - must be a number")
+
+        drifted = await self.fs.reconcile_usage(target_discord_id)
+        if not drifted:
+            return format_output("Usage counters are consistent, nothing to fix")
+
+        output = [f"✅ Reconciled usage counters for {len(drifted)} user(s)"]
+        output.append(f"{'DISCORD ID':<20} {'FILES':<16} {'DIRECTORIES':<16} {'BYTES':<24}")
+        output.append("─" * 76)
+        for owner_id, old, new in drifted:
+            files, directories, size = (f"{o} → {n}" for o, n in zip(old, new))
+            output.append(f"{owner_id:<20} {files:<16} {directories:<16} {size:<24}")
+
+        return format_code_block('\n'.join(output))
+
+    async def _resolve_user(self, name: str):
+        """Discord ID for a username or numeric Discord ID, or None"""
+        async with self.um.db.read() as db:
+            cursor = await db.execute("""
+                SELECT discord_id FROM users WHERE username = ? OR CAST(discord_id AS TEXT) = ?
+            """, (name, name))
+            result = await cursor.fetchone()
+        return result[0] if result else None
+
+    async def _fs_export(self, args: list, channel_id: int) -> str:
+        """Send one user's filesystem layer as a tar.gz attachment"""
+        if not args:
+            return format_error("Usage: root fs export <username|discord_id>")
+
+        target_discord_id = await self._resolve_user(args[0])
+        if target_discord_id is None:
+            return format_error(f"User '{args[0]}' not found")
+
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        if channel is None:
+            return format_error("fs export requires channel context")
+
+        archive, count = await self.archive.export_user(target_discord_id)
+        with archive:
+            size = archive.seek(0, 2)
+            if size > self.transfer.download_max_bytes:
+                return format_error(f"Archive too large to send: {size:,} bytes (limit is {self.transfer.download_max_bytes:,})")
+
+            archive.seek(0)
+            await channel.send(file=discord.File(archive, filename=f"fs-{target_discord_id}.tar.gz"))
+
+        return format_output(f"Exported {count} entries for {target_discord_id} ({size:,} bytes)")
+
+    async def _fs_import(self, args: list, attachments: list) -> str:
+        """Replace a user's filesystem layer with an attached archive"""
+        if not attachments:
+            return format_error("Usage: root fs import [discord_id] (with an archive attached)")
+
+        target_discord_id = None
+        if args:
+            target_discord_id = await self._resolve_user(args[0])
+            if target_discord_id is None:
+                return format_error(f"User '{args[0]}' not found")
+
+        max_bytes = self.fs.config['settings'].get('archive_max_bytes', 104857600)
+        try:
+            archive = await self.transfer.spool_attachment(attachments[0], max_bytes)
+        except TransferError as e:
+            return format_error(str(e))
+
+        with archive:
+            archive.seek(0)
+            success, message = await self.archive.import_user(archive, target_discord_id)
+
+        return format_output(message) if success else format_error(message)
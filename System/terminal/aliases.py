@@ -0,0 +1,63 @@
+"""
+Command aliases compiled into a trie over whole leading words.
+
+An alias only matches complete words at the start of a line ('ll' expands
+`ll docs` but not `llama`), and the longest alias wins. A line whose first
+word starts no alias costs one dict lookup, which matters because every
+chat message in every channel is checked.
+"""
+from .shell import leading_word
+
+
+class _Node:
+    __slots__ = ('children', 'expansion')
+
+    def __init__(self):
+        self.children = {}
+        self.expansion = None
+
+
+class AliasTrie:
+    """Aliases (alias -> replacement text) by leading words"""
+
+    def __init__(self, aliases: dict = None):
+        self.source = aliases
+        self.root = _Node()
+        for alias, expansion in (aliases or {}).items():
+            words = alias.split()
+            if not words:
+                continue
+            node = self.root
+            for word in words:
+                node = node.children.setdefault(word, _Node())
+            node.expansion = expansion
+
+    def starts_alias(self, word: str) -> bool:
+        """Whether an alias begins with this word"""
+        return word in self.root.children
+
+    def expand(self, line: str, word: str = None, end: int = None) -> str:
+        """
+        line with its leading alias replaced, or line itself if none matches.
+        word and end are leading_word(line) when the caller already has them.
+        """
+        if word is None:
+            word, end = leading_word(line)
+
+        node = self.root.children.get(word)
+        if node is None:
+            return line
+
+        match = (node.expansion, end) if node.expansion is not None else None
+        while node.children:
+            word, end = leading_word(line, end)
+            node = node.children.get(word)
+            if node is None:
+                break
+            if node.expansion is not None:
+                match = (node.expansion, end)
+
+        if match is None:
+            return line
+        expansion, end = match
+        return expansion + line[end:]
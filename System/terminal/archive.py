@@ -0,0 +1,185 @@
+"""
+Per-user filesystem backups as tar archives.
+
+An archive holds one user's own layer (not the shared base layer), written row
+by row as a gzip-compressed pax tar. A global pax header records the owner;
+per-entry pax headers keep what tar has no field for: exact timestamps, the
+executable flag, entry types other than plain files (such as `app`) and
+whiteouts (paths the user deleted from the base layer).
+Everything is streamed through spooled temp files, so memory stays bounded
+regardless of the size of the tree. An archive is decompressed in a worker
+thread before the import opens its write unit.
+"""
+import asyncio
+import bz2
+import gzip
+import lzma
+import shutil
+import tarfile
+import tempfile
+from datetime import datetime
+
+SPOOL_MEMORY = 1048576
+PERMISSION_BITS = 'rwxrwxrwx'
+DECOMPRESSORS = ((b'\x1f\x8b', gzip.open), (b'BZh', bz2.open), (b'\xfd7zXZ', lzma.open))
+
+
+class ArchiveError(Exception):
+    """An archive that cannot be written or read"""
+
+
+def permissions_to_mode(permissions: str) -> int:
+    """'rw-r--r--' -> 0o644"""
+    mode = 0
+    for flag in (permissions or '').ljust(9, '-')[:9]:
+        mode = (mode << 1) | (flag != '-')
+    return mode
+
+
+def mode_to_permissions(mode: int) -> str:
+    """0o644 -> 'rw-r--r--'"""
+    return ''.join(flag if mode & (1 << (8 - i)) else '-' for i, flag in enumerate(PERMISSION_BITS))
+
+
+def _decompress(fileobj):
+    """Uncompressed copy of an archive in a spooled temp file (runs in a worker thread)"""
+    magic = fileobj.read(6)
+    fileobj.seek(0)
+    source = fileobj
+    for prefix, opener in DECOMPRESSORS:
+        if magic.startswith(prefix):
+            source = opener(fileobj)
+            break
+
+    spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+    try:
+        shutil.copyfileobj(source, spool)
+    except BaseException:
+        spool.close()
+        raise
+    spool.seek(0)
+    return spool
+
+
+def _timestamp(value) -> float:
+    """Epoch seconds of a stored timestamp (0 if it cannot be parsed)"""
+    try:
+        return datetime.fromisoformat(str(value)).timestamp()
+    except ValueError:
+        return 0
+
+
+class FilesystemArchive:
+    """Streams a user's layer into a tar archive and back"""
+
+    def __init__(self, filesystem):
+        self.fs = filesystem
+
+    async def export_user(self, owner_id: int):
+        """
+        Write the user's layer into a spooled gzip tar.
+        Returns: (file object positioned at 0, number of entries)
+        """
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        count = 0
+
+        try:
+            with tarfile.open(fileobj=spool, mode='w|gz', format=tarfile.PAX_FORMAT,
+                              pax_headers={'TERMINAL.owner_id': str(owner_id)}) as tar:
+                async for path, info, chunks in self.fs.iter_layer(owner_id):
+                    member = tarfile.TarInfo(path.lstrip('/'))
+                    member.mode = permissions_to_mode(info.permissions)
+                    member.mtime = _timestamp(info.modified_at)
+                    member.pax_headers = {
+                        'TERMINAL.created_at': str(info.created_at),
+                        'TERMINAL.modified_at': str(info.modified_at)
+                    }
+
+                    if info.type == 'directory':
+                        member.type = tarfile.DIRTYPE
+                        tar.addfile(member)
+                    elif info.type == 'whiteout':
+                        member.pax_headers['TERMINAL.whiteout'] = '1'
+                        tar.addfile(member)
+                    else:
+                        if info.executable:
+                            member.pax_headers['TERMINAL.executable'] = '1'
+                        if info.type != 'file':
+                            member.pax_headers['TERMINAL.type'] = info.type
+
+                        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY) as content:
+                            async for chunk in chunks:
+                                content.write(chunk.encode('utf-8'))
+                            member.size = content.tell()
+                            content.seek(0)
+                            tar.addfile(member, content)
+                    count += 1
+        except BaseException:
+            spool.close()
+            raise
+
+        spool.seek(0)
+        return spool, count
+
+    async def import_user(self, fileobj, owner_id: int = None) -> tuple[bool, str]:
+        """
+        Replace a user's layer with the contents of a tar archive in one transaction.
+        owner_id defaults to the owner recorded in the archive.
+        """
+        try:
+            spool = await asyncio.to_thread(_decompress, fileobj)
+        except (OSError, EOFError, lzma.LZMAError) as e:
+            return False, f"Not a valid archive: {e}"
+
+        with spool:
+            try:
+                tar = tarfile.open(fileobj=spool, mode='r|')
+            except tarfile.TarError as e:
+                return False, f"Not a valid archive: {e}"
+
+            with tar:
+                return await self._import(tar, owner_id)
+
+    async def _import(self, tar: tarfile.TarFile, owner_id: int = None) -> tuple[bool, str]:
+        """import_user() on an opened, uncompressed tar stream"""
+        try:
+            first = tar.next()
+        except tarfile.TarError as e:
+            return False, f"Not a valid archive: {e}"
+        if first is None:
+            return False, "Archive is empty"
+
+        if owner_id is None:
+            recorded = tar.pax_headers.get('TERMINAL.owner_id')
+            if recorded is None or not recorded.isdigit():
+                return False, "Archive does not record its owner - pass a Discord ID"
+            owner_id = int(recorded)
+
+        try:
+            success, message = await self.fs.import_layer(owner_id, self._entries(tar, first))
+        except (tarfile.TarError, ArchiveError) as e:
+            return False, f"Import aborted: {e}"
+
+        return success, f"{message} for {owner_id}" if success else message
+
+    def _entries(self, tar: tarfile.TarFile, member: tarfile.TarInfo):
+        """Turn tar members (starting with the already read first one) into import_layer() entries"""
+        while member is not None:
+            headers = member.pax_headers
+            path = '/' + member.name.strip('/')
+            modified_at = headers.get('TERMINAL.modified_at') or datetime.fromtimestamp(member.mtime)
+            created_at = headers.get('TERMINAL.created_at') or modified_at
+            permissions = mode_to_permissions(member.mode)
+
+            if headers.get('TERMINAL.whiteout') == '1':
+                yield path, 'whiteout', '---------', 0, created_at, modified_at, None
+            elif member.isdir():
+                yield path, 'directory', permissions, 0, created_at, modified_at, None
+            elif member.isfile():
+                executable = headers.get('TERMINAL.executable') == '1'
+                file_type = headers.get('TERMINAL.type', 'file')
+                yield path, file_type, permissions, executable, created_at, modified_at, tar.extractfile(member)
+            else:
+                raise ArchiveError(f"unsupported entry type for {path}")
+
+            member = tar.next()
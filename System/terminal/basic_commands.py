@@ -1,6 +1,13 @@
+import math
+import re
 from datetime import datetime
 from .permissions import format_output, format_error, format_code_block
+from .commands import command, SUDO, PUBLIC
 from .help_manager import HelpManager
+from .pager import PagerView
+from .transfer import FileTransfer, TransferError
+from .shell import GREP_USAGE, ShellError, parse_grep_args
+from .scripts import DeferredChannel
 
 class BasicCommands:
     """Basic filesystem commands"""
@@ -9,7 +16,9 @@ class BasicCommands:
         self.fs = filesystem
         self.um = user_manager
         self.help_manager = HelpManager()
+        self.transfer = FileTransfer(filesystem)
 
+    @command('ls', category='filesystem', usage='ls [-l] [-a] [path]', description='List directory contents')
     async def cmd_ls(self, discord_id: int, args: list) -> str:
         """List directory contents"""
         session = self.um.get_session(discord_id)
@@ -63,6 +72,7 @@ class BasicCommands:
                     output.append(name)
             return format_code_block('  '.join(output))
 
+    @command('cd', category='filesystem', usage='cd <directory>', description='Change current directory')
     async def cmd_cd(self, discord_id: int, args: list) -> str:
         """Change directory"""
         session = self.um.get_session(discord_id)
@@ -81,10 +91,11 @@ class BasicCommands:
         new_path = self.fs.resolve_path(current_dir, target_path)
 
         
-        if not await self.fs.path_exists(discord_id, new_path):
+        info = await self.fs.stat(discord_id, new_path)
+        if info is None:
             return format_error(f"No such directory: {new_path}")
 
-        if not await self.fs.is_directory(discord_id, new_path):
+        if not info.is_directory:
             return format_error(f"Not a directory: {new_path}")
 
         
@@ -92,6 +103,7 @@ class BasicCommands:
 
         return format_output(f"Changed directory to: {new_path}")
 
+    @command('pwd', category='filesystem', description='Print working directory (show current location)')
     async def cmd_pwd(self, discord_id: int, args: list) -> str:
         """Print working directory"""
         session = self.um.get_session(discord_id)
@@ -101,6 +113,7 @@ class BasicCommands:
         current_dir = session['current_dir']
         return format_code_block(current_dir)
 
+    @command('mkdir', category='filesystem', usage='mkdir <directory>', description='Create a new directory')
     async def cmd_mkdir(self, discord_id: int, args: list) -> str:
         """Create directory"""
         session = self.um.get_session(discord_id)
@@ -120,6 +133,7 @@ class BasicCommands:
         else:
             return format_error(message)
 
+    @command('touch', category='filesystem', usage='touch <filename>', description='Create an empty file')
     async def cmd_touch(self, discord_id: int, args: list) -> str:
         """Create empty file"""
         session = self.um.get_session(discord_id)
@@ -139,8 +153,10 @@ class BasicCommands:
         else:
             return format_error(message)
 
-    async def cmd_cat(self, discord_id: int, args: list) -> str:
-        """Display file contents"""
+    @command('cat', category='filesystem', usage='cat <filename>', description='Display file contents (large files open in the pager)',
+             context=('channel',))
+    async def cmd_cat(self, discord_id: int, args: list, channel=None) -> str:
+        """Display file contents (large files open in the pager)"""
         session = self.um.get_session(discord_id)
         if not session:
             return format_error("Not logged in")
@@ -150,8 +166,10 @@ class BasicCommands:
 
         current_dir = session['current_dir']
         target_path = self.fs.resolve_path(current_dir, args[0])
+        limit = self.fs.config['settings'].get('cat_inline_max_chars', 1800)
 
-        success, content = await self.fs.read_file(discord_id, target_path)
+        
+        success, content = await self.fs.read_range(discord_id, target_path, 0, limit + 1)
 
         if not success:
             return format_error(content)
@@ -159,8 +177,152 @@ class BasicCommands:
         if not content:
             return format_code_block("(empty file)")
 
-        return format_code_block(content)
+        if len(content) <= limit:
+            return format_code_block(content)
+
+        if channel is not None:
+            return await self._open_pager(discord_id, target_path, channel)
+
+        return format_code_block(content[:limit]) + f"\n... truncated, use 'less {args[0]}' to page through the file"
+
+    @command('head', category='filesystem', usage='head [-n lines] <filename>', description='Display the first lines of a file (default 10)')
+    async def cmd_head(self, discord_id: int, args: list) -> str:
+        """Display the first lines of a file"""
+        return await self._show_lines(discord_id, args, 'head')
+
+    @command('tail', category='filesystem', usage='tail [-n lines] <filename>', description='Display the last lines of a file (default 10)')
+    async def cmd_tail(self, discord_id: int, args: list) -> str:
+        """Display the last lines of a file"""
+        return await self._show_lines(discord_id, args, 'tail')
+
+    async def _show_lines(self, discord_id: int, args: list, command: str) -> str:
+        """Shared head/tail: only the chunks holding the requested lines are read"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        count = 10
+        target = None
+        i = 0
+        while i < len(args):
+            if args[i] == '-n' and i + 1 < len(args) and args[i + 1].isdigit():
+                count = int(args[i + 1])
+                i += 1
+            elif args[i].startswith('-') and args[i][1:].isdigit():
+                count = int(args[i][1:])
+            elif target is None:
+                target = args[i]
+            i += 1
+
+        if target is None:
+            return format_error(f"Usage: {command} [-n lines] <filename>")
+
+        target_path = self.fs.resolve_path(session['current_dir'], target)
+        start = 0 if command == 'head' else -count
+
+        success, result = await self.fs.read_lines(discord_id, target_path, start, count)
+        if not success:
+            return format_error(result)
+
+        lines = result[0]
+        if not lines:
+            return format_code_block("(empty file)")
+
+        limit = self.fs.config['settings'].get('cat_inline_max_chars', 1800)
+        text = '\n'.join(lines)
+        if len(text) > limit:
+            return format_code_block(text[:limit]) + f"\n... truncated, use 'less {target}' to page through the file"
+
+        return format_code_block(text)
+
+    @command('less', category='filesystem', usage='less <filename>', description='Page through a file with buttons', context=('channel',))
+    async def cmd_less(self, discord_id: int, args: list, channel=None) -> str:
+        """Page through a file with buttons"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        if not args:
+            return format_error("Usage: less <filename>")
+
+        if channel is None:
+            return format_error("less requires channel context")
+
+        target_path = self.fs.resolve_path(session['current_dir'], args[0])
+        return await self._open_pager(discord_id, target_path, channel)
+
+    async def _open_pager(self, discord_id: int, path: str, channel) -> str:
+        """Send a PagerView for a file; each button press reads one page of lines"""
+        settings = self.fs.config['settings']
+        page_lines = settings.get('pager_page_lines', 20)
+        line_width = settings.get('pager_line_width', 90)
+
+        info = await self.fs.stat(discord_id, path)
+        if info is None:
+            return format_error(f"File not found: {path}")
+        if info.is_directory:
+            return format_error(f"{path} is a directory")
+
+        async def fetch_page(page: int) -> str:
+            success, result = await self.fs.read_lines(discord_id, path, page * page_lines, page_lines)
+            if not success:
+                return result
+            return '\n'.join(line if len(line) <= line_width else line[:line_width - 1] + '…' for line in result[0])
+
+        view = PagerView(discord_id, path, fetch_page, math.ceil(info.lines / page_lines),
+                         timeout=settings.get('pager_timeout_seconds', 300))
+        await channel.send(await view.render(), view=view)
+        return None
+
+    @command('upload', category='filesystem', usage='upload [path]', description='Store the attached file in the filesystem',
+             context=('message',))
+    async def cmd_upload(self, discord_id: int, args: list, message=None) -> str:
+        """Store an attached file in the filesystem"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        if message is None or not message.attachments:
+            return format_error("Usage: upload [path] (with a file attached)")
+
+        attachment = message.attachments[0]
+        name = attachment.filename[:-3] if attachment.filename.lower().endswith('.gz') else attachment.filename
+        target_path = self.fs.resolve_path(session['current_dir'], args[0] if args else name)
+
+        
+        if await self.fs.is_directory(discord_id, target_path):
+            target_path = self.fs.resolve_path(target_path, name)
+
+        success, result = await self.transfer.receive(discord_id, target_path, attachment)
+        return format_output(result) if success else format_error(result)
+
+    @command('download', category='filesystem', usage='download [-z] <filename>',
+             description='Send a file as an attachment (-z gzipped; files too large to attach are always gzipped)',
+             context=('channel',))
+    async def cmd_download(self, discord_id: int, args: list, channel=None) -> str:
+        """Send a file as an attachment"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        compress = '-z' in args
+        files = [arg for arg in args if arg != '-z']
+        if len(files) != 1:
+            return format_error("Usage: download [-z] <filename>")
+
+        if channel is None:
+            return format_error("download requires channel context")
 
+        target_path = self.fs.resolve_path(session['current_dir'], files[0])
+        try:
+            file = await self.transfer.send(discord_id, target_path, compress)
+        except TransferError as e:
+            return format_error(str(e))
+
+        await channel.send(f"📎 `{target_path}`", file=file)
+        return None
+
+    @command('rm', category='filesystem', usage='rm [-r] <file|directory>', description='Remove file or directory')
     async def cmd_rm(self, discord_id: int, args: list) -> str:
         """Remove file or directory"""
         session = self.um.get_session(discord_id)
@@ -196,44 +358,17 @@ class BasicCommands:
         else:
             return format_error(message)
 
+    @command('echo', category='filesystem', usage='echo <text> [> filename | >> filename]', description='Print text or write it to a file')
     async def cmd_echo(self, discord_id: int, args: list) -> str:
-        """Echo text or write to file"""
+        """Echo text (redirection into files is handled by the shell)"""
         session = self.um.get_session(discord_id)
         if not session:
             return format_error("Not logged in")
 
-        if not args:
-            return format_code_block("")
-
-        
-        if '>' in args:
-            redirect_index = args.index('>')
-            text = ' '.join(args[:redirect_index])
-
-            if redirect_index + 1 < len(args):
-                filename = args[redirect_index + 1]
-                current_dir = session['current_dir']
-                target_path = self.fs.resolve_path(current_dir, filename)
-
-                
-                if await self.fs.path_exists(discord_id, target_path):
-                    
-                    success, message = await self.fs.write_file(discord_id, target_path, text)
-                else:
-                    
-                    success, message = await self.fs.create_file(discord_id, target_path, text)
-
-                if success:
-                    return format_output(f"Content written to {filename}")
-                else:
-                    return format_error(message)
-            else:
-                return format_error("No filename specified after '>'")
-        else:
-            
-            text = ' '.join(args)
-            return format_code_block(text)
+        return format_code_block(' '.join(args))
 
+    @command('clear', scope=SUDO, category='sudo', usage='sudo clear [limit]',
+             description='Purge channel messages (requires sudo)', aliases=('cls',), context=('channel',))
     async def cmd_clear(self, discord_id: int, args: list, channel = None) -> str:
         """Clear channel messages (purge)"""
         if not channel:
@@ -282,6 +417,7 @@ class BasicCommands:
         except Exception as e:
             return format_error(f"Failed to clear channel: {str(e)}")
 
+    @command('whoami', category='user', description='Display current user information')
     async def cmd_whoami(self, discord_id: int, args: list) -> str:
         """Display current user info"""
         session = self.um.get_session(discord_id)
@@ -301,6 +437,7 @@ Discord ID: {discord_id}"""
 
         return format_code_block(output)
 
+    @command('help', auth=PUBLIC, category='system', usage='help [category]', description='Show help for commands')
     async def cmd_help(self, discord_id: int, args: list) -> str:
         """Display dynamic help menu"""
         
@@ -310,41 +447,73 @@ Discord ID: {discord_id}"""
         
         return self.help_manager.get_help(category, command)
 
+    @command('tree', category='filesystem', usage='tree [-a] [-L depth] [path]', description='Display directory tree structure')
     async def cmd_tree(self, discord_id: int, args: list) -> str:
         """Display directory tree"""
         session = self.um.get_session(discord_id)
         if not session:
             return format_error("Not logged in")
 
+        settings = self.fs.config['settings']
+        max_depth = settings.get('tree_max_depth', 8)
+        max_entries = settings.get('tree_max_entries', 300)
+        show_all = '-a' in args
+        target_path = None
+
+        i = 0
+        while i < len(args):
+            if args[i] == '-L' and i + 1 < len(args):
+                if not args[i + 1].isdigit() or int(args[i + 1]) < 1:
+                    return format_error("Usage: tree [-a] [-L depth] [path]")
+                max_depth = min(max_depth, int(args[i + 1]))
+                i += 1
+            elif not args[i].startswith('-') and target_path is None:
+                target_path = args[i]
+            i += 1
+
         current_dir = session['current_dir']
-        target_path = args[0] if args else current_dir
-        path = self.fs.resolve_path(current_dir, target_path)
+        path = self.fs.resolve_path(current_dir, target_path or current_dir)
 
-        async def build_tree(path, prefix="", is_last=True):
-            success, entries = await self.fs.list_directory(discord_id, path, show_all=False)
-            if not success:
-                return ""
+        success, tree = await self.fs.subtree(discord_id, path, max_depth, max_entries)
+        if not success:
+            return format_error(tree)
+        if tree['type'] != 'directory':
+            return format_error(f"{path} is not a directory")
+
+        children = tree['children']
+        counts = {'directory': 0, 'file': 0}
+
+        def build_tree(dirpath, prefix=""):
+            entries = children.get(dirpath, [])
+            if not show_all:
+                entries = [e for e in entries if not e[1].startswith('.')]
 
             output = []
-            for i, (name, ftype, *_) in enumerate(entries):
+            for i, (entry_path, name, ftype, *_) in enumerate(entries):
                 is_last_item = (i == len(entries) - 1)
                 connector = "└── " if is_last_item else "├── "
 
                 if ftype == 'directory':
+                    counts['directory'] += 1
                     output.append(f"{prefix}{connector}{name}/")
                     extension = "    " if is_last_item else "│   "
-                    subtree = await build_tree(f"{path}/{name}", prefix + extension, is_last_item)
-                    if subtree:
-                        output.append(subtree)
+                    output.extend(build_tree(entry_path, prefix + extension))
                 else:
+                    counts['file'] += 1
                     output.append(f"{prefix}{connector}{name}")
 
-            return '\n'.join(output)
+            return output
+
+        lines = [path.rstrip('/') + '/'] + build_tree(path)
+        lines.append(f"\n{counts['directory']} directories, {counts['file']} files")
+        if tree['truncated']:
+            lines.append(f"(output truncated after {max_entries} entries)")
 
-        tree_output = f"{path}/\n" + await build_tree(path)
-        return format_code_block(tree_output)
+        return format_code_block('\n'.join(lines))
 
-    async def cmd_mv(self, discord_id: int, args: list) -> str:
+    @command('mv', category='filesystem', usage='mv <source> <destination>', description='Move or rename file/directory',
+             context=('channel',))
+    async def cmd_mv(self, discord_id: int, args: list, channel = None) -> str:
         """Move or rename file/directory"""
         session = self.um.get_session(discord_id)
         if not session:
@@ -357,14 +526,16 @@ Discord ID: {discord_id}"""
         source = self.fs.resolve_path(current_dir, args[0])
         destination = self.fs.resolve_path(current_dir, args[1])
 
-        success, message = await self.fs.move_item(discord_id, source, destination)
+        success, message = await self.fs.move_item(discord_id, source, destination, self._progress_reporter(channel, "Moving"))
 
         if success:
             return format_output(message)
         else:
             return format_error(message)
 
-    async def cmd_cp(self, discord_id: int, args: list) -> str:
+    @command('cp', category='filesystem', usage='cp [-r] <source> <destination>', description='Copy file or directory',
+             context=('channel',))
+    async def cmd_cp(self, discord_id: int, args: list, channel = None) -> str:
         """Copy file or directory"""
         session = self.um.get_session(discord_id)
         if not session:
@@ -383,13 +554,34 @@ Discord ID: {discord_id}"""
         source = self.fs.resolve_path(current_dir, filtered_args[0])
         destination = self.fs.resolve_path(current_dir, filtered_args[1])
 
-        success, message = await self.fs.copy_item(discord_id, source, destination, recursive)
+        success, message = await self.fs.copy_item(discord_id, source, destination, recursive, self._progress_reporter(channel, "Copying"))
 
         if success:
             return format_output(message)
         else:
             return format_error(message)
 
+    def _progress_reporter(self, channel, verb: str):
+        """Progress callback for long mv/cp runs: posts one status message and edits it (not inside scripts)"""
+        if channel is None or isinstance(channel, DeferredChannel):
+            return None
+
+        status = None
+
+        async def report(done: int, total: int):
+            nonlocal status
+            text = format_code_block(f"{verb}... {done}/{total} entries ({done * 100 // total}%)")
+            try:
+                if status is None:
+                    status = await channel.send(text)
+                else:
+                    await status.edit(content=text)
+            except Exception:
+                pass
+
+        return report
+
+    @command('chmod', category='filesystem', usage='chmod <mode> <file>', description='Change file permissions')
     async def cmd_chmod(self, discord_id: int, args: list) -> str:
         """Change file permissions"""
         session = self.um.get_session(discord_id)
@@ -410,6 +602,7 @@ Discord ID: {discord_id}"""
         else:
             return format_error(message)
 
+    @command('find', category='filesystem', usage='find [-name pattern] [-type f|d]', description='Find files by name or type')
     async def cmd_find(self, discord_id: int, args: list) -> str:
         """Find files by name pattern"""
         session = self.um.get_session(discord_id)
@@ -444,41 +637,73 @@ Discord ID: {discord_id}"""
 
         return format_code_block('\n'.join(output))
 
+    @command('grep', category='filesystem', usage=GREP_USAGE,
+             description='Search file contents (-i ignore case, -v non-matching lines, -n line numbers, '
+                         '-c count, -l file names, -E regex)')
     async def cmd_grep(self, discord_id: int, args: list) -> str:
         """Search for pattern in file contents"""
         session = self.um.get_session(discord_id)
         if not session:
             return format_error("Not logged in")
 
-        if not args:
-            return format_error("Usage: grep <pattern> [path]")
-
-        pattern = args[0]
-        search_path = None
+        try:
+            options, positional = parse_grep_args(args)
+        except ShellError as e:
+            return format_error(str(e))
 
-        if len(args) > 1:
-            current_dir = session['current_dir']
-            search_path = self.fs.resolve_path(current_dir, args[1])
+        pattern = positional[0]
+        search_paths = [self.fs.resolve_path(session['current_dir'], path) for path in positional[1:]] or [None]
+        mode = 'files' if 'l' in options else 'count' if 'c' in options else 'lines'
 
-        results = await self.fs.grep_content(discord_id, pattern, search_path)
+        results = []
+        truncated = False
+        try:
+            for search_path in search_paths:
+                found, truncated = await self.fs.grep_content(
+                    discord_id, pattern, search_path, ignore_case='i' in options, regex='E' in options,
+                    invert='v' in options, mode=mode
+                )
+                results.extend(found)
+                if truncated:
+                    break
+        except re.error as e:
+            return format_error(f"Invalid regular expression: {e}")
 
         if not results:
             return format_code_block(f"No matches found for '{pattern}'")
 
         output = []
-        for path, matches in results:
-            output.append(f"\n{path}:")
-            for line_num, line in matches:
-                output.append(f"  {line_num}: {line.strip()}")
+        if mode == 'files':
+            output = [path for path, _, _ in results]
+        elif mode == 'count':
+            output = [f"{path}: {count}" for path, _, count in results]
+        else:
+            for path, matches, _ in results:
+                output.append(f"\n{path}:")
+                for line_num, line in matches:
+                    if 'n' in options:
+                        output.append(f"  {line_num}: {line.strip()}")
+                    else:
+                        output.append(f"  {line.strip()}")
+
+        if truncated:
+            output.append("\n(output truncated, refine the pattern or path)")
 
         return format_code_block('\n'.join(output))
 
+    @command('du', category='filesystem', usage='du [-s] [path]',
+             description='Display disk usage statistics and quota, or per-directory usage for a path')
     async def cmd_du(self, discord_id: int, args: list) -> str:
         """Display disk usage statistics"""
         session = self.um.get_session(discord_id)
         if not session:
             return format_error("Not logged in")
 
+        paths = [arg for arg in args if not arg.startswith('-')]
+        if paths:
+            path = self.fs.resolve_path(session['current_dir'], paths[0])
+            return await self._du_path(discord_id, path, summarize='-s' in args)
+
         stats = await self.fs.get_disk_usage(discord_id)
 
         output = [
@@ -491,4 +716,45 @@ Discord ID: {discord_id}"""
             "=" * 40
         ]
 
+        quota = stats['quota']
+        if any(limit is not None for limit in quota.values()):
+            output.insert(-1, "Quota:")
+            for label, used, limit in (("Files", stats['total_files'], quota['max_files']),
+                                       ("Directories", stats['total_directories'], quota['max_directories']),
+                                       ("Bytes", stats['total_size'], quota['max_bytes'])):
+                if limit is not None:
+                    output.insert(-1, f"  {label + ':':<14}{used:,} / {limit:,} ({used / limit * 100 if limit else 100:.0f}%)")
+
+        return format_code_block('\n'.join(output))
+
+    async def _du_path(self, discord_id: int, path: str, summarize: bool = False) -> str:
+        """Per-directory disk usage for one subtree (du <path>)"""
+        max_entries = self.fs.config['settings'].get('du_max_entries', 10000)
+
+        success, tree = await self.fs.subtree(discord_id, path, max_entries=max_entries)
+        if not success:
+            return format_error(tree)
+        if tree['type'] != 'directory':
+            return format_code_block(f"{tree['size']:<10} {path}")
+
+        totals = {path: 0}
+        for entries in tree['children'].values():
+            for entry_path, name, ftype, size, *_ in entries:
+                if ftype == 'directory':
+                    totals.setdefault(entry_path, 0)
+                else:
+                    parent = self.fs.parent_path(entry_path)
+                    totals[parent] = totals.get(parent, 0) + (size or 0)
+
+        
+        directories = sorted(totals, key=lambda d: d.count('/'), reverse=True)
+        for dirpath in directories:
+            if dirpath != path:
+                totals[self.fs.parent_path(dirpath)] += totals[dirpath]
+
+        shown = [path] if summarize else sorted(totals, reverse=True)
+        output = [f"{totals[d]:<10} {d}" for d in shown]
+        if tree['truncated']:
+            output.append(f"(partial: stopped after {max_entries} entries)")
+
         return format_code_block('\n'.join(output))
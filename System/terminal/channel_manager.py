@@ -1,45 +1,42 @@
-import aiosqlite
-import json
+import time
+from .database import get_database
+from .config import CONFIG, ADMINS_PATH
+from .migrations import migrate
 
 class ChannelManager:
     """Manages trusted channels for terminal commands"""
 
     def __init__(self):
         self.db_path = "Data/terminal_channels.db"
-        self.admin_config_path = "Data/terminal_admins.json"
+        self.db = get_database(self.db_path)
+        self.admin_config_path = ADMINS_PATH
+        self.trusted = set()
+        self._loaded = False
+        self._notified = {}
 
     def load_admin_config(self):
-        """Load admin configuration from JSON"""
-        try:
-            with open(self.admin_config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('admins', [])
-        except FileNotFoundError:
-            return []
+        """Admin entries from the admin configuration"""
+        return CONFIG.get(self.admin_config_path, {'admins': []}).get('admins', ())
 
     def is_admin(self, discord_id: int) -> bool:
         """Check if user is admin from JSON config"""
-        admins = self.load_admin_config()
-        return any(admin['discord_id'] == discord_id for admin in admins)
+        return CONFIG.is_admin(discord_id)
 
     async def setup_database(self):
-        """Initialize channel database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS trusted_channels (
-                    channel_id INTEGER PRIMARY KEY,
-                    guild_id INTEGER NOT NULL,
-                    channel_name TEXT,
-                    added_by INTEGER,
-                    added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                )
-            """)
-            await db.commit()
-            print("✅ Channel database initialized")
+        """Initialize channel database (runs pending migrations once) and load the trusted set"""
+        await migrate(self.db_path)
+        await self.load_trusted_channels()
+
+    async def load_trusted_channels(self):
+        """Load every trusted channel ID into memory (kept current by add/remove)"""
+        async with self.db.read() as db:
+            cursor = await db.execute("SELECT channel_id FROM trusted_channels")
+            self.trusted = {row[0] for row in await cursor.fetchall()}
+        self._loaded = True
 
     async def add_trusted_channel(self, channel_id: int, guild_id: int, channel_name: str, added_by: int) -> tuple[bool, str]:
         """Add channel to trusted list"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             
             cursor = await db.execute("SELECT channel_id FROM trusted_channels WHERE channel_id = ?", (channel_id,))
             if await cursor.fetchone():
@@ -50,31 +47,44 @@ class ChannelManager:
                 INSERT INTO trusted_channels (channel_id, guild_id, channel_name, added_by)
                 VALUES (?, ?, ?, ?)
             """, (channel_id, guild_id, channel_name, added_by))
-            await db.commit()
 
-            return True, f"Channel <#{channel_id}> added to trusted list"
+        self.trusted.add(channel_id)
+        self._notified.pop(channel_id, None)
+        return True, f"Channel <#{channel_id}> added to trusted list"
 
     async def remove_trusted_channel(self, channel_id: int) -> tuple[bool, str]:
         """Remove channel from trusted list"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             cursor = await db.execute("SELECT channel_id FROM trusted_channels WHERE channel_id = ?", (channel_id,))
             if not await cursor.fetchone():
                 return False, f"Channel <#{channel_id}> is not in trusted list"
 
             await db.execute("DELETE FROM trusted_channels WHERE channel_id = ?", (channel_id,))
-            await db.commit()
 
-            return True, f"Channel <#{channel_id}> removed from trusted list"
+        self.trusted.discard(channel_id)
+        return True, f"Channel <#{channel_id}> removed from trusted list"
 
     async def is_trusted_channel(self, channel_id: int) -> bool:
-        """Check if channel is trusted"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT channel_id FROM trusted_channels WHERE channel_id = ?", (channel_id,))
-            return bool(await cursor.fetchone())
+        """Check if channel is trusted (a set lookup once the trusted set is loaded)"""
+        if not self._loaded:
+            await self.load_trusted_channels()
+        return channel_id in self.trusted
+
+    def should_notify_untrusted(self, channel_id: int, cooldown: float) -> bool:
+        """Whether a command in an untrusted channel gets an answer: at most once per cooldown seconds per channel"""
+        now = time.monotonic()
+        last = self._notified.get(channel_id)
+        if last is not None and now - last < cooldown:
+            return False
+
+        if len(self._notified) >= 1024:
+            self._notified = {cid: at for cid, at in self._notified.items() if now - at < cooldown}
+        self._notified[channel_id] = now
+        return True
 
     async def get_trusted_channels(self, guild_id: int = None) -> list:
         """Get all trusted channels (optionally filtered by guild)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             if guild_id:
                 cursor = await db.execute("""
                     SELECT channel_id, channel_name, added_at
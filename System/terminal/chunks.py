@@ -0,0 +1,71 @@
+"""
+Chunked storage format for file contents.
+
+A blob is stored as consecutive chunks of at most `chunk_size` characters.
+Chunks end right after a newline whenever the window contains one, so every
+line lives in a single chunk unless it is longer than a whole chunk. Each
+chunk records its character offset and the number of newlines before it,
+which lets readers jump straight to an offset or a line number.
+"""
+
+DEFAULT_CHUNK_SIZE = 16384
+
+
+class ChunkSplitter:
+    """Incremental chunking: feed() text as it arrives, then finish()"""
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.offset = 0
+        self.line = 0
+        self.ends_with_newline = False
+
+    def feed(self, text: str) -> list:
+        """Add text; returns the chunks that are complete: [(offset, line, data)]"""
+        buffer = self.buffer + text
+        position = 0
+        chunks = []
+
+        while len(buffer) - position > self.chunk_size:
+            newline = buffer.rfind('\n', position, position + self.chunk_size)
+            end = newline + 1 if newline != -1 else position + self.chunk_size
+            chunks.append(self._chunk(buffer[position:end]))
+            position = end
+
+        self.buffer = buffer[position:]
+        return chunks
+
+    def finish(self) -> list:
+        """Flush the last (short) chunk"""
+        chunks = [self._chunk(self.buffer)] if self.buffer else []
+        self.buffer = ''
+        return chunks
+
+    def _chunk(self, data: str) -> tuple:
+        """Emit data as the next chunk"""
+        chunk = (self.offset, self.line, data)
+        self.offset += len(data)
+        self.line += data.count('\n')
+        self.ends_with_newline = data.endswith('\n')
+        return chunk
+
+    @property
+    def lines(self) -> int:
+        """count_lines() of everything chunked so far"""
+        if not self.offset:
+            return 0
+        return self.line + (0 if self.ends_with_newline else 1)
+
+
+def split_chunks(content: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> list:
+    """Cut content into line-aligned chunks. Returns: [(offset, line, data)]"""
+    splitter = ChunkSplitter(chunk_size)
+    return splitter.feed(content) + splitter.finish()
+
+
+def count_lines(content: str) -> int:
+    """Number of lines as shown by cat (a trailing newline does not start a new line)"""
+    if not content:
+        return 0
+    return content.count('\n') + (0 if content.endswith('\n') else 1)
@@ -0,0 +1,209 @@
+"""
+Command registry.
+
+Handlers declare themselves with `@command(...)`: the name they answer to,
+where it is typed (directly, behind `sudo` or behind `root`), who may run it,
+which parts of the invoking context they take and their help text. Command
+groups (`apt`, `role`) dispatch on their first argument to subcommands
+registered as 'group sub'.
+
+A `Dispatcher` resolves a command with one dict lookup. The object owning a
+handler is only created when one of its commands first runs (through the
+factory bound for its class); cogs are looked up on the bot on every call,
+so reloading an extension is picked up.
+"""
+from .permissions import format_error
+
+SHELL = 'shell'
+SUDO = 'sudo'
+ROOT = 'root'
+
+PUBLIC = 'public'
+SESSION = 'session'
+ADMIN = 'admin'
+
+CONTEXT_KEYS = ('message', 'channel', 'channel_id', 'guild', 'attachments')
+
+
+class Command:
+    """A registered command, subcommand ('group sub') or command group"""
+
+    __slots__ = ('name', 'scope', 'auth', 'category', 'usage', 'description', 'aliases',
+                 'context', 'guild_only', 'owner', 'func')
+
+    def __init__(self, name, scope, auth, category, usage, description, aliases, context, guild_only, owner, func):
+        self.name = name
+        self.scope = scope
+        self.auth = auth
+        self.category = category
+        self.usage = usage or name
+        self.description = description
+        self.aliases = tuple(aliases)
+        self.context = tuple(context)
+        self.guild_only = guild_only
+        self.owner = owner
+        self.func = func
+
+    @property
+    def is_group(self) -> bool:
+        return self.func is None
+
+    @property
+    def group(self):
+        """Name of the group a subcommand belongs to (None for top-level commands)"""
+        return self.name.rpartition(' ')[0] or None
+
+
+class CommandRegistry:
+    """Commands by scope and name, aliases included"""
+
+    def __init__(self):
+        self._scopes = {SHELL: {}, SUDO: {}, ROOT: {}}
+        self._commands = {}
+        self._names = set()
+        self.version = 0
+
+    def add(self, cmd: Command):
+        """Register a command, replacing an earlier one of the same scope and name (extension reloads)"""
+        unknown = set(cmd.context) - set(CONTEXT_KEYS)
+        if unknown:
+            raise ValueError(f"{cmd.name}: unknown context {', '.join(sorted(unknown))}")
+
+        group = cmd.group
+        if group is not None:
+            parent = self._scopes[cmd.scope].get(group)
+            if parent is None or not parent.is_group:
+                raise ValueError(f"{cmd.name}: group '{group}' is not registered in scope {cmd.scope}")
+            cmd.category = cmd.category or parent.category
+            cmd.guild_only = cmd.guild_only or parent.guild_only
+
+        table = self._scopes[cmd.scope]
+        prefix = f"{group} " if group else ''
+        for name in (cmd.name, *(prefix + alias for alias in cmd.aliases)):
+            table[name] = cmd
+            if group is None:
+                self._names.add(name)
+
+        self._commands[(cmd.scope, cmd.name)] = cmd
+        self.version += 1
+
+    def get(self, scope: str, name: str):
+        """Command (or alias target) of a scope, or None"""
+        return self._scopes[scope].get(name)
+
+    def __contains__(self, name: str) -> bool:
+        """Whether name is a top-level command in any scope"""
+        return name in self._names
+
+    def __iter__(self):
+        """Registered commands in registration order (aliases not repeated)"""
+        return iter(self._commands.values())
+
+    def names(self, scope: str) -> list:
+        """Top-level command names of a scope, in registration order"""
+        return [cmd.name for cmd in self if cmd.scope == scope and cmd.group is None]
+
+    def subcommands(self, group: Command) -> list:
+        """Subcommand names (without the group prefix) of a group"""
+        prefix = group.name + ' '
+        return [cmd.name[len(prefix):] for cmd in self if cmd.scope == group.scope and cmd.name.startswith(prefix)]
+
+
+REGISTRY = CommandRegistry()
+
+
+def command(name: str, scope: str = SHELL, auth: str = None, category: str = None, usage: str = None,
+            description: str = None, aliases=(), context=(), guild_only: bool = False):
+    """
+    Register a method as the handler of a command. It is called as
+    handler(discord_id, args, **context) with the requested context keys
+    (message, channel, channel_id, guild, attachments). auth defaults to
+    ADMIN for root commands and SESSION otherwise.
+    """
+    def decorator(func):
+        owner = func.__qualname__.rpartition('.')[0]
+        REGISTRY.add(Command(name, scope, auth or (ADMIN if scope == ROOT else SESSION), category, usage,
+                             description, aliases, context, guild_only, owner, func))
+        return func
+    return decorator
+
+
+def command_group(name: str, scope: str = SHELL, auth: str = None, category: str = None, usage: str = None,
+                  description: str = None, guild_only: bool = False):
+    """Register a command that dispatches to its subcommands ('name sub')"""
+    REGISTRY.add(Command(name, scope, auth or (ADMIN if scope == ROOT else SESSION), category, usage,
+                         description, (), (), guild_only, None, None))
+
+
+class Dispatcher:
+    """Runs registered commands for one terminal"""
+
+    def __init__(self, user_manager, bot=None, registry: CommandRegistry = REGISTRY):
+        self.um = user_manager
+        self.bot = bot
+        self.registry = registry
+        self._factories = {}
+        self._owners = {}
+
+    def bind(self, owner: str, factory):
+        """Create the handler owner (class name) with factory() when one of its commands first runs"""
+        self._factories[owner] = factory
+        self._owners.pop(owner, None)
+
+    def _owner(self, name: str):
+        """Instance owning a handler: bound factories are called once, anything else is a cog"""
+        instance = self._owners.get(name)
+        if instance is not None:
+            return instance
+
+        factory = self._factories.get(name)
+        if factory is None:
+            return self.bot.get_cog(name) if self.bot is not None else None
+
+        instance = self._owners[name] = factory()
+        return instance
+
+    async def dispatch(self, scope: str, name: str, discord_id: int, args: list, **context) -> str:
+        """Run a command of a scope; context holds the CONTEXT_KEYS values of the invocation"""
+        cmd = self.registry.get(scope, name)
+        if cmd is None:
+            return format_error(f"Unknown command: {name}\nType 'help' for available commands")
+
+        checked = None
+        while True:
+            if cmd.guild_only and context.get('guild') is None:
+                return format_error(f"'{cmd.name}' can only be used in a server")
+
+            if cmd.auth != checked:
+                denied = await self._check_auth(cmd, discord_id)
+                if denied:
+                    return format_error(denied)
+                checked = cmd.auth
+
+            if not cmd.is_group:
+                break
+
+            if not args:
+                return format_error(f"Usage: {cmd.usage}")
+
+            sub = self.registry.get(scope, f"{cmd.name} {args[0].lower()}")
+            if sub is None:
+                return format_error(f"Unknown {cmd.name} subcommand: {args[0]}\n"
+                                    f"Available: {', '.join(self.registry.subcommands(cmd))}")
+            cmd, args = sub, args[1:]
+
+        owner = self._owner(cmd.owner)
+        if owner is None:
+            return format_error(f"{cmd.owner} system not loaded")
+
+        return await cmd.func(owner, discord_id, args, **{key: context.get(key) for key in cmd.context})
+
+    async def _check_auth(self, cmd: Command, discord_id: int):
+        """Reason the user may not run cmd, or None"""
+        if cmd.auth == PUBLIC:
+            return None
+        if not self.um.is_logged_in(discord_id):
+            return "You must be logged in. Use 'register' or 'login'"
+        if cmd.auth == ADMIN and await self.um.get_user_role(discord_id) != 'admin':
+            return "Permission denied. Admin privileges required."
+        return None
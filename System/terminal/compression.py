@@ -0,0 +1,104 @@
+"""
+Transparent compression of stored file contents.
+
+Chunks of a compressed blob are stored as SQLite BLOB values: one codec tag
+byte followed by the compressed UTF-8 text. Plain chunks stay TEXT, so every
+reader can tell the two apart per value. The codec is chosen once per blob by
+compressing a sample with each candidate and keeping the smallest result.
+
+SQL sees the text through `inflate(data)` (registered by the migrations), so
+the full-text index and instr() scans never look at compressed bytes.
+"""
+import lzma
+import sys
+import zlib
+from collections import OrderedDict
+
+RAW = 'raw'
+CODECS = ('zlib', 'lzma')
+
+_TAGS = {'zlib': b'z', 'lzma': b'x'}
+_CODEC_BY_TAG = {tag[0]: codec for codec, tag in _TAGS.items()}
+
+
+def compress(text: str, codec: str) -> bytes:
+    """Compressed, tagged form of text"""
+    data = text.encode('utf-8')
+    if codec == 'zlib':
+        return _TAGS[codec] + zlib.compress(data, 6)
+    if codec == 'lzma':
+        return _TAGS[codec] + lzma.compress(data, check=lzma.CHECK_NONE)
+    raise ValueError(f"Unknown codec: {codec}")
+
+
+def decompress(data):
+    """Text of a stored chunk (plain TEXT values are returned unchanged)"""
+    if not isinstance(data, bytes):
+        return data
+
+    codec = _CODEC_BY_TAG.get(data[0])
+    if codec == 'zlib':
+        return zlib.decompress(data[1:]).decode('utf-8')
+    if codec == 'lzma':
+        return lzma.decompress(data[1:]).decode('utf-8')
+    raise ValueError(f"Unknown codec tag: {data[:1]!r}")
+
+
+def choose_codec(sample: str, codecs=CODECS, min_saving: float = 0.1) -> str:
+    """Codec that shrinks sample the most, or RAW if none saves at least min_saving"""
+    size = len(sample.encode('utf-8'))
+    best, best_size = RAW, size * (1 - min_saving)
+
+    for codec in codecs:
+        compressed = len(compress(sample, codec))
+        if compressed < best_size:
+            best, best_size = codec, compressed
+    return best
+
+
+class ChunkCache:
+    """Byte-bounded LRU of decompressed chunks.
+
+    Entries are keyed by the stored (compressed) value itself, so a hit is
+    always exact and nothing has to be invalidated when blobs are deleted.
+    """
+
+    def __init__(self, max_bytes: int = 8388608):
+        self.max_bytes = max(0, max_bytes)
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0}
+        self._entries = OrderedDict()
+
+    def inflate(self, data):
+        """Text of a stored chunk, decompressing (and caching) compressed ones"""
+        if not isinstance(data, bytes):
+            return data
+
+        text = self._entries.get(data)
+        if text is not None:
+            self.stats['hits'] += 1
+            self._entries.move_to_end(data)
+            return text
+
+        self.stats['misses'] += 1
+        text = decompress(data)
+        size = sys.getsizeof(data) + sys.getsizeof(text)
+        if size <= self.max_bytes // 4:
+            self._entries[data] = text
+            self.size += size
+            while self.size > self.max_bytes:
+                old, old_text = self._entries.popitem(last=False)
+                self.size -= sys.getsizeof(old) + sys.getsizeof(old_text)
+        return text
+
+    def report(self) -> dict:
+        """Hit/miss counters and current footprint"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_ratio': self.stats['hits'] / lookups if lookups else 0.0,
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes
+        }
+
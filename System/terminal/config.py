@@ -0,0 +1,124 @@
+"""
+Shared JSON configuration.
+
+Every config file is parsed once and served as an immutable snapshot
+(mappings become read-only views, lists become tuples), so all readers share
+one object and a reload swaps it as a whole. `refresh()` stats the files and
+re-parses the changed ones in a worker thread; the terminal runs it on a
+timer (config_watch_seconds) and on `root reload`. A file that fails to
+parse keeps its last good snapshot.
+"""
+import asyncio
+import json
+import os
+from types import MappingProxyType
+
+ADMINS_PATH = "Data/terminal_admins.json"
+
+
+def freeze(value):
+    """Read-only copy of parsed JSON"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def _signature(path: str):
+    """(mtime, size) of a file, or None if it does not exist"""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class ConfigService:
+    """Immutable snapshots of JSON config files, reloaded when they change on disk"""
+
+    def __init__(self):
+        self._snapshots = {}
+        self._signatures = {}
+        self._defaults = {}
+        self._admin_source = None
+        self._admin_ids = frozenset()
+        self._lock = asyncio.Lock()
+
+    def get(self, path: str, default=None):
+        """
+        Snapshot of a config file. The first call for a file parses it;
+        default (if given) stands in for a missing or unreadable file,
+        otherwise the error (FileNotFoundError, a JSON ValueError) is raised.
+        """
+        snapshot = self._snapshots.get(path)
+        if snapshot is not None:
+            return snapshot
+
+        if default is not None:
+            self._defaults[path] = freeze(default)
+        signature = _signature(path)
+        try:
+            snapshot = self._parse(path) if signature is not None else self._missing(path)
+        except (OSError, ValueError) as e:
+            if path not in self._defaults:
+                raise
+            print(f"⚠️ Using defaults for {path}: {e}")
+            snapshot = self._defaults[path]
+        self._signatures[path] = signature
+        self._snapshots[path] = snapshot
+        return snapshot
+
+    def _missing(self, path: str):
+        """Snapshot of a file that does not exist"""
+        default = self._defaults.get(path)
+        if default is None:
+            raise FileNotFoundError(path)
+        return default
+
+    @staticmethod
+    def _parse(path: str):
+        with open(path, 'r', encoding='utf-8') as f:
+            return freeze(json.load(f))
+
+    def _load_changed(self, paths: list, force: bool) -> dict:
+        """Parse the files whose signature changed (runs in a worker thread); failed files map to None"""
+        loaded = {}
+        for path in paths:
+            signature = _signature(path)
+            if not force and signature == self._signatures.get(path):
+                continue
+            try:
+                snapshot = self._parse(path) if signature is not None else self._missing(path)
+            except (OSError, ValueError) as e:
+                print(f"⚠️ Keeping previous {path}: {e}")
+                snapshot = None
+            loaded[path] = (signature, snapshot)
+        return loaded
+
+    async def refresh(self, force: bool = False) -> list:
+        """Reload changed config files (every file when force) off the event loop; returns the reloaded paths"""
+        async with self._lock:
+            loaded = await asyncio.to_thread(self._load_changed, list(self._snapshots), force)
+            reloaded = []
+            for path, (signature, snapshot) in loaded.items():
+                self._signatures[path] = signature
+                if snapshot is not None:
+                    self._snapshots[path] = snapshot
+                    reloaded.append(path)
+            return sorted(reloaded)
+
+    def admin_ids(self) -> frozenset:
+        """Discord IDs listed in terminal_admins.json, rebuilt only when the file was reloaded"""
+        snapshot = self.get(ADMINS_PATH, {'admins': []})
+        if snapshot is not self._admin_source:
+            self._admin_ids = frozenset(admin['discord_id'] for admin in snapshot.get('admins', ()))
+            self._admin_source = snapshot
+        return self._admin_ids
+
+    def is_admin(self, discord_id: int) -> bool:
+        """Check if a user is listed as terminal admin"""
+        return discord_id in self.admin_ids()
+
+
+CONFIG = ConfigService()
@@ -0,0 +1,384 @@
+import aiosqlite
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+CONFIG_PATH = "Data/database_config.json"
+
+DEFAULT_SETTINGS = {
+    "pool_size": 3,
+    "busy_timeout_seconds": 5.0,
+    "checkpoint_interval_seconds": 300,
+    "checkpoint_mode": "PASSIVE",
+    "group_commit_window_ms": 5,
+    "group_commit_max_units": 32,
+    "profiles": {}
+}
+
+DEFAULT_PROFILE = {
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",
+    "mmap_size": 67108864,
+    "cache_size": -8000,
+    "temp_store": "MEMORY"
+}
+
+JOURNAL_MODES = {'DELETE', 'TRUNCATE', 'PERSIST', 'MEMORY', 'WAL', 'OFF'}
+SYNCHRONOUS_LEVELS = {'OFF', 'NORMAL', 'FULL', 'EXTRA'}
+TEMP_STORES = {'DEFAULT', 'FILE', 'MEMORY'}
+CHECKPOINT_MODES = {'PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'}
+
+
+def load_database_config() -> dict:
+    """Load database settings from JSON (falls back to defaults)"""
+    try:
+        with open(CONFIG_PATH, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+    except FileNotFoundError:
+        config = {}
+
+    settings = dict(DEFAULT_SETTINGS)
+    settings.update(config)
+    return settings
+
+
+def get_storage_profile(db_path: str, settings: dict = None) -> dict:
+    """Build the storage profile for a database: defaults < "default" < per-file overrides"""
+    if settings is None:
+        settings = load_database_config()
+
+    profiles = settings.get('profiles', {})
+    profile = dict(DEFAULT_PROFILE)
+    profile.update(profiles.get('default', {}))
+    profile.update(profiles.get(db_path, {}))
+
+    profile['journal_mode'] = str(profile['journal_mode']).upper()
+    profile['synchronous'] = str(profile['synchronous']).upper()
+    profile['temp_store'] = str(profile['temp_store']).upper()
+
+    if profile['journal_mode'] not in JOURNAL_MODES:
+        raise ValueError(f"Invalid journal_mode for {db_path}: {profile['journal_mode']}")
+    if profile['synchronous'] not in SYNCHRONOUS_LEVELS:
+        raise ValueError(f"Invalid synchronous level for {db_path}: {profile['synchronous']}")
+    if profile['temp_store'] not in TEMP_STORES:
+        raise ValueError(f"Invalid temp_store for {db_path}: {profile['temp_store']}")
+
+    profile['mmap_size'] = int(profile['mmap_size'])
+    profile['cache_size'] = int(profile['cache_size'])
+    return profile
+
+
+_sql_functions = {}
+
+
+def register_function(name: str, num_params: int, func):
+    """Register a deterministic SQL function on every connection opened from now on"""
+    _sql_functions[(name, num_params)] = func
+
+
+async def apply_storage_profile(db: aiosqlite.Connection, profile: dict):
+    """Apply a storage profile to a freshly opened connection"""
+    await db.execute(f"PRAGMA journal_mode = {profile['journal_mode']}")
+    await db.execute(f"PRAGMA synchronous = {profile['synchronous']}")
+    await db.execute(f"PRAGMA mmap_size = {profile['mmap_size']}")
+    await db.execute(f"PRAGMA cache_size = {profile['cache_size']}")
+    await db.execute(f"PRAGMA temp_store = {profile['temp_store']}")
+
+
+class DatabaseManager:
+    """Long-lived connections for one SQLite file.
+
+    Readers are handed out from a small pool, the single writer connection
+    is serialized behind a lock. A task that already holds the writer and
+    enters `write()` again joins the outer transaction instead of deadlocking;
+    the nested block gets its own savepoint, so an error inside it only undoes
+    that block.
+
+    Writes are group-committed: every `write()` block runs inside a savepoint
+    of a shared transaction, and one COMMIT is issued for all blocks that
+    finished within `commit_window` seconds (or once `max_batch` blocks are
+    waiting). `write()` only returns after that COMMIT, so callers still see
+    durable completion.
+    """
+
+    def __init__(self, db_path: str, pool_size: int = 3, timeout: float = 5.0, profile: dict = None,
+                 commit_window: float = 0.005, max_batch: int = 32):
+        self.db_path = db_path
+        self.pool_size = max(1, pool_size)
+        self.timeout = timeout
+        self.profile = profile or get_storage_profile(db_path)
+        self.commit_window = max(0.0, commit_window)
+        self.max_batch = max(1, max_batch)
+
+        self._readers = asyncio.Queue()
+        self._all_readers = []
+        self._writer = None
+        self._write_lock = asyncio.Lock()
+        self._write_owner = None
+        self._open_lock = asyncio.Lock()
+        self._closed = False
+
+        self._batch = None
+        self._batch_units = 0
+        self._flush_handle = None
+        self._flush_pending = False
+        self.stats = {'units': 0, 'commits': 0}
+
+    async def connect(self, autocommit: bool = False) -> aiosqlite.Connection:
+        """Open a new connection with this database's storage profile applied.
+        Use read()/write() instead unless a dedicated connection is really needed."""
+        if autocommit:
+            db = await aiosqlite.connect(self.db_path, timeout=self.timeout, isolation_level=None)
+        else:
+            db = await aiosqlite.connect(self.db_path, timeout=self.timeout)
+        await apply_storage_profile(db, self.profile)
+        for (name, num_params), func in _sql_functions.items():
+            await db.create_function(name, num_params, func, deterministic=True)
+        return db
+
+    async def _acquire_reader(self) -> aiosqlite.Connection:
+        """Take a reader from the pool, opening one if the pool is not full yet"""
+        if self._closed:
+            raise RuntimeError(f"Database {self.db_path} is closed")
+
+        if self._readers.empty():
+            async with self._open_lock:
+                if self._readers.empty() and len(self._all_readers) < self.pool_size:
+                    db = await self.connect()
+                    self._all_readers.append(db)
+                    return db
+
+        return await self._readers.get()
+
+    async def _get_writer(self) -> aiosqlite.Connection:
+        """Return the writer connection (opened lazily)"""
+        if self._closed:
+            raise RuntimeError(f"Database {self.db_path} is closed")
+
+        if self._writer is None:
+            self._writer = await self.connect(autocommit=True)
+        return self._writer
+
+    @asynccontextmanager
+    async def read(self):
+        """Borrow a reader connection: `async with db.read() as conn:`"""
+        if self._write_owner is not None and self._write_owner is asyncio.current_task():
+            yield self._writer
+            return
+
+        db = await self._acquire_reader()
+        try:
+            yield db
+        finally:
+            self._readers.put_nowait(db)
+
+    @asynccontextmanager
+    async def write(self):
+        """Run a unit of work on the writer connection.
+        Rolled back on error; returns once the group commit containing it is durable."""
+        task = asyncio.current_task()
+
+        if self._write_owner is task:
+            await self._writer.execute("SAVEPOINT nested_unit")
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.execute("ROLLBACK TO nested_unit")
+                await self._writer.execute("RELEASE nested_unit")
+                raise
+            await self._writer.execute("RELEASE nested_unit")
+            return
+
+        async with self._write_lock:
+            db = await self._get_writer()
+            if not db.in_transaction:
+                await db.execute("BEGIN")
+            await db.execute("SAVEPOINT unit_of_work")
+
+            self._write_owner = task
+            try:
+                yield db
+            except BaseException as e:
+                await self._rollback_unit(db, e)
+                raise
+            finally:
+                self._write_owner = None
+
+            await db.execute("RELEASE unit_of_work")
+            batch = self._join_batch()
+
+        await asyncio.shield(batch)
+
+    async def _rollback_unit(self, db: aiosqlite.Connection, error: BaseException):
+        """Undo one unit of work without touching the rest of the batch"""
+        if db.in_transaction:
+            await db.execute("ROLLBACK TO unit_of_work")
+            await db.execute("RELEASE unit_of_work")
+            return
+
+        if self._batch is not None and not self._batch.done():
+            self._batch.set_exception(RuntimeError(f"Transaction on {self.db_path} aborted: {error}"))
+        self._reset_batch()
+
+    def _join_batch(self) -> asyncio.Future:
+        """Register a finished unit with the pending commit and schedule the flush"""
+        loop = asyncio.get_running_loop()
+
+        if self._batch is None:
+            self._batch = loop.create_future()
+            self._batch_units = 0
+            if self.commit_window > 0:
+                self._flush_handle = loop.call_later(self.commit_window, self._schedule_flush)
+
+        self._batch_units += 1
+        self.stats['units'] += 1
+        batch = self._batch
+
+        if self.commit_window <= 0 or self._batch_units >= self.max_batch:
+            self._schedule_flush()
+
+        return batch
+
+    def _schedule_flush(self):
+        """Start the flush task once per batch (called from the event loop timer)"""
+        if self._flush_pending:
+            return
+        self._flush_pending = True
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        asyncio.get_running_loop().create_task(self.flush())
+
+    def _reset_batch(self):
+        """Forget the current batch and its timer"""
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        self._batch = None
+        self._batch_units = 0
+        self._flush_pending = False
+
+    async def flush(self):
+        """Commit the pending batch now and wake every unit waiting on it"""
+        async with self._write_lock:
+            batch = self._batch
+            self._reset_batch()
+            if batch is None or batch.done():
+                return
+
+            try:
+                if self._writer is not None and self._writer.in_transaction:
+                    await self._writer.commit()
+                    self.stats['commits'] += 1
+            except Exception as e:
+                try:
+                    await self._writer.rollback()
+                except Exception:
+                    pass
+                batch.set_exception(e)
+            else:
+                batch.set_result(None)
+
+    async def open(self):
+        """Open the writer eagerly so the storage profile (e.g. WAL) is applied right away"""
+        async with self._write_lock:
+            await self._get_writer()
+
+    async def checkpoint(self, mode: str = 'PASSIVE') -> tuple:
+        """Run a WAL checkpoint on the writer connection.
+        Returns: (busy, log_frames, checkpointed_frames)"""
+        mode = mode.upper()
+        if mode not in CHECKPOINT_MODES:
+            raise ValueError(f"Invalid checkpoint mode: {mode}")
+
+        if self._writer is None or self.profile['journal_mode'] != 'WAL':
+            return (0, 0, 0)
+
+        await self.flush()
+        async with self._write_lock:
+            if self._writer is None:
+                return (0, 0, 0)
+            cursor = await self._writer.execute(f"PRAGMA wal_checkpoint({mode})")
+            return await cursor.fetchone()
+
+    async def close(self):
+        """Close every connection held by this manager"""
+        await self.flush()
+        self._closed = True
+
+        async with self._write_lock:
+            if self._writer is not None:
+                await self._writer.close()
+                self._writer = None
+
+        for db in self._all_readers:
+            await db.close()
+        self._all_readers.clear()
+
+        while not self._readers.empty():
+            self._readers.get_nowait()
+
+
+_databases = {}
+_checkpoint_task = None
+
+
+def get_database(db_path: str) -> DatabaseManager:
+    """Get the shared DatabaseManager for a database file"""
+    manager = _databases.get(db_path)
+    if manager is None:
+        settings = load_database_config()
+        manager = DatabaseManager(
+            db_path,
+            pool_size=settings['pool_size'],
+            timeout=settings['busy_timeout_seconds'],
+            profile=get_storage_profile(db_path, settings),
+            commit_window=settings['group_commit_window_ms'] / 1000,
+            max_batch=settings['group_commit_max_units']
+        )
+        _databases[db_path] = manager
+    return manager
+
+
+async def checkpoint_databases(mode: str = 'PASSIVE'):
+    """Checkpoint the WAL of every open database"""
+    for manager in list(_databases.values()):
+        try:
+            await manager.checkpoint(mode)
+        except Exception as e:
+            print(f"⚠️ WAL checkpoint failed for {manager.db_path}: {e}")
+
+
+async def _checkpoint_loop(interval: float, mode: str):
+    """Background task: periodically fold the WAL back into the database files"""
+    while True:
+        await asyncio.sleep(interval)
+        await checkpoint_databases(mode)
+
+
+def start_checkpoints(loop: asyncio.AbstractEventLoop = None):
+    """Start the periodic WAL checkpoint task (no-op if already running or disabled)"""
+    global _checkpoint_task
+    if _checkpoint_task is not None and not _checkpoint_task.done():
+        return
+
+    settings = load_database_config()
+    interval = settings['checkpoint_interval_seconds']
+    if not interval or interval <= 0:
+        return
+
+    loop = loop or asyncio.get_event_loop()
+    _checkpoint_task = loop.create_task(_checkpoint_loop(interval, settings['checkpoint_mode']))
+
+
+async def close_databases():
+    """Close all shared database connections (called on bot shutdown)"""
+    global _checkpoint_task
+    if _checkpoint_task is not None:
+        _checkpoint_task.cancel()
+        _checkpoint_task = None
+
+    for manager in list(_databases.values()):
+        await manager.close()
+    _databases.clear()
+    print("✅ Database connections closed")
@@ -1,49 +1,182 @@
-import aiosqlite
-import json
+import codecs
+import hashlib
+import io
+import re
+import secrets
 from datetime import datetime
 from pathlib import Path
 import os
+from contextlib import asynccontextmanager
+from .chunks import DEFAULT_CHUNK_SIZE, ChunkSplitter, split_chunks, count_lines
+from .compression import RAW, CODECS, ChunkCache, compress, choose_codec
+from .config import CONFIG
+from .database import get_database
+from .metadata_cache import MetadataCache, MISSING
+from .migrations import migrate
+
+BASE_LAYER = 0
+
+VISIBLE = f"""
+    f.owner_id IN (:owner_id, {BASE_LAYER}) AND f.type != 'whiteout'
+    AND (f.owner_id = :owner_id OR NOT EXISTS (
+        SELECT 1 FROM filesystem o WHERE o.owner_id = :owner_id AND o.path = f.path
+    ))
+"""
+
+QUOTA_LIMITS = ('max_files', 'max_directories', 'max_bytes')
+
+STAT_COLUMNS = "f.name, f.size, f.permissions, f.created_at, f.modified_at, f.executable, f.blob_id, b.lines"
+
+class FilesystemError(Exception):
+    """Aborts a write unit (rolling it back) with a message for the user"""
+
+
+class FileStat:
+    """Visible entry for a path in the merged user/base view"""
+    __slots__ = ('layer', 'type', 'name', 'size', 'permissions', 'created_at', 'modified_at', 'executable',
+                 'blob_id', 'lines')
+
+    def __init__(self, layer, type, name, size, permissions, created_at, modified_at, executable,
+                 blob_id=None, lines=0):
+        self.layer = layer
+        self.type = type
+        self.name = name
+        self.size = size or 0
+        self.permissions = permissions
+        self.created_at = created_at
+        self.modified_at = modified_at
+        self.executable = bool(executable)
+        self.blob_id = blob_id
+        self.lines = lines or 0
+
+    @property
+    def is_directory(self) -> bool:
+        return self.type == 'directory'
 
 class VirtualFilesystem:
-    def __init__(self, bot):
+    def __init__(self, bot, user_manager=None):
         self.bot = bot
+        self.user_manager = user_manager
         self.db_path = "Data/terminal_fs.db"
+        self.db = get_database(self.db_path)
         self.config_path = "Data/terminal_config.json"
-        self.config = self.load_config()
-
-    def load_config(self):
-        """Load configuration from JSON"""
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        settings = self.config['settings']
+        self.chunk_size = settings.get('file_chunk_size', DEFAULT_CHUNK_SIZE)
+        self.cache = MetadataCache(
+            settings.get('fs_cache_max_bytes', 4194304),
+            settings.get('fs_cache_max_entries_per_user', 256)
+        )
+        self.compression = settings.get('fs_compression', {})
+        self.chunk_cache = ChunkCache(self.compression.get('decompressed_cache_bytes', 8388608))
+
+    @property
+    def config(self):
+        """Current terminal configuration snapshot (read-only)"""
+        return CONFIG.get(self.config_path)
 
     async def setup_database(self):
-        """Initialize filesystem database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS filesystem (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    owner_id INTEGER NOT NULL,
-                    path TEXT NOT NULL,
-                    name TEXT NOT NULL,
-                    type TEXT NOT NULL,
-                    content TEXT,
-                    permissions TEXT DEFAULT 'rwxr-xr-x',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    modified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    size INTEGER DEFAULT 0,
-                    executable INTEGER DEFAULT 0,
-                    UNIQUE(owner_id, path)
+        """Initialize filesystem database (runs pending migrations once) and the shared base layer"""
+        await migrate(self.db_path)
+        await self.sync_base_layer()
+
+    def _base_layer_entries(self) -> dict:
+        """Desired base layer from default_filesystem: path -> (type, content, executable)"""
+        default_fs = self.config['default_filesystem']
+        entries = {}
+
+        def add_directory(path):
+            while path and path not in entries:
+                entries[path] = ('directory', None, 0)
+                path = self.parent_path(path)
+
+        add_directory('/home')
+        for directory in default_fs['directories']:
+            add_directory(self.normalize_path(directory))
+
+        for filepath, filedata in default_fs['files'].items():
+            content = filedata.get('content', '')
+            
+            if '{username}' in content:
+                continue
+            filepath = self.normalize_path(filepath)
+            add_directory(self.parent_path(filepath))
+            entries[filepath] = (filedata.get('type', 'file'), content, 1 if filedata.get('executable', False) else 0)
+
+        return entries
+
+    async def sync_base_layer(self):
+        """Make the shared read-only base layer match default_filesystem in the config"""
+        entries = self._base_layer_entries()
+
+        async with self.db.write() as db:
+            cursor = await db.execute("""
+                SELECT path, type, blob_id, permissions, executable FROM filesystem
+                WHERE owner_id = ?
+            """, (BASE_LAYER,))
+            existing = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+            changed = False
+
+            for path, (file_type, content, executable) in entries.items():
+                permissions = 'rwxr-xr-x' if file_type == 'directory' or executable else 'rw-r--r--'
+                blob_id = await self._store_blob(db, content)
+                if existing.get(path) == (file_type, blob_id, permissions, executable):
+                    continue
+
+                await db.execute("""
+                    INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT(owner_id, path) DO UPDATE SET
+                        type = excluded.type, blob_id = excluded.blob_id, size = excluded.size,
+                        permissions = excluded.permissions, executable = excluded.executable,
+                        modified_at = CURRENT_TIMESTAMP
+                """, (BASE_LAYER, path, self.parent_path(path), Path(path).name or '/', file_type,
+                      blob_id, len(content or ''), permissions, executable))
+                changed = True
+
+            stale = [(BASE_LAYER, path) for path in existing.keys() - entries.keys()]
+            if stale:
+                await db.executemany("DELETE FROM filesystem WHERE owner_id = ? AND path = ?", stale)
+                changed = True
+
+            if not changed:
+                return
+
+            
+            cursor = await db.execute("""
+                DELETE FROM filesystem WHERE id IN (
+                    SELECT u.id FROM filesystem u
+                    JOIN filesystem b ON b.owner_id = ? AND b.path = u.path
+                    WHERE u.owner_id != ? AND u.type = b.type AND u.blob_id IS b.blob_id
+                      AND u.permissions = b.permissions AND u.executable = b.executable
                 )
-            """)
-            await db.commit()
-            print("✅ Filesystem database initialized")
+            """, (BASE_LAYER, BASE_LAYER))
+            print(f"✅ Filesystem base layer updated ({len(entries)} entries, {max(cursor.rowcount, 0)} private copies merged)")
+
+        self.cache.clear()
+
+    @asynccontextmanager
+    async def _mutation(self, owner_id: int):
+        """Write unit on one user's layer; cached metadata of that user is not refilled until it is durable"""
+        self.cache.begin_write(owner_id)
+        try:
+            async with self.db.write() as db:
+                yield db
+        finally:
+            self.cache.end_write(owner_id)
+
+    def batch(self, owner_id: int):
+        """
+        Group every mutation the current task makes into one write unit:
+        `async with fs.batch(owner_id):` commits them together, an exception
+        rolls all of them back.
+        """
+        return self._mutation(owner_id)
 
     async def initialize_user_filesystem(self, discord_id: int, username: str):
-        """Create default filesystem structure for new user"""
-        default_dirs = self.config['default_filesystem']['directories']
+        """Create the home directory for a new user (shared defaults come from the base layer)"""
         default_files = self.config['default_filesystem']['files']
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._mutation(discord_id) as db:
             
             user_home = f"/home/{username}"
             await self.create_directory(discord_id, user_home, db)
@@ -53,15 +186,11 @@ class VirtualFilesystem:
                 await self.create_directory(discord_id, f"{user_home}/{subdir}", db)
 
             
-            for directory in default_dirs:
-                
-                if directory != "/home":
-                    await self.create_directory(discord_id, directory, db)
-
-            
             for filepath, filedata in default_files.items():
                 content = filedata.get('content', '')
-                
+                if '{username}' not in content:
+                    continue
+
                 content = content.replace('{username}', username)
 
                 file_type = filedata.get('type', 'file')
@@ -76,234 +205,707 @@ class VirtualFilesystem:
                     db=db
                 )
 
-            await db.commit()
             print(f"✅ Initialized filesystem for user {username}")
 
     async def create_directory(self, owner_id: int, path: str, db=None):
         """Create a directory"""
-        should_close = db is None
         if db is None:
-            db = await aiosqlite.connect(self.db_path)
-
-        try:
-            
-            path = self.normalize_path(path)
-            name = Path(path).name or '/'
-
-            
-            cursor = await db.execute(
-                "SELECT id FROM filesystem WHERE owner_id = ? AND path = ?",
-                (owner_id, path)
-            )
-            if await cursor.fetchone():
-                return False, "Directory already exists"
+            async with self._mutation(owner_id) as db:
+                return await self.create_directory(owner_id, path, db)
 
-            
-            await db.execute("""
-                INSERT INTO filesystem (owner_id, path, name, type, permissions)
-                VALUES (?, ?, ?, 'directory', 'rwxr-xr-x')
-            """, (owner_id, path, name))
+        path = self.normalize_path(path)
 
-            if should_close:
-                await db.commit()
+        error = await self._check_quota(db, owner_id, directories=1)
+        if error:
+            return False, error
 
-            return True, f"Directory created: {path}"
+        if not await self._insert_entry(db, owner_id, path, 'directory', permissions='rwxr-xr-x'):
+            return False, "Directory already exists"
 
-        finally:
-            if should_close:
-                await db.close()
+        return True, f"Directory created: {path}"
 
     async def create_file(self, owner_id: int, path: str, content: str = '', file_type: str = 'file', executable: int = 0, db=None):
         """Create a file"""
-        should_close = db is None
         if db is None:
-            db = await aiosqlite.connect(self.db_path)
+            async with self._mutation(owner_id) as db:
+                return await self.create_file(owner_id, path, content, file_type, executable, db)
 
-        try:
-            path = self.normalize_path(path)
-            name = Path(path).name
-            size = len(content)
-
-            
-            cursor = await db.execute(
-                "SELECT id FROM filesystem WHERE owner_id = ? AND path = ?",
-                (owner_id, path)
+        path = self.normalize_path(path)
+        size = len(content)
+
+        error = await self._check_quota(db, owner_id, files=1, size=size)
+        if error:
+            return False, error
+
+        permissions = 'rwxr-xr-x' if executable else 'rw-r--r--'
+        blob_id = await self._store_blob(db, content)
+
+        if not await self._insert_entry(db, owner_id, path, file_type, blob_id, size, permissions, executable):
+            return False, "File already exists"
+
+        return True, f"File created: {path}"
+
+    async def _insert_entry(self, db, owner_id: int, path: str, file_type: str, blob_id: int = None,
+                            size: int = 0, permissions: str = 'rw-r--r--', executable: int = 0) -> bool:
+        """
+        Insert an entry into the user's layer unless the path is visible already.
+        A whiteout at the path is replaced in place. Returns: whether it was created
+        """
+        self.cache.invalidate(owner_id, path)
+        cursor = await db.execute(f"""
+            INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable)
+            SELECT :owner_id, :path, :parent, :name, :type, :blob_id, :size, :permissions, :executable
+            WHERE NOT EXISTS (SELECT 1 FROM filesystem f WHERE f.path = :path AND {VISIBLE})
+            ON CONFLICT(owner_id, path) DO UPDATE SET
+                type = excluded.type, blob_id = excluded.blob_id, size = excluded.size,
+                permissions = excluded.permissions, executable = excluded.executable,
+                created_at = CURRENT_TIMESTAMP, modified_at = CURRENT_TIMESTAMP
+            WHERE filesystem.type = 'whiteout'
+            RETURNING id
+        """, {'owner_id': owner_id, 'path': path, 'parent': self.parent_path(path), 'name': Path(path).name or '/',
+              'type': file_type, 'blob_id': blob_id, 'size': size, 'permissions': permissions, 'executable': executable})
+        return await cursor.fetchone() is not None
+
+    async def _lookup(self, db, owner_id: int, path: str, columns: str = "f.id"):
+        """
+        Visible row for a path: the user's layer wins over the base layer,
+        a whiteout hides the path. Returns (layer, type, *columns) or None.
+        """
+        cursor = await db.execute(f"""
+            SELECT f.owner_id, f.type, {columns} FROM filesystem f
+            LEFT JOIN blobs b ON b.id = f.blob_id
+            WHERE f.owner_id IN (?, ?) AND f.path = ?
+            ORDER BY f.owner_id = ?
+            LIMIT 1
+        """, (owner_id, BASE_LAYER, path, BASE_LAYER))
+        result = await cursor.fetchone()
+
+        if not result or result[1] == 'whiteout':
+            return None
+        return result
+
+    async def stat(self, owner_id: int, path: str):
+        """Visible entry for a path as a FileStat, or None (cached per user)"""
+        path = self.normalize_path(path)
+        key = ('stat', path)
+        result = self.cache.get(owner_id, key)
+        if result is not MISSING:
+            return result
+
+        token = self.cache.token()
+        async with self.db.read() as db:
+            result = await self._lookup(db, owner_id, path, STAT_COLUMNS)
+
+        result = FileStat(*result) if result else None
+        self.cache.put(owner_id, key, result, token)
+        return result
+
+    async def _store_blob(self, db, content: str):
+        """Return the blob id holding content, chunking it in if new (None for empty content)"""
+        if not content:
+            return None
+
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()
+        cursor = await db.execute("SELECT id FROM blobs WHERE hash = ?", (digest,))
+        result = await cursor.fetchone()
+        if result is not None:
+            return result[0]
+
+        chunks = split_chunks(content, self.chunk_size)
+        codec = self._choose_codec(len(content), chunks[0][2])
+        cursor = await db.execute("""
+            INSERT INTO blobs (hash, size, lines, codec) VALUES (?, ?, ?, ?)
+            RETURNING id
+        """, (digest, len(content), count_lines(content), codec))
+        result = await cursor.fetchone()
+
+        await self._insert_chunks(db, result[0], chunks, codec)
+        return result[0]
+
+    def _choose_codec(self, size: int, sample: str) -> str:
+        """Codec for a new blob: RAW up to the compression threshold, else the best one for a sample chunk"""
+        if not self.compression.get('enabled', True) or size <= self.compression.get('threshold_chars', 4096):
+            return RAW
+        return choose_codec(sample, self.compression.get('codecs', CODECS), self.compression.get('min_saving', 0.1))
+
+    async def _insert_chunks(self, db, blob_id: int, chunks: list, codec: str = RAW):
+        """Append (offset, line, data) chunks to a blob, compressing them with codec"""
+        if chunks:
+            await db.executemany(
+                "INSERT INTO blob_chunks (blob_id, offset, line, data) VALUES (?, ?, ?, ?)",
+                [(blob_id, offset, line, data if codec == RAW else compress(data, codec))
+                 for offset, line, data in chunks]
             )
-            if await cursor.fetchone():
-                return False, "File already exists"
 
-            permissions = 'rwxr-xr-x' if executable else 'rw-r--r--'
+    async def compress_blobs(self, batch_size: int = 20) -> tuple[int, int]:
+        """
+        Background migration: pick a codec for blobs stored before compression
+        existed and rewrite their chunks in place, batch_size blobs per write unit.
+        The full-text index is left alone since a chunk's text does not change.
+        Returns: (blobs compressed, bytes saved)
+        """
+        compressed = saved = 0
+        while True:
+            async with self.db.write() as db:
+                cursor = await db.execute("""
+                    SELECT b.id, b.size, (SELECT data FROM blob_chunks WHERE blob_id = b.id ORDER BY offset LIMIT 1)
+                    FROM blobs b WHERE b.codec IS NULL LIMIT ?
+                """, (batch_size,))
+                rows = await cursor.fetchall()
+
+                for blob_id, size, sample in rows:
+                    codec = self._choose_codec(size, sample) if isinstance(sample, str) else RAW
+                    if codec != RAW:
+                        cursor = await db.execute("""
+                            SELECT id, data FROM blob_chunks WHERE blob_id = ? AND typeof(data) = 'text'
+                        """, (blob_id,))
+                        chunks = [(chunk_id, data, compress(data, codec)) for chunk_id, data in await cursor.fetchall()]
+                        await db.executemany("UPDATE blob_chunks SET data = ? WHERE id = ?",
+                                             [(packed, chunk_id) for chunk_id, _, packed in chunks])
+                        compressed += 1
+                        saved += sum(len(data.encode('utf-8')) - len(packed) for _, data, packed in chunks)
+
+                    await db.execute("UPDATE blobs SET codec = ? WHERE id = ?", (codec, blob_id))
+
+            if len(rows) < batch_size:
+                return compressed, saved
+
+    async def collect_garbage(self, batch_size: int = 500) -> int:
+        """Delete blobs no file references any more. Returns: number of blobs removed"""
+        removed = 0
+        while True:
+            async with self.db.write() as db:
+                cursor = await db.execute("""
+                    DELETE FROM blobs WHERE id IN (
+                        SELECT id FROM blobs WHERE refcount <= 0 LIMIT ?
+                    )
+                """, (batch_size,))
+                deleted = cursor.rowcount
+
+            removed += max(deleted, 0)
+            if deleted < batch_size:
+                return removed
+
+    async def _open_blob(self, owner_id: int, path: str):
+        """(FileStat, None) for a readable file, or (None, error message)"""
+        path = self.normalize_path(path)
+        info = await self.stat(owner_id, path)
 
-            await db.execute("""
-                INSERT INTO filesystem (owner_id, path, name, type, content, size, permissions, executable)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            """, (owner_id, path, name, file_type, content, size, permissions, executable))
+        if not info:
+            return None, f"File not found: {path}"
 
-            if should_close:
-                await db.commit()
+        if info.is_directory:
+            return None, f"{path} is a directory"
 
-            return True, f"File created: {path}"
-
-        finally:
-            if should_close:
-                await db.close()
+        return info, None
 
     async def read_file(self, owner_id: int, path: str) -> tuple[bool, str]:
-        """Read file content"""
-        path = self.normalize_path(path)
+        """Read the whole file content (prefer read_range/read_lines for display)"""
+        info, error = await self._open_blob(owner_id, path)
+        if error:
+            return False, error
+
+        if info.blob_id is None:
+            return True, ''
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
-                SELECT type, content, executable FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
+                SELECT data FROM blob_chunks WHERE blob_id = ? ORDER BY offset
+            """, (info.blob_id,))
+            return True, ''.join(self.chunk_cache.inflate(row[0]) for row in await cursor.fetchall())
+
+    async def read_range(self, owner_id: int, path: str, offset: int = 0, length: int = None) -> tuple[bool, str]:
+        """Read length characters starting at offset, fetching only the chunks that overlap them"""
+        info, error = await self._open_blob(owner_id, path)
+        if error:
+            return False, error
+
+        offset = max(0, offset)
+        end = info.size if length is None else min(info.size, offset + length)
+        if info.blob_id is None or offset >= end:
+            return True, ''
+
+        async with self.db.read() as db:
+            cursor = await db.execute("""
+                SELECT offset, data FROM blob_chunks
+                WHERE blob_id = :blob AND offset < :end AND offset >= (
+                    SELECT MAX(offset) FROM blob_chunks WHERE blob_id = :blob AND offset <= :start
+                )
+                ORDER BY offset
+            """, {'blob': info.blob_id, 'start': offset, 'end': end})
+            rows = await cursor.fetchall()
+
+        if not rows:
+            return True, ''
+
+        text = ''.join(self.chunk_cache.inflate(data) for _, data in rows)
+        start = offset - rows[0][0]
+        return True, text[start:start + end - offset]
+
+    async def read_lines(self, owner_id: int, path: str, start: int = 0, count: int = None) -> tuple[bool, tuple]:
+        """
+        Read count lines from line start (0-based, negative counts from the end),
+        streaming chunks until enough lines are collected.
+        Returns: (success, (lines, first line number, total lines)) or (False, error)
+        """
+        info, error = await self._open_blob(owner_id, path)
+        if error:
+            return False, error
+
+        total = info.lines
+        if start < 0:
+            start = max(0, total + start)
+        if info.blob_id is None or start >= total or count == 0:
+            return True, ([], start, total)
+
+        lines = []
+        async with self.db.read() as db:
+            async with db.execute("""
+                SELECT line, data FROM blob_chunks
+                WHERE blob_id = :blob AND offset >= (
+                    SELECT MIN(offset) FROM blob_chunks WHERE blob_id = :blob AND line = (
+                        SELECT MAX(line) FROM blob_chunks WHERE blob_id = :blob AND line <= :start
+                    )
+                )
+                ORDER BY offset
+            """, {'blob': info.blob_id, 'start': start}) as cursor:
+                buffer = ''
+                line_no = None
+                async for line, data in cursor:
+                    if line_no is None:
+                        line_no = line
+
+                    parts = (buffer + self.chunk_cache.inflate(data)).split('\n')
+                    buffer = parts.pop()
+                    for part in parts:
+                        if line_no >= start:
+                            lines.append(part)
+                        line_no += 1
+
+                    if count is not None and len(lines) >= count:
+                        break
+                else:
+                    if buffer and line_no >= start:
+                        lines.append(buffer)
 
-            if not result:
-                return False, f"File not found: {path}"
+        if count is not None:
+            lines = lines[:count]
+        return True, (lines, start, total)
 
-            file_type, content, executable = result
+    async def write_file(self, owner_id: int, path: str, content: str, create: bool = False) -> tuple[bool, str]:
+        """Write content to file (create=True also creates a missing file) with one upsert into the user's layer"""
+        path = self.normalize_path(path)
+        size = len(content)
+
+        async with self._mutation(owner_id) as db:
+            info = await self.stat(owner_id, path)
 
-            if file_type == 'directory':
+            if info is None and not create:
+                return False, f"File not found: {path}"
+
+            if info is not None and info.is_directory:
                 return False, f"{path} is a directory"
 
-            return True, content or ''
+            if info is not None and info.layer == owner_id:
+                error = await self._check_quota(db, owner_id, size=size - info.size)
+            else:
+                error = await self._check_quota(db, owner_id, files=1, size=size)
+            if error:
+                return False, error
+
+            blob_id = await self._store_blob(db, content)
+            if not await self._put_file(db, owner_id, path, blob_id, size, create):
+                return False, f"File not found: {path}"
+
+            return True, f"File {'updated' if info else 'created'}: {path}"
+
+    async def _put_file(self, db, owner_id: int, path: str, blob_id: int, size: int, create: bool) -> bool:
+        """
+        Point the user's copy of a file at a blob with one upsert (copying up
+        from the base layer, or creating the file if create is set).
+        Returns: False if the path is a directory or missing without create
+        """
+        self.cache.invalidate(owner_id, path)
 
-    async def write_file(self, owner_id: int, path: str, content: str) -> tuple[bool, str]:
-        """Write content to file"""
+        
+        cursor = await db.execute(f"""
+            INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable, modified_at)
+            SELECT :owner_id, :path, :parent, :name, COALESCE(f.type, 'file'), :blob_id, :size,
+                   COALESCE(f.permissions, 'rw-r--r--'), COALESCE(f.executable, 0), :now
+            FROM (SELECT 1) LEFT JOIN filesystem f ON f.path = :path AND {VISIBLE}
+            WHERE COALESCE(f.type, 'file') != 'directory' AND (f.id IS NOT NULL OR :create)
+            ON CONFLICT(owner_id, path) DO UPDATE SET
+                type = excluded.type, blob_id = excluded.blob_id, size = excluded.size,
+                permissions = excluded.permissions, executable = excluded.executable,
+                modified_at = excluded.modified_at,
+                created_at = CASE WHEN filesystem.type = 'whiteout' THEN excluded.created_at ELSE filesystem.created_at END
+            RETURNING id
+        """, {'owner_id': owner_id, 'path': path, 'parent': self.parent_path(path), 'name': Path(path).name,
+              'blob_id': blob_id, 'size': size, 'now': datetime.now(), 'create': create})
+
+        return await cursor.fetchone() is not None
+
+    async def write_stream(self, owner_id: int, path: str, source, read_size: int = 65536) -> tuple[bool, str]:
+        """
+        Create or replace a file from a binary UTF-8 file object in bounded memory.
+        Chunks are inserted as they are decoded; the quota is checked against the
+        real size before the unit commits and the whole write is rolled back if it fails.
+        """
         path = self.normalize_path(path)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT type FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
+        try:
+            async with self._mutation(owner_id) as db:
+                info = await self.stat(owner_id, path)
+                if info is not None and info.is_directory:
+                    return False, f"{path} is a directory"
 
-            if not result:
-                return False, f"File not found: {path}"
+                blob_id, size = await self._store_stream(db, source, read_size)
 
-            if result[0] == 'directory':
-                return False, f"{path} is a directory"
+                if info is not None and info.layer == owner_id:
+                    error = await self._check_quota(db, owner_id, size=size - info.size)
+                else:
+                    error = await self._check_quota(db, owner_id, files=1, size=size)
+                if error:
+                    raise FilesystemError(error)
+
+                await self._put_file(db, owner_id, path, blob_id, size, create=True)
+                return True, f"File {'updated' if info else 'created'}: {path} ({size:,} characters)"
+        except FilesystemError as e:
+            return False, str(e)
+
+    async def _store_stream(self, db, source, read_size: int = 65536) -> tuple:
+        """
+        Streaming counterpart of _store_blob: chunk a binary UTF-8 file object
+        into a provisional blob, then dedupe it by hash once the content is known.
+        Returns: (blob id or None for empty content, size)
+        Raises: FilesystemError if the content is not UTF-8 text
+        """
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        splitter = ChunkSplitter(self.chunk_size)
+        hasher = hashlib.sha256()
+
+        cursor = await db.execute("""
+            INSERT INTO blobs (hash, size, lines) VALUES (?, 0, 0) RETURNING id
+        """, (f"pending:{secrets.token_hex(8)}",))
+        blob_id = (await cursor.fetchone())[0]
 
-            size = len(content)
-            await db.execute("""
-                UPDATE filesystem
-                SET content = ?, size = ?, modified_at = ?
-                WHERE owner_id = ? AND path = ?
-            """, (content, size, datetime.now(), owner_id, path))
-            await db.commit()
+        
+        threshold = self.compression.get('threshold_chars', 4096)
+        codec = None
+        held = []
+        while True:
+            data = source.read(read_size)
+            try:
+                text = decoder.decode(data, final=not data)
+            except UnicodeDecodeError:
+                raise FilesystemError("Only UTF-8 text files can be stored")
+
+            hasher.update(data)
+            held += splitter.feed(text)
+            if codec is None and held and held[-1][0] + len(held[-1][2]) > threshold:
+                codec = self._choose_codec(held[-1][0] + len(held[-1][2]), held[0][2])
+            if codec is not None:
+                await self._insert_chunks(db, blob_id, held, codec)
+                held = []
+            if not data:
+                break
+
+        held += splitter.finish()
+        size = splitter.offset
+        if codec is None:
+            codec = self._choose_codec(size, held[0][2]) if held else RAW
+        await self._insert_chunks(db, blob_id, held, codec)
+
+        cursor = await db.execute("SELECT id FROM blobs WHERE hash = ?", (hasher.hexdigest(),))
+        existing = await cursor.fetchone()
+        if existing or not size:
+            await db.execute("DELETE FROM blobs WHERE id = ?", (blob_id,))
+            return (existing[0] if existing else None), size
+
+        await db.execute("""
+            UPDATE blobs SET hash = ?, size = ?, lines = ?, codec = ? WHERE id = ?
+        """, (hasher.hexdigest(), size, splitter.lines, codec, blob_id))
+        return blob_id, size
+
+    async def iter_chunks(self, owner_id: int, path: str):
+        """Yield a file's content chunk by chunk (raises FilesystemError if it is not a readable file)"""
+        info, error = await self._open_blob(owner_id, path)
+        if error:
+            raise FilesystemError(error)
+        if info.blob_id is None:
+            return
+
+        async with self.db.read() as db:
+            async for data in self._iter_blob(db, info.blob_id):
+                yield data
+
+    async def _iter_blob(self, db, blob_id: int):
+        """Yield a blob's text chunk by chunk on the given connection"""
+        if blob_id is None:
+            return
+
+        async with db.execute("""
+            SELECT data FROM blob_chunks WHERE blob_id = ? ORDER BY offset
+        """, (blob_id,)) as cursor:
+            async for (data,) in cursor:
+                yield self.chunk_cache.inflate(data)
+
+    async def iter_layer(self, owner_id: int):
+        """
+        Yield (path, FileStat, chunks) for every row of the user's own layer,
+        whiteouts included, parents before children. chunks is an async iterator
+        over the file's text read from the same snapshot; consume it before the next row.
+        """
+        async with self.db.read() as db:
+            async with db.execute(f"""
+                SELECT f.path, f.owner_id, f.type, {STAT_COLUMNS} FROM filesystem f
+                LEFT JOIN blobs b ON b.id = f.blob_id
+                WHERE f.owner_id = ?
+                ORDER BY f.path
+            """, (owner_id,)) as cursor:
+                async for path, *row in cursor:
+                    info = FileStat(*row)
+                    yield path, info, self._iter_blob(db, info.blob_id)
+
+    async def import_layer(self, owner_id: int, entries, batch_size: int = 500) -> tuple[bool, str]:
+        """
+        Replace the user's own layer with entries in one write unit, rolled back
+        as a whole on any error. entries yields (path, type, permissions, executable,
+        created_at, modified_at, source) with parents first; source is a binary
+        file object for content entries (every type but directory and whiteout,
+        e.g. file or app) and None otherwise. Quotas are not applied.
+        """
+        seen = set()
+        directories = set()
+        rows = []
 
-            return True, f"File updated: {path}"
+        try:
+            async with self._mutation(owner_id) as db:
+                await db.execute("DELETE FROM filesystem WHERE owner_id = ?", (owner_id,))
+                self.cache.invalidate(owner_id, '/', subtree=True)
+
+                for path, file_type, permissions, executable, created_at, modified_at, source in entries:
+                    path = self.normalize_path(path)
+                    parent = self.parent_path(path)
+                    if path == '/' or path in seen or not file_type.isalnum():
+                        raise FilesystemError(f"Invalid archive entry: {path}")
+                    seen.add(path)
+
+                    
+                    if file_type != 'whiteout' and parent != '/' and parent not in directories:
+                        result = await self._lookup(db, owner_id, parent)
+                        if result is None or result[1] != 'directory':
+                            raise FilesystemError(f"Parent directory missing for {path}")
+
+                    blob_id, size = None, 0
+                    if file_type == 'directory':
+                        directories.add(path)
+                    elif file_type != 'whiteout' and source is not None:
+                        blob_id, size = await self._store_stream(db, source)
+
+                    rows.append((owner_id, path, parent, Path(path).name, file_type, blob_id, size,
+                                 permissions, int(executable), created_at, modified_at))
+                    if len(rows) >= batch_size:
+                        await self._insert_rows(db, rows)
+                        rows = []
+
+                await self._insert_rows(db, rows)
+        except FilesystemError as e:
+            return False, str(e)
+
+        return True, f"Imported {len(seen)} entries"
+
+    async def _insert_rows(self, db, rows: list):
+        """Bulk insert complete filesystem rows"""
+        if rows:
+            await db.executemany("""
+                INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size,
+                                        permissions, executable, created_at, modified_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, rows)
 
     async def list_directory(self, owner_id: int, path: str, show_all: bool = False) -> tuple[bool, list]:
-        """List directory contents"""
+        """List directory contents (user layer merged over the base layer)"""
         path = self.normalize_path(path)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            cursor = await db.execute("""
-                SELECT type FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
+        
+        info = await self.stat(owner_id, path)
 
-            if not result:
-                return False, f"Directory not found: {path}"
+        if not info:
+            return False, f"Directory not found: {path}"
 
-            if result[0] != 'directory':
-                return False, f"{path} is not a directory"
+        if not info.is_directory:
+            return False, f"{path} is not a directory"
 
-            
-            search_pattern = f"{path}/%"
-            if path == '/':
-                search_pattern = '/%'
+        key = ('list', path)
+        entries = self.cache.get(owner_id, key)
+        if entries is MISSING:
+            token = self.cache.token()
+            async with self.db.read() as db:
+                
+                cursor = await db.execute(f"""
+                    SELECT f.name, f.type, f.size, f.permissions, f.modified_at, f.executable
+                    FROM filesystem f
+                    WHERE f.parent_path = :path AND {VISIBLE}
+                    ORDER BY f.type DESC, f.name ASC
+                """, {'owner_id': owner_id, 'path': path})
 
-            cursor = await db.execute("""
-                SELECT name, type, size, permissions, modified_at, executable
-                FROM filesystem
-                WHERE owner_id = ? AND path LIKE ? AND path NOT LIKE ?
-                ORDER BY type DESC, name ASC
-            """, (owner_id, search_pattern, search_pattern.replace('%', '%/%')))
+                entries = tuple(await cursor.fetchall())
+            self.cache.put(owner_id, key, entries, token)
 
-            entries = await cursor.fetchall()
+        
+        if not show_all:
+            return True, [e for e in entries if not e[0].startswith('.')]
+
+        return True, list(entries)
+
+    async def subtree(self, owner_id: int, path: str, max_depth: int = None, max_entries: int = None) -> tuple[bool, dict]:
+        """
+        Load a whole subtree with one indexed range query.
+        Returns: (success, {'path', 'type', 'size', 'children', 'count', 'truncated'})
+        where children maps each directory path to its sorted entries
+        (path, name, type, size, permissions, modified_at, executable).
+        """
+        path = self.normalize_path(path)
+        lower, upper = self._subtree_bounds(path)
+        base_depth = lower.count('/')
+
+        async with self.db.read() as db:
+            result = await self._lookup(db, owner_id, path, "f.size")
+            if result:
+                result = result[1:]
+
+            query = f"""
+                SELECT f.path, f.name, f.type, f.size, f.permissions, f.modified_at, f.executable
+                FROM filesystem f
+                WHERE f.path > :lower AND f.path < :upper AND {VISIBLE}
+            """
+            params = {'owner_id': owner_id, 'lower': lower, 'upper': upper}
 
-            
+            if max_depth is not None:
+                query += " AND length(f.path) - length(replace(f.path, '/', '')) < :depth"
+                params['depth'] = base_depth + max_depth
+
+            query += " ORDER BY f.path"
+            if max_entries is not None:
+                query += " LIMIT :limit"
+                params['limit'] = max_entries + 1
+
+            cursor = await db.execute(query, params)
+            rows = await cursor.fetchall()
+
+        
+        if not result:
+            if not rows and path != '/':
+                return False, f"No such file or directory: {path}"
+            result = ('directory', 0)
+
+        truncated = max_entries is not None and len(rows) > max_entries
+        if truncated:
+            rows = rows[:max_entries]
+
+        children = {}
+        directories = {path}
+        for row in rows:
+            children.setdefault(self.parent_path(row[0]), []).append(row)
+            if row[2] == 'directory':
+                directories.add(row[0])
+
+        
+        for parent in list(children):
+            while parent not in directories:
+                directories.add(parent)
+                children.setdefault(self.parent_path(parent), []).append(
+                    (parent, Path(parent).name, 'directory', 0, 'rwxr-xr-x', None, 0)
+                )
+                parent = self.parent_path(parent)
+
+        for entries in children.values():
+            entries.sort(key=lambda e: (e[2] != 'directory', e[1]))
+
+        return True, {
+            'path': path,
+            'type': result[0],
+            'size': result[1] or 0,
+            'children': children,
+            'count': len(rows),
+            'truncated': truncated
+        }
+
+    async def walk(self, owner_id: int, path: str, max_depth: int = None, max_entries: int = None, show_all: bool = True):
+        """Top-down (dirpath, dirs, files) walk over one subtree() query, like os.walk"""
+        success, tree = await self.subtree(owner_id, path, max_depth, max_entries)
+        if not success or tree['type'] != 'directory':
+            return
+
+        children = tree['children']
+        stack = [tree['path']]
+        while stack:
+            dirpath = stack.pop()
+            entries = children.get(dirpath, [])
             if not show_all:
-                entries = [e for e in entries if not e[0].startswith('.')]
+                entries = [e for e in entries if not e[1].startswith('.')]
+
+            dirs = [e for e in entries if e[2] == 'directory']
+            files = [e for e in entries if e[2] != 'directory']
+            yield dirpath, dirs, files
 
-            return True, entries
+            stack.extend(e[0] for e in reversed(dirs))
 
     async def remove_item(self, owner_id: int, path: str, recursive: bool = False) -> tuple[bool, str]:
-        """Remove file or directory"""
+        """Remove file or directory (base layer entries are hidden with whiteouts)"""
         path = self.normalize_path(path)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT type FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
+        async with self._mutation(owner_id) as db:
+            info = await self.stat(owner_id, path)
 
-            if not result:
+            if not info:
                 return False, f"No such file or directory: {path}"
 
-            item_type = result[0]
-
             
-            if item_type == 'directory':
-                cursor = await db.execute("""
-                    SELECT COUNT(*) FROM filesystem
-                    WHERE owner_id = ? AND path LIKE ?
-                """, (owner_id, f"{path}/%"))
-                count = (await cursor.fetchone())[0]
+            if not await self._remove_tree(db, owner_id, path, only_if_empty=info.is_directory and not recursive):
+                return False, f"Directory not empty. Use 'rm -r' to remove recursively"
 
-                if count > 0 and not recursive:
-                    return False, f"Directory not empty. Use 'rm -r' to remove recursively"
+            return True, f"Removed: {path}"
 
-                
-                if recursive:
-                    await db.execute("""
-                        DELETE FROM filesystem
-                        WHERE owner_id = ? AND (path = ? OR path LIKE ?)
-                    """, (owner_id, path, f"{path}/%"))
-                else:
-                    await db.execute("""
-                        DELETE FROM filesystem
-                        WHERE owner_id = ? AND path = ?
-                    """, (owner_id, path))
-            else:
-                
-                await db.execute("""
-                    DELETE FROM filesystem
-                    WHERE owner_id = ? AND path = ?
-                """, (owner_id, path))
+    async def _remove_tree(self, db, owner_id: int, path: str, only_if_empty: bool = False) -> bool:
+        """
+        Delete a path and its descendants from the user's layer and white out the base layer below it.
+        With only_if_empty nothing happens if the path has visible children. Returns: whether anything changed
+        """
+        lower, upper = self._subtree_bounds(path)
+        params = {'owner_id': owner_id, 'base': BASE_LAYER, 'path': path, 'lower': lower, 'upper': upper}
+        self.cache.invalidate(owner_id, path, subtree=True)
+
+        if only_if_empty:
+            scope = f"""path = :path AND NOT EXISTS (
+                SELECT 1 FROM filesystem f WHERE f.parent_path = :path AND {VISIBLE}
+            )"""
+        else:
+            scope = "(path = :path OR (path > :lower AND path < :upper))"
 
-            await db.commit()
-            return True, f"Removed: {path}"
+        deleted = await db.execute(f"""
+            DELETE FROM filesystem
+            WHERE owner_id = :owner_id AND {scope}
+        """, params)
+
+        inserted = await db.execute(f"""
+            INSERT INTO filesystem (owner_id, path, parent_path, name, type, permissions)
+            SELECT :owner_id, path, parent_path, name, 'whiteout', '---------'
+            FROM filesystem
+            WHERE owner_id = :base AND {scope}
+        """, params)
+
+        return deleted.rowcount > 0 or inserted.rowcount > 0
 
     async def path_exists(self, owner_id: int, path: str) -> bool:
         """Check if path exists"""
-        path = self.normalize_path(path)
-
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT id FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            return bool(await cursor.fetchone())
+        return await self.stat(owner_id, path) is not None
 
     async def is_directory(self, owner_id: int, path: str) -> bool:
         """Check if path is a directory"""
-        path = self.normalize_path(path)
-
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT type FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
-            return result and result[0] == 'directory'
+        info = await self.stat(owner_id, path)
+        return info is not None and info.is_directory
 
     def normalize_path(self, path: str) -> str:
         """Normalize filesystem path"""
@@ -327,6 +929,12 @@ class VirtualFilesystem:
 
         return '/' + '/'.join(parts) if parts else '/'
 
+    def parent_path(self, path: str):
+        """Parent directory of a normalized path (None for the root)"""
+        if path == '/':
+            return None
+        return path.rsplit('/', 1)[0] or '/'
+
     def resolve_path(self, current_dir: str, target_path: str) -> str:
         """Resolve relative or absolute path"""
         if target_path.startswith('/'):
@@ -339,185 +947,270 @@ class VirtualFilesystem:
 
     async def get_file_info(self, owner_id: int, path: str) -> dict:
         """Get detailed file information"""
-        path = self.normalize_path(path)
+        info = await self.stat(owner_id, path)
+
+        if not info:
+            return None
+
+        return {
+            'name': info.name,
+            'type': info.type,
+            'size': info.size,
+            'permissions': info.permissions,
+            'created_at': info.created_at,
+            'modified_at': info.modified_at,
+            'executable': info.executable
+        }
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT name, type, size, permissions, created_at, modified_at, executable
-                FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
-            result = await cursor.fetchone()
-
-            if not result:
-                return None
-
-            return {
-                'name': result[0],
-                'type': result[1],
-                'size': result[2],
-                'permissions': result[3],
-                'created_at': result[4],
-                'modified_at': result[5],
-                'executable': bool(result[6])
-            }
-
-    async def move_item(self, owner_id: int, source: str, destination: str) -> tuple[bool, str]:
-        """Move or rename file/directory"""
+    def _subtree_bounds(self, path: str) -> tuple[str, str]:
+        """Exclusive (lower, upper) path bounds matching every descendant of path"""
+        prefix = '/' if path == '/' else f"{path}/"
+        return prefix, prefix[:-1] + '0'
+
+    async def _tree_operation_check(self, db, owner_id: int, source: str, destination: str, copy: bool) -> tuple[int, str]:
+        """
+        Shared mv/cp validation, including the quota for the entries that
+        end up new in the user's layer (all of them for cp, base layer
+        entries for mv). Returns (descendant count, error or None)
+        """
+        if destination == source or destination.startswith(source.rstrip('/') + '/'):
+            return 0, f"Cannot place {source} inside itself"
+
+        lower, upper = self._subtree_bounds(destination)
+        cursor = await db.execute(f"""
+            SELECT 1 FROM filesystem f
+            WHERE (f.path = :path OR (f.path > :lower AND f.path < :upper)) AND {VISIBLE}
+            LIMIT 1
+        """, {'owner_id': owner_id, 'path': destination, 'lower': lower, 'upper': upper})
+        if await cursor.fetchone():
+            return 0, f"Destination already exists: {destination}"
+
+        lower, upper = self._subtree_bounds(source)
+        cursor = await db.execute(f"""
+            SELECT COUNT(*) - 1,
+                   TOTAL(f.type != 'directory' AND (:copy OR f.owner_id = :base)),
+                   TOTAL(f.type = 'directory' AND (:copy OR f.owner_id = :base)),
+                   TOTAL(CASE WHEN f.type != 'directory' AND (:copy OR f.owner_id = :base) THEN f.size END)
+            FROM filesystem f
+            WHERE (f.path = :path OR (f.path > :lower AND f.path < :upper)) AND {VISIBLE}
+        """, {'owner_id': owner_id, 'base': BASE_LAYER, 'copy': copy, 'path': source, 'lower': lower, 'upper': upper})
+        count, files, directories, size = await cursor.fetchone()
+
+        limit = self.config['settings'].get('tree_operation_max_entries', 50000)
+        if count > limit:
+            return count, f"{source} contains {count} entries (limit is {limit})"
+
+        error = await self._check_quota(db, owner_id, int(files), int(directories), int(size))
+        return count, error
+
+    def _tree_params(self, owner_id: int, source: str, destination: str) -> dict:
+        """Named parameters shared by the set-based mv/cp statements"""
+        lower, upper = self._subtree_bounds(source)
+        dest_lower, dest_upper = self._subtree_bounds(destination)
+        return {
+            'owner_id': owner_id, 'source': source, 'destination': destination,
+            'parent': self.parent_path(destination), 'name': Path(destination).name,
+            'cut': len(source) + 1, 'dest_cut': len(destination) + 1,
+            'lower': lower, 'upper': upper, 'dest_lower': dest_lower, 'dest_upper': dest_upper,
+            'chunk_size': self.config['settings'].get('tree_operation_chunk_size', 5000)
+        }
+
+    async def _clear_tree_whiteouts(self, db, params: dict):
+        """Drop the user's whiteouts at destination paths that source entries are about to occupy"""
+        await db.execute(f"""
+            DELETE FROM filesystem
+            WHERE owner_id = :owner_id AND type = 'whiteout'
+              AND (path = :destination OR (path > :dest_lower AND path < :dest_upper))
+              AND :source || substr(path, :dest_cut) IN (
+                  SELECT f.path FROM filesystem f
+                  WHERE (f.path = :source OR (f.path > :lower AND f.path < :upper)) AND {VISIBLE}
+              )
+        """, params)
+
+    async def _copy_tree(self, db, params: dict, count: int, progress=None):
+        """Copy the visible entry at source and its descendants into the user's layer at destination"""
+        await db.execute(f"""
+            INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable)
+            SELECT :owner_id, :destination, :parent, :name, f.type, f.blob_id, f.size, f.permissions, f.executable
+            FROM filesystem f
+            WHERE f.path = :source AND {VISIBLE}
+        """, params)
+
+        params = {**params, 'after': 0}
+        copied = 0
+
+        while copied < count:
+            cursor = await db.execute(f"""
+                SELECT MAX(id), COUNT(*) FROM (
+                    SELECT f.id FROM filesystem f
+                    WHERE f.path > :lower AND f.path < :upper AND {VISIBLE} AND f.id > :after
+                    ORDER BY f.id LIMIT :chunk_size
+                )
+            """, params)
+            until, rows = await cursor.fetchone()
+            if not rows:
+                break
+
+            await db.execute(f"""
+                INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable)
+                SELECT :owner_id, :destination || substr(f.path, :cut), :destination || substr(f.parent_path, :cut),
+                       f.name, f.type, f.blob_id, f.size, f.permissions, f.executable
+                FROM filesystem f
+                WHERE f.path > :lower AND f.path < :upper AND {VISIBLE} AND f.id > :after AND f.id <= :until
+            """, {**params, 'until': until})
+            params['after'] = until
+            copied += rows
+
+            if progress and count > params['chunk_size']:
+                await progress(copied, count)
+
+    async def move_item(self, owner_id: int, source: str, destination: str, progress=None) -> tuple[bool, str]:
+        """
+        Move or rename file/directory.
+        Descendants are rewritten with set-based UPDATEs in one transaction;
+        progress(done, total) is awaited between chunks of large trees.
+        """
         source = self.normalize_path(source)
         destination = self.normalize_path(destination)
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._mutation(owner_id) as db:
             
-            cursor = await db.execute("""
-                SELECT type FROM filesystem WHERE owner_id = ? AND path = ?
-            """, (owner_id, source))
-            source_data = await cursor.fetchone()
+            source_info = await self.stat(owner_id, source)
 
-            if not source_data:
+            if not source_info:
                 return False, f"Source not found: {source}"
 
+            count, error = await self._tree_operation_check(db, owner_id, source, destination, copy=False)
+            if error:
+                return False, error
+
+            params = self._tree_params(owner_id, source, destination)
+            self.cache.invalidate(owner_id, source, subtree=True)
+            self.cache.invalidate(owner_id, destination, subtree=True)
+            await self._clear_tree_whiteouts(db, params)
+
             
             cursor = await db.execute("""
-                SELECT type FROM filesystem WHERE owner_id = ? AND path = ?
-            """, (owner_id, destination))
+                SELECT 1 FROM filesystem
+                WHERE owner_id = :base AND (path = :source OR (path > :lower AND path < :upper))
+                LIMIT 1
+            """, {**params, 'base': BASE_LAYER})
             if await cursor.fetchone():
-                return False, f"Destination already exists: {destination}"
-
-            source_type = source_data[0]
+                await self._copy_tree(db, params, count, progress)
+                await self._remove_tree(db, owner_id, source)
+                return True, f"Moved: {source} → {destination}" + (f" ({count} entries)" if count else "")
 
             
             await db.execute("""
-                UPDATE filesystem SET path = ?, name = ?, modified_at = ?
+                UPDATE filesystem SET path = ?, parent_path = ?, name = ?, modified_at = ?
                 WHERE owner_id = ? AND path = ?
-            """, (destination, Path(destination).name, datetime.now(), owner_id, source))
+            """, (destination, self.parent_path(destination), Path(destination).name, datetime.now(), owner_id, source))
 
             
-            if source_type == 'directory':
-                cursor = await db.execute("""
-                    SELECT path FROM filesystem
-                    WHERE owner_id = ? AND path LIKE ?
-                """, (owner_id, f"{source}/%"))
-
-                children = await cursor.fetchall()
-                for (old_path,) in children:
-                    new_path = old_path.replace(source, destination, 1)
-                    await db.execute("""
-                        UPDATE filesystem SET path = ?
-                        WHERE owner_id = ? AND path = ?
-                    """, (new_path, owner_id, old_path))
-
-            await db.commit()
-            return True, f"Moved: {source} → {destination}"
-
-    async def copy_item(self, owner_id: int, source: str, destination: str, recursive: bool = False) -> tuple[bool, str]:
-        """Copy file or directory"""
+            if source_info.is_directory and count:
+                moved = 0
+
+                while moved < count:
+                    cursor = await db.execute("""
+                        UPDATE filesystem
+                        SET path = :destination || substr(path, :cut),
+                            parent_path = :destination || substr(parent_path, :cut)
+                        WHERE id IN (
+                            SELECT id FROM filesystem
+                            WHERE owner_id = :owner_id AND path > :lower AND path < :upper
+                            LIMIT :chunk_size
+                        )
+                    """, params)
+                    if cursor.rowcount <= 0:
+                        break
+                    moved += cursor.rowcount
+
+                    if progress and count > params['chunk_size']:
+                        await progress(moved, count)
+
+            return True, f"Moved: {source} → {destination}" + (f" ({count} entries)" if count else "")
+
+    async def copy_item(self, owner_id: int, source: str, destination: str, recursive: bool = False, progress=None) -> tuple[bool, str]:
+        """
+        Copy file or directory.
+        Descendants are copied with INSERT ... SELECT in one transaction;
+        progress(done, total) is awaited between chunks of large trees.
+        """
         source = self.normalize_path(source)
         destination = self.normalize_path(destination)
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self._mutation(owner_id) as db:
             
-            cursor = await db.execute("""
-                SELECT type, content, permissions, executable FROM filesystem
-                WHERE owner_id = ? AND path = ?
-            """, (owner_id, source))
-            source_data = await cursor.fetchone()
+            source_info = await self.stat(owner_id, source)
 
-            if not source_data:
+            if not source_info:
                 return False, f"Source not found: {source}"
 
-            source_type, content, permissions, executable = source_data
+            if source_info.is_directory and not recursive:
+                return False, "Cannot copy directory without -r flag"
 
-            
-            cursor = await db.execute("""
-                SELECT type FROM filesystem WHERE owner_id = ? AND path = ?
-            """, (owner_id, destination))
-            if await cursor.fetchone():
-                return False, f"Destination already exists: {destination}"
-
-            
-            if source_type == 'file':
-                size = len(content) if content else 0
-                await db.execute("""
-                    INSERT INTO filesystem (owner_id, path, name, type, content, size, permissions, executable)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (owner_id, destination, Path(destination).name, source_type, content, size, permissions, executable))
+            count, error = await self._tree_operation_check(db, owner_id, source, destination, copy=True)
+            if error:
+                return False, error
 
-            elif source_type == 'directory':
-                if not recursive:
-                    return False, "Cannot copy directory without -r flag"
-
-                
-                await db.execute("""
-                    INSERT INTO filesystem (owner_id, path, name, type, permissions)
-                    VALUES (?, ?, ?, 'directory', ?)
-                """, (owner_id, destination, Path(destination).name, permissions))
-
-                
-                cursor = await db.execute("""
-                    SELECT path, name, type, content, size, permissions, executable FROM filesystem
-                    WHERE owner_id = ? AND path LIKE ?
-                """, (owner_id, f"{source}/%"))
+            params = self._tree_params(owner_id, source, destination)
+            self.cache.invalidate(owner_id, source, subtree=True)
+            self.cache.invalidate(owner_id, destination, subtree=True)
+            await self._clear_tree_whiteouts(db, params)
+            await self._copy_tree(db, params, count if source_info.is_directory else 0, progress)
 
-                children = await cursor.fetchall()
-                for child in children:
-                    old_path, name, c_type, c_content, c_size, c_perms, c_exec = child
-                    new_path = old_path.replace(source, destination, 1)
-
-                    await db.execute("""
-                        INSERT INTO filesystem (owner_id, path, name, type, content, size, permissions, executable)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (owner_id, new_path, name, c_type, c_content, c_size, c_perms, c_exec))
-
-            await db.commit()
-            return True, f"Copied: {source} → {destination}"
+            if not source_info.is_directory:
+                return True, f"Copied: {source} → {destination}"
+            return True, f"Copied: {source} → {destination} ({count + 1} entries)"
 
     async def change_permissions(self, owner_id: int, path: str, mode: str) -> tuple[bool, str]:
-        """Change file permissions (chmod)"""
+        """Change file permissions (chmod) with one upsert into the user's layer"""
         path = self.normalize_path(path)
 
         
         if not self._is_valid_mode(mode):
             return False, f"Invalid permissions mode: {mode}"
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT id FROM filesystem WHERE owner_id = ? AND path = ?
-            """, (owner_id, path))
+        
+        permissions = self._mode_to_permissions(mode)
 
-            if not await cursor.fetchone():
+        
+        executable = 1 if 'x' in permissions[:3] else 0
+
+        async with self._mutation(owner_id) as db:
+            self.cache.invalidate(owner_id, path)
+            cursor = await db.execute(f"""
+                INSERT INTO filesystem (owner_id, path, parent_path, name, type, blob_id, size, permissions, executable, created_at, modified_at)
+                SELECT :owner_id, f.path, f.parent_path, f.name, f.type, f.blob_id, f.size, :permissions, :executable, f.created_at, :now
+                FROM filesystem f
+                WHERE f.path = :path AND {VISIBLE}
+                ON CONFLICT(owner_id, path) DO UPDATE SET
+                    permissions = excluded.permissions, executable = excluded.executable, modified_at = excluded.modified_at
+                RETURNING id
+            """, {'owner_id': owner_id, 'path': path, 'permissions': permissions, 'executable': executable, 'now': datetime.now()})
+
+            if await cursor.fetchone() is None:
                 return False, f"File not found: {path}"
 
-            
-            permissions = self._mode_to_permissions(mode)
-
-            
-            executable = 1 if 'x' in permissions[:3] else 0
-
-            await db.execute("""
-                UPDATE filesystem SET permissions = ?, executable = ?, modified_at = ?
-                WHERE owner_id = ? AND path = ?
-            """, (permissions, executable, datetime.now(), owner_id, path))
-
-            await db.commit()
             return True, f"Changed permissions of '{path}' to {permissions}"
 
     async def find_files(self, owner_id: int, search_path: str, pattern: str = None, file_type: str = None) -> list:
         """Find files matching pattern"""
         search_path = self.normalize_path(search_path)
+        lower, upper = self._subtree_bounds(search_path)
 
-        async with aiosqlite.connect(self.db_path) as db:
-            query = """
-                SELECT path, name, type FROM filesystem
-                WHERE owner_id = ? AND (path = ? OR path LIKE ?)
+        async with self.db.read() as db:
+            query = f"""
+                SELECT f.path, f.name, f.type FROM filesystem f
+                WHERE (f.path = :path OR (f.path > :lower AND f.path < :upper)) AND {VISIBLE}
             """
-            params = [owner_id, search_path, f"{search_path}/%"]
+            params = {'owner_id': owner_id, 'path': search_path, 'lower': lower, 'upper': upper}
 
             if file_type:
-                query += " AND type = ?"
-                params.append(file_type)
+                query += " AND f.type = :type"
+                params['type'] = file_type
 
-            cursor = await db.execute(query, params)
+            cursor = await db.execute(query + " ORDER BY f.path", params)
             results = await cursor.fetchall()
 
             
@@ -526,64 +1219,250 @@ class VirtualFilesystem:
 
             return results
 
-    async def grep_content(self, owner_id: int, pattern: str, search_path: str = None) -> list:
-        """Search for pattern in file contents"""
-        async with aiosqlite.connect(self.db_path) as db:
-            query = """
-                SELECT path, name, content FROM filesystem
-                WHERE owner_id = ? AND type = 'file' AND content LIKE ?
-            """
-            params = [owner_id, f"%{pattern}%"]
-
-            if search_path:
-                search_path = self.normalize_path(search_path)
-                query += " AND (path = ? OR path LIKE ?)"
-                params.extend([search_path, f"{search_path}/%"])
-
-            cursor = await db.execute(query, params)
-            results = await cursor.fetchall()
+    @staticmethod
+    def _required_literal(pattern: str) -> str:
+        """
+        Longest run of plain characters every regex match must contain ('' if
+        none can be proven, which disables the FTS prefilter). Escapes count as
+        one unit; groups and atoms that may repeat zero times never count.
+        """
+        if '|' in pattern or re.compile(pattern).flags & re.VERBOSE:
+            return ''
+
+        best = current = ''
+        depth = 0
+        i = 0
+        while i < len(pattern):
+            char = pattern[i]
+            literal = None
+            if char == '\\':
+                escaped = pattern[i + 1:i + 2]
+                if escaped and not escaped.isalnum():
+                    literal = escaped
+                elif not escaped or escaped not in 'bBdDwWsSAZ':
+                    return ''
+                i += 2
+            elif char == '[':
+                i += 1
+                if pattern[i:i + 1] == '^':
+                    i += 1
+                if pattern[i:i + 1] == ']':
+                    i += 1
+                while i < len(pattern) and pattern[i] != ']':
+                    i += 2 if pattern[i] == '\\' else 1
+                i += 1
+            elif char == '{':
+                close = pattern.find('}', i)
+                i = close + 1 if close != -1 else i + 1
+            else:
+                if char == '(':
+                    depth += 1
+                elif char == ')':
+                    depth -= 1
+                elif char not in '.^$*+?}':
+                    literal = char
+                i += 1
+
+            if literal is None or depth > 0 or (i < len(pattern) and pattern[i] in '?*{'):
+                best, current = max(best, current, key=len), ''
+                continue
+            current += literal
+
+        return max(best, current, key=len)
+
+    async def grep_content(self, owner_id: int, pattern: str, search_path: str = None, ignore_case: bool = False,
+                           regex: bool = False, mode: str = 'lines', max_matches: int = None,
+                           invert: bool = False) -> tuple[list, bool]:
+        """
+        Search for pattern in file contents (invert: lines that do not match).
+        Candidate chunks come from the blobs_fts trigram index, so only
+        chunks that contain the pattern's literal are scanned line by line;
+        an inverted search scans every chunk. Chunks of a line longer than a
+        chunk are always scanned together, as the literal may straddle them.
+        mode is 'lines', 'count' or 'files'.
+        Returns: ([(path, matches, count)], truncated)
+        Raises: re.error for an invalid regex
+        """
+        if max_matches is None:
+            max_matches = self.config['settings'].get('grep_max_matches', 200)
+        max_line_length = self.config['settings'].get('grep_max_line_length', 200)
+
+        flags = re.IGNORECASE if ignore_case else 0
+        matcher = re.compile(pattern if regex else re.escape(pattern), flags)
+        literal = '' if invert else self._required_literal(pattern) if regex else pattern
 
-            
-            formatted_results = []
-            for path, name, content in results:
-                if content:
-                    lines = content.split('\n')
-                    matches = []
-                    for i, line in enumerate(lines, 1):
-                        if pattern.lower() in line.lower():
+        
+        if len(literal) >= 3:
+            query = f"""
+                WITH hits(blob_id, line) AS (
+                    SELECT c.blob_id, c.line FROM blobs_fts
+                    JOIN blob_chunks c ON c.id = blobs_fts.rowid
+                    WHERE blobs_fts MATCH :match
+                    UNION
+                    SELECT blob_id, line FROM blob_chunks GROUP BY blob_id, line HAVING COUNT(*) > 1
+                )
+                SELECT f.path, c.line, c.data FROM hits
+                JOIN blob_chunks c ON c.blob_id = hits.blob_id AND c.line = hits.line
+                JOIN filesystem f ON f.blob_id = c.blob_id
+                WHERE f.type = 'file' AND {VISIBLE}
+            """
+            params = {'owner_id': owner_id, 'match': '"' + literal.replace('"', '""') + '"'}
+        else:
+            query = f"""
+                SELECT f.path, c.line, c.data FROM filesystem f
+                JOIN blob_chunks c ON c.blob_id = f.blob_id
+                WHERE f.type = 'file' AND {VISIBLE}
+            """
+            params = {'owner_id': owner_id}
+            if literal and (literal.isascii() or not ignore_case):
+                query += """ AND (instr(lower(inflate(c.data)), lower(:literal)) > 0 OR EXISTS (
+                    SELECT 1 FROM blob_chunks s WHERE s.blob_id = c.blob_id AND s.line = c.line AND s.id != c.id
+                ))"""
+                params['literal'] = literal
+
+        if search_path:
+            search_path = self.normalize_path(search_path)
+            lower, upper = self._subtree_bounds(search_path)
+            query += " AND (f.path = :path OR (f.path > :lower AND f.path < :upper))"
+            params.update({'path': search_path, 'lower': lower, 'upper': upper})
+
+        query += " ORDER BY f.path, c.offset"
+
+        results = []
+        total = 0
+        truncated = False
+
+        async with self.db.read() as db:
+            async with db.execute(query, params) as cursor:
+                async for path, first_line, text in self._line_groups(cursor):
+                    if results and results[-1][0] == path:
+                        _, matches, count = results.pop()
+                    else:
+                        matches, count = [], 0
+
+                    if mode == 'files' and count:
+                        results.append((path, matches, count))
+                        continue
+
+                    
+                    for i, line in enumerate(io.StringIO(text), first_line + 1):
+                        if bool(matcher.search(line)) == invert:
+                            continue
+                        if mode == 'lines' and total >= max_matches:
+                            truncated = True
+                            break
+
+                        count += 1
+                        if mode == 'files':
+                            break
+                        if mode == 'lines':
+                            line = line.rstrip('\n')
+                            if len(line) > max_line_length:
+                                line = line[:max_line_length] + '...'
                             matches.append((i, line))
-                    if matches:
-                        formatted_results.append((path, matches))
-
-            return formatted_results
+                            total += 1
+
+                    if count:
+                        results.append((path, matches, count))
+                    if truncated:
+                        break
+
+        return results, truncated
+
+    async def _line_groups(self, cursor):
+        """
+        (path, first line, text) from (path, line, data) rows ordered by path
+        and offset. Chunks of one over-long line share their line number and
+        are joined, so a line is never split at a chunk boundary.
+        """
+        key = None
+        parts = []
+        async for path, line, data in cursor:
+            if parts and (path, line) != key:
+                yield *key, ''.join(parts)
+                parts = []
+            key = (path, line)
+            parts.append(self.chunk_cache.inflate(data))
+        if parts:
+            yield *key, ''.join(parts)
+
+    def get_quota(self, owner_id: int) -> dict:
+        """Quota limits for the user's role (None means unlimited)"""
+        role = 'user'
+        session = self.user_manager.get_session(owner_id) if self.user_manager else None
+        if session:
+            role = session.get('role', role)
+
+        quotas = self.config['settings'].get('filesystem_quotas', {})
+        limits = quotas.get(role, quotas.get('user', {}))
+        return {key: limits.get(key) for key in QUOTA_LIMITS}
+
+    async def _get_usage(self, db, owner_id: int) -> tuple[int, int, int]:
+        """(files, directories, bytes) held in the user's own layer"""
+        cursor = await db.execute("""
+            SELECT files, directories, bytes FROM fs_usage WHERE owner_id = ?
+        """, (owner_id,))
+        return await cursor.fetchone() or (0, 0, 0)
+
+    async def _check_quota(self, db, owner_id: int, files: int = 0, directories: int = 0, size: int = 0):
+        """Error message if adding this much to the user's layer would exceed the quota, else None"""
+        if owner_id == BASE_LAYER or (files <= 0 and directories <= 0 and size <= 0):
+            return None
+
+        quota = self.get_quota(owner_id)
+        if all(limit is None for limit in quota.values()):
+            return None
+
+        usage = await self._get_usage(db, owner_id)
+        for key, used, added, label in zip(QUOTA_LIMITS, usage, (files, directories, size), ('files', 'directories', 'bytes')):
+            limit = quota[key]
+            if limit is not None and added > 0 and used + added > limit:
+                return f"Disk quota exceeded: {used + added} {label} (limit is {limit})"
+
+        return None
 
     async def get_disk_usage(self, owner_id: int) -> dict:
-        """Get disk usage statistics for user"""
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("""
-                SELECT COUNT(*), SUM(size), type FROM filesystem
-                WHERE owner_id = ?
-                GROUP BY type
-            """, (owner_id,))
-            results = await cursor.fetchall()
-
-            stats = {
-                'total_files': 0,
-                'total_directories': 0,
-                'total_size': 0,
-                'files_size': 0
-            }
+        """Get disk usage statistics for user (entries in the user's own layer)"""
+        async with self.db.read() as db:
+            files, directories, size = await self._get_usage(db, owner_id)
+
+        return {
+            'total_files': files,
+            'total_directories': directories,
+            'total_size': size,
+            'files_size': size,
+            'quota': self.get_quota(owner_id)
+        }
 
-            for count, size, file_type in results:
-                if file_type == 'file':
-                    stats['total_files'] = count
-                    stats['files_size'] = size or 0
-                elif file_type == 'directory':
-                    stats['total_directories'] = count
+    async def reconcile_usage(self, owner_id: int = None) -> list:
+        """
+        Recompute usage counters from the filesystem table (all users, or one).
+        Returns: [(owner_id, old (files, directories, bytes), new)] for counters that had drifted
+        """
+        where = "" if owner_id is None else "WHERE owner_id = :owner_id"
+
+        async with self.db.write() as db:
+            cursor = await db.execute(f"SELECT owner_id, files, directories, bytes FROM fs_usage {where}",
+                                      {'owner_id': owner_id})
+            old = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
+
+            await db.execute(f"DELETE FROM fs_usage {where}", {'owner_id': owner_id})
+            await db.execute(f"""
+                INSERT INTO fs_usage (owner_id, files, directories, bytes)
+                SELECT owner_id, SUM(type != 'directory'), SUM(type = 'directory'),
+                       SUM(CASE WHEN type = 'directory' THEN 0 ELSE COALESCE(size, 0) END)
+                FROM filesystem
+                {where + ' AND' if where else 'WHERE'} type != 'whiteout'
+                GROUP BY owner_id
+            """, {'owner_id': owner_id})
 
-                stats['total_size'] += size or 0
+            cursor = await db.execute(f"SELECT owner_id, files, directories, bytes FROM fs_usage {where}",
+                                      {'owner_id': owner_id})
+            new = {row[0]: tuple(row[1:]) for row in await cursor.fetchall()}
 
-            return stats
+        return [(owner, old.get(owner, (0, 0, 0)), new.get(owner, (0, 0, 0)))
+                for owner in sorted(old.keys() | new.keys())
+                if old.get(owner, (0, 0, 0)) != new.get(owner, (0, 0, 0))]
 
     def _is_valid_mode(self, mode: str) -> bool:
         """Validate chmod mode string"""
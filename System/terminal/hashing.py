@@ -0,0 +1,89 @@
+"""
+Password hashing off the event loop.
+
+bcrypt spends 100-300 ms per hash or check. PasswordHasher runs them on a
+small dedicated thread pool (bcrypt releases the GIL while it works), so the
+bot keeps serving its gateway and other cogs during a burst of logins. At
+most `workers` hashes run at once and at most `max_queue` more wait; beyond
+that new requests fail right away with HasherBusy instead of piling up.
+"""
+import asyncio
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt
+
+
+class HasherBusy(Exception):
+    """Raised when the password hashing queue is full"""
+
+    def __init__(self):
+        super().__init__("Too many password checks in progress. Try again in a moment.")
+
+
+class PasswordHasher:
+    """bcrypt on a bounded worker pool, with latency metrics"""
+
+    def __init__(self, workers: int = 2, max_queue: int = 16, window: int = 256):
+        self.workers = workers
+        self.max_queue = max_queue
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='bcrypt')
+        self._pending = 0
+        self._latencies = deque(maxlen=window)
+        self._waits = deque(maxlen=window)
+        self.stats = {'hashes': 0, 'verifies': 0, 'rejected': 0}
+
+    async def hash(self, password: str) -> str:
+        """bcrypt hash of a password (raises HasherBusy)"""
+        hashed = await self._run('hashes', _hash, password.encode('utf-8'))
+        return hashed.decode('utf-8')
+
+    async def verify(self, password: str, password_hash: str) -> bool:
+        """Check a password against a bcrypt hash (raises HasherBusy)"""
+        return await self._run('verifies', bcrypt.checkpw, password.encode('utf-8'), password_hash.encode('utf-8'))
+
+    async def _run(self, kind: str, func, *args):
+        """Queue func(*args) on the pool unless workers and queue are all taken"""
+        if self._pending >= self.workers + self.max_queue:
+            self.stats['rejected'] += 1
+            raise HasherBusy()
+
+        self._pending += 1
+        queued = time.perf_counter()
+        try:
+            started, result = await asyncio.get_running_loop().run_in_executor(self._executor, _timed, func, args)
+        finally:
+            self._pending -= 1
+
+        self._waits.append(started - queued)
+        self._latencies.append(time.perf_counter() - queued)
+        self.stats[kind] += 1
+        return result
+
+    def report(self) -> dict:
+        """Counters, queue depth and latency (ms, over the recent window) of completed requests"""
+        latencies = sorted(self._latencies)
+        count = len(latencies)
+        return {
+            **self.stats,
+            'pending': self._pending,
+            'workers': self.workers,
+            'max_queue': self.max_queue,
+            'avg_ms': sum(latencies) / count * 1000 if count else 0.0,
+            'p95_ms': latencies[min(count - 1, int(count * 0.95))] * 1000 if count else 0.0,
+            'max_ms': latencies[-1] * 1000 if count else 0.0,
+            'avg_wait_ms': sum(self._waits) / len(self._waits) * 1000 if self._waits else 0.0
+        }
+
+    def close(self):
+        """Stop the worker threads once running hashes finish"""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _hash(password: bytes) -> bytes:
+    return bcrypt.hashpw(password, bcrypt.gensalt())
+
+
+def _timed(func, args):
+    """Run in a worker: (start time, result)"""
+    return time.perf_counter(), func(*args)
@@ -1,22 +1,65 @@
-import json
 from typing import Optional
+from .config import CONFIG
 from .permissions import format_code_block, format_error
+from .commands import REGISTRY
 
 class HelpManager:
     """Dynamic help system for terminal commands"""
 
-    def __init__(self):
+    def __init__(self, registry=REGISTRY):
         self.help_path = "Data/help_content.json"
-        self.help_data = self.load_help_data()
-
-    def load_help_data(self) -> dict:
-        """Load help content from JSON"""
-        try:
-            with open(self.help_path, 'r', encoding='utf-8') as f:
-                return json.load(f)
-        except Exception as e:
-            print(f"⚠️  Failed to load help data: {e}")
-            return {"categories": {}, "aliases": {}, "notes": []}
+        self.registry = registry
+        self._categories = None
+        self._source = None
+        self._registry_version = None
+
+    @property
+    def help_data(self):
+        """Current help content snapshot (read-only)"""
+        return CONFIG.get(self.help_path, {"categories": {}, "aliases": {}, "notes": []})
+
+    def categories(self) -> dict:
+        """
+        Help categories built from the command registry (usage and description)
+        and help_content.json (category info, examples, options, notes and
+        topics that are not commands). Rebuilt when commands were registered
+        or the help content was reloaded.
+        """
+        help_data = self.help_data
+        if (self._categories is not None and self._source is help_data
+                and self._registry_version == self.registry.version):
+            return self._categories
+
+        registered = {}
+        for cmd in self.registry:
+            if not cmd.is_group and cmd.category:
+                registered.setdefault(cmd.category, {})[cmd.name] = cmd
+        command_names = {cmd.name for cmd in self.registry}
+
+        categories = {}
+        for key, data in help_data['categories'].items():
+            own = registered.pop(key, {})
+            commands = {}
+            for name, details in data.get('commands', {}).items():
+                if name in own:
+                    commands[name] = self._entry(own.pop(name), details)
+                elif name not in command_names:
+                    commands[name] = details
+            for name, cmd in own.items():
+                commands[name] = self._entry(cmd)
+            categories[key] = {**data, 'commands': commands}
+
+        for key, own in registered.items():
+            categories[key] = {'commands': {name: self._entry(cmd) for name, cmd in own.items()}}
+
+        self._categories = categories
+        self._source = help_data
+        self._registry_version = self.registry.version
+        return categories
+
+    def _entry(self, cmd, details: dict = None) -> dict:
+        """Help entry of a registered command"""
+        return {**(details or {}), 'usage': cmd.usage, 'description': cmd.description or 'No description'}
 
     def get_help(self, category: Optional[str] = None, command: Optional[str] = None) -> str:
         """Get help text for category or specific command"""
@@ -29,7 +72,7 @@ class HelpManager:
         category = category.lower()
 
         
-        if category not in self.help_data['categories']:
+        if category not in self.categories():
             return self._search_command(category)
 
         
@@ -41,7 +84,7 @@ class HelpManager:
 
     def _show_categories(self) -> str:
         """Show all available help categories"""
-        categories = self.help_data['categories']
+        categories = self.categories()
 
         output = [
             "╔════════════════════════════════════════════╗",
@@ -91,7 +134,7 @@ class HelpManager:
 
     def _show_category_help(self, category: str) -> str:
         """Show all commands in a category"""
-        cat_data = self.help_data['categories'][category]
+        cat_data = self.categories()[category]
         commands = cat_data.get('commands', {})
 
         icon = cat_data.get('icon', '📋')
@@ -124,7 +167,7 @@ class HelpManager:
 
     def _show_command_help(self, category: str, command: str) -> str:
         """Show detailed help for a specific command"""
-        cat_data = self.help_data['categories'][category]
+        cat_data = self.categories()[category]
         commands = cat_data.get('commands', {})
 
         if command not in commands:
@@ -173,7 +216,7 @@ class HelpManager:
         results = []
 
         
-        for cat_key, cat_data in self.help_data['categories'].items():
+        for cat_key, cat_data in self.categories().items():
             commands = cat_data.get('commands', {})
 
             for cmd_name, cmd_data in commands.items():
@@ -205,7 +248,7 @@ class HelpManager:
         ]
 
         for result in results:
-            cat_name = self.help_data['categories'][result['category']].get('name', result['category'])
+            cat_name = self.categories()[result['category']].get('name', result['category'])
             output.append(f"• {result['command']} ({cat_name})")
             output.append(f"  {result['usage']}")
             output.append(f"  {result['description']}")
@@ -218,16 +261,12 @@ class HelpManager:
 
     def get_command_usage(self, command: str) -> Optional[str]:
         """Get quick usage string for a command"""
-        for cat_data in self.help_data['categories'].values():
+        for cat_data in self.categories().values():
             commands = cat_data.get('commands', {})
             if command in commands:
                 return commands[command].get('usage', command)
         return None
 
-    def reload_help_data(self) -> bool:
+    async def reload_help_data(self) -> bool:
         """Reload help data from JSON file"""
-        try:
-            self.help_data = self.load_help_data()
-            return True
-        except:
-            return False
+        return self.help_path in await CONFIG.refresh(force=True)
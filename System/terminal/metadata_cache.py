@@ -0,0 +1,169 @@
+import sys
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class _UserCache:
+    __slots__ = ('entries', 'size', 'pending', 'changed')
+
+    def __init__(self):
+        self.entries = OrderedDict()
+        self.size = 0
+        self.pending = 0
+        self.changed = 0
+
+
+class MetadataCache:
+    """Bounded per-user LRU of filesystem stat results and directory listings.
+
+    Entries are keyed by (kind, path) inside each user's LRU; users themselves
+    are kept in LRU order so that the memory ceiling evicts from the least
+    recently active user first.
+
+    Readers take a `token()` before querying and hand it to `put()`. A value is
+    only stored while none of the user's write units is in flight and no write
+    finished after the token was taken, so the cache never holds anything
+    older than the user's last committed change.
+    """
+
+    def __init__(self, max_bytes: int = 4194304, max_entries_per_user: int = 256):
+        self.max_bytes = max(0, max_bytes)
+        self.max_entries = max(1, max_entries_per_user)
+        self.size = 0
+        self.stats = {'hits': 0, 'misses': 0, 'stores': 0, 'evictions': 0, 'invalidations': 0}
+
+        self._users = OrderedDict()
+        self._clock = 0
+        self._cleared = 0
+
+    def _user(self, owner_id: int) -> _UserCache:
+        """Cache record for a user (created on first use, never dropped)"""
+        user = self._users.get(owner_id)
+        if user is None:
+            user = self._users[owner_id] = _UserCache()
+        return user
+
+    def token(self) -> int:
+        """Snapshot to pass to put() for a read that starts now"""
+        return self._clock
+
+    def get(self, owner_id: int, key: tuple):
+        """Cached value for key, or MISSING"""
+        user = self._users.get(owner_id)
+        value = MISSING if user is None else user.entries.get(key, MISSING)
+
+        if value is MISSING:
+            self.stats['misses'] += 1
+            return MISSING
+
+        self.stats['hits'] += 1
+        user.entries.move_to_end(key)
+        self._users.move_to_end(owner_id)
+        return value[0]
+
+    def put(self, owner_id: int, key: tuple, value, token: int):
+        """Store a value read after token (dropped if a write may have raced with the read)"""
+        if token < self._cleared:
+            return
+
+        user = self._user(owner_id)
+        if user.pending or token < user.changed:
+            return
+
+        size = self._sizeof(key) + self._sizeof(value)
+        if size > self.max_bytes // 8:
+            return
+
+        old = user.entries.pop(key, None)
+        if old is not None:
+            user.size -= old[1]
+            self.size -= old[1]
+
+        user.entries[key] = (value, size)
+        user.size += size
+        self.size += size
+        self.stats['stores'] += 1
+        self._users.move_to_end(owner_id)
+
+        while len(user.entries) > self.max_entries:
+            self._evict(user)
+        self._enforce_ceiling()
+
+    def _evict(self, user: _UserCache):
+        """Drop the least recently used entry of one user"""
+        _, (_, size) = user.entries.popitem(last=False)
+        user.size -= size
+        self.size -= size
+        self.stats['evictions'] += 1
+
+    def _enforce_ceiling(self):
+        """Evict from the least recently active users until under the memory ceiling"""
+        for user in list(self._users.values()):
+            while user.entries and self.size > self.max_bytes:
+                self._evict(user)
+            if self.size <= self.max_bytes:
+                return
+
+    def begin_write(self, owner_id: int):
+        """A write unit touching the user's layer started"""
+        self._user(owner_id).pending += 1
+
+    def end_write(self, owner_id: int):
+        """A write unit touching the user's layer is durable (or rolled back)"""
+        user = self._user(owner_id)
+        user.pending -= 1
+        self._clock += 1
+        user.changed = self._clock
+
+    def invalidate(self, owner_id: int, path: str, subtree: bool = False):
+        """Forget a path's stat and listing, its parent's listing and optionally everything below it"""
+        user = self._users.get(owner_id)
+        if user is None or not user.entries:
+            return
+
+        parent = (path.rsplit('/', 1)[0] or '/') if path != '/' else None
+        prefix = path.rstrip('/') + '/'
+        stale = [key for key in user.entries
+                 if key[1] == path or (key[0] == 'list' and key[1] == parent)
+                 or (subtree and key[1].startswith(prefix))]
+
+        for key in stale:
+            _, size = user.entries.pop(key)
+            user.size -= size
+            self.size -= size
+        self.stats['invalidations'] += len(stale)
+
+    def clear(self):
+        """Forget everything (e.g. after the shared base layer changed)"""
+        self._clock += 1
+        self._cleared = self._clock
+        for user in self._users.values():
+            self.stats['invalidations'] += len(user.entries)
+            user.entries.clear()
+            user.size = 0
+        self.size = 0
+
+    def report(self) -> dict:
+        """Hit/miss counters, hit ratio and current footprint"""
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_ratio': self.stats['hits'] / lookups if lookups else 0.0,
+            'entries': sum(len(user.entries) for user in self._users.values()),
+            'users': sum(1 for user in self._users.values() if user.entries),
+            'bytes': self.size,
+            'max_bytes': self.max_bytes
+        }
+
+    def _sizeof(self, value) -> int:
+        """Approximate memory held by a cached value (tuples/lists/slot records are followed one level deep)"""
+        size = sys.getsizeof(value)
+        if hasattr(value, '__slots__'):
+            size += sum(sys.getsizeof(getattr(value, slot)) for slot in value.__slots__)
+        elif isinstance(value, (tuple, list)):
+            for item in value:
+                size += sys.getsizeof(item)
+                if isinstance(item, (tuple, list)):
+                    size += sum(sys.getsizeof(field) for field in item)
+        return size
@@ -0,0 +1,537 @@
+"""
+Versioned schema migrations for every bot database.
+
+Each database has an ordered list of (version, description, steps). A step is
+either an SQL string or an async callable taking the writer connection. The
+applied version is tracked in a `schema_version` table; migrations that are
+already applied are never run again, so a current schema costs one SELECT.
+"""
+import asyncio
+import hashlib
+import sqlite3
+from .chunks import split_chunks, count_lines
+from .compression import decompress
+from .database import get_database, register_function
+
+
+async def _column_exists(db, table: str, column: str) -> bool:
+    """Check whether a table already has a column"""
+    cursor = await db.execute(f"PRAGMA table_info({table})")
+    return any(row[1] == column for row in await cursor.fetchall())
+
+
+async def _add_column(db, table: str, column: str, declaration: str):
+    """Add a column unless a pre-migration database already has it"""
+    if not await _column_exists(db, table, column):
+        await db.execute(f"ALTER TABLE {table} ADD COLUMN {column} {declaration}")
+
+
+async def _tickets_legacy_columns(db):
+    """Columns that older tickets.db files were missing before migrations existed"""
+    await _add_column(db, "tickets", "category", "TEXT DEFAULT 'allgemein'")
+    await _add_column(db, "ticket_stats", "total_response_time", "REAL DEFAULT 0")
+    await _add_column(db, "ticket_stats", "avg_rating", "REAL DEFAULT 0")
+    await _add_column(db, "ticket_stats", "total_ratings", "INTEGER DEFAULT 0")
+
+
+TICKETS_MIGRATIONS = [
+    (1, "initial ticket schema", [
+        """CREATE TABLE IF NOT EXISTS tickets (
+            channel_id INTEGER PRIMARY KEY,
+            user_id INTEGER NOT NULL,
+            blocked INTEGER DEFAULT 0,
+            priority INTEGER DEFAULT 0,
+            claimed_by INTEGER,
+            claimed_at TIMESTAMP,
+            category TEXT DEFAULT 'allgemein'
+        )""",
+        """CREATE TABLE IF NOT EXISTS category_stats (
+            category TEXT PRIMARY KEY,
+            total_tickets INTEGER DEFAULT 0,
+            avg_resolution_time INTEGER DEFAULT 0,
+            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS ticket_queue (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS pending_tickets (
+            user_id INTEGER PRIMARY KEY,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS ticket_stats (
+            team_member_id INTEGER PRIMARY KEY,
+            tickets_handled INTEGER DEFAULT 0,
+            tickets_closed INTEGER DEFAULT 0,
+            avg_response_time REAL DEFAULT 0,
+            total_response_time REAL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            avg_rating REAL DEFAULT 0,
+            total_ratings INTEGER DEFAULT 0
+        )""",
+        """CREATE TABLE IF NOT EXISTS ticket_feedback (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            ticket_id INTEGER,
+            user_id INTEGER,
+            team_member_id INTEGER,
+            rating INTEGER,
+            feedback_text TEXT,
+            created_at DATETIME
+        )""",
+    ]),
+    (2, "add columns missing from legacy ticket databases", [
+        _tickets_legacy_columns,
+    ]),
+    (3, "index tickets by user", [
+        "CREATE INDEX IF NOT EXISTS idx_tickets_user ON tickets(user_id)",
+    ]),
+]
+
+
+async def _filesystem_backfill_parent_path(db):
+    """Add parent_path and fill it in for rows created before it existed"""
+    await _add_column(db, "filesystem", "parent_path", "TEXT")
+
+    cursor = await db.execute("SELECT id, path FROM filesystem WHERE parent_path IS NULL AND path != '/'")
+    rows = await cursor.fetchall()
+    await db.executemany(
+        "UPDATE filesystem SET parent_path = ? WHERE id = ?",
+        [(path.rsplit('/', 1)[0] or '/', row_id) for row_id, path in rows]
+    )
+
+
+async def _filesystem_move_content_to_blobs(db):
+    """Move inline file contents into the content-addressed blobs table"""
+    await _add_column(db, "filesystem", "blob_id", "INTEGER")
+
+    cursor = await db.execute("SELECT id, content FROM filesystem WHERE content IS NOT NULL AND content != ''")
+    rows = await cursor.fetchall()
+
+    hashes = {}
+    for row_id, content in rows:
+        hashes.setdefault(hashlib.sha256(content.encode('utf-8')).hexdigest(), content)
+    await db.executemany(
+        "INSERT OR IGNORE INTO blobs (hash, content, size) VALUES (?, ?, ?)",
+        [(digest, content, len(content)) for digest, content in hashes.items()]
+    )
+
+    await db.executemany(
+        "UPDATE filesystem SET blob_id = (SELECT id FROM blobs WHERE hash = ?), content = NULL WHERE id = ?",
+        [(hashlib.sha256(content.encode('utf-8')).hexdigest(), row_id) for row_id, content in rows]
+    )
+    await db.execute("UPDATE filesystem SET content = NULL WHERE content = ''")
+
+
+async def _filesystem_split_blobs(db):
+    """Move blob contents into line-aligned chunks"""
+    await _add_column(db, "blobs", "lines", "INTEGER DEFAULT 0")
+
+    async with db.execute("SELECT id, content FROM blobs") as cursor:
+        async for blob_id, content in cursor:
+            await db.executemany(
+                "INSERT INTO blob_chunks (blob_id, offset, line, data) VALUES (?, ?, ?, ?)",
+                [(blob_id, *chunk) for chunk in split_chunks(content)]
+            )
+            await db.execute("UPDATE blobs SET lines = ? WHERE id = ?", (count_lines(content), blob_id))
+
+
+FILESYSTEM_MIGRATIONS = [
+    (1, "initial filesystem schema", [
+        """CREATE TABLE IF NOT EXISTS filesystem (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            owner_id INTEGER NOT NULL,
+            path TEXT NOT NULL,
+            name TEXT NOT NULL,
+            type TEXT NOT NULL,
+            content TEXT,
+            permissions TEXT DEFAULT 'rwxr-xr-x',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            modified_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            size INTEGER DEFAULT 0,
+            executable INTEGER DEFAULT 0,
+            UNIQUE(owner_id, path)
+        )""",
+    ]),
+    (2, "index directory entries by parent path", [
+        _filesystem_backfill_parent_path,
+        "CREATE INDEX IF NOT EXISTS idx_filesystem_parent ON filesystem(owner_id, parent_path, name)",
+    ]),
+    (3, "full-text index over file contents", [
+        """CREATE VIRTUAL TABLE IF NOT EXISTS filesystem_fts USING fts5(
+            content,
+            content='filesystem',
+            content_rowid='id',
+            tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_fts_insert AFTER INSERT ON filesystem BEGIN
+            INSERT INTO filesystem_fts (rowid, content) VALUES (new.id, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_fts_delete AFTER DELETE ON filesystem BEGIN
+            INSERT INTO filesystem_fts (filesystem_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_fts_update AFTER UPDATE OF content ON filesystem BEGIN
+            INSERT INTO filesystem_fts (filesystem_fts, rowid, content) VALUES ('delete', old.id, old.content);
+            INSERT INTO filesystem_fts (rowid, content) VALUES (new.id, new.content);
+        END""",
+        "INSERT INTO filesystem_fts (filesystem_fts) VALUES ('rebuild')",
+    ]),
+    (4, "content-addressed blob store with reference counts", [
+        "DROP TRIGGER IF EXISTS filesystem_fts_insert",
+        "DROP TRIGGER IF EXISTS filesystem_fts_delete",
+        "DROP TRIGGER IF EXISTS filesystem_fts_update",
+        "DROP TABLE IF EXISTS filesystem_fts",
+        """CREATE TABLE IF NOT EXISTS blobs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT UNIQUE NOT NULL,
+            content TEXT NOT NULL,
+            size INTEGER DEFAULT 0,
+            refcount INTEGER DEFAULT 0
+        )""",
+        _filesystem_move_content_to_blobs,
+        "UPDATE blobs SET refcount = (SELECT COUNT(*) FROM filesystem WHERE filesystem.blob_id = blobs.id)",
+        "CREATE INDEX IF NOT EXISTS idx_filesystem_blob ON filesystem(blob_id)",
+        "CREATE INDEX IF NOT EXISTS idx_blobs_orphaned ON blobs(id) WHERE refcount <= 0",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_blob_ref AFTER INSERT ON filesystem
+           WHEN new.blob_id IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount + 1 WHERE id = new.blob_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_blob_unref AFTER DELETE ON filesystem
+           WHEN old.blob_id IS NOT NULL BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE id = old.blob_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS filesystem_blob_swap AFTER UPDATE OF blob_id ON filesystem
+           WHEN old.blob_id IS NOT new.blob_id BEGIN
+            UPDATE blobs SET refcount = refcount - 1 WHERE id = old.blob_id;
+            UPDATE blobs SET refcount = refcount + 1 WHERE id = new.blob_id;
+        END""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS blobs_fts USING fts5(
+            content,
+            content='blobs',
+            content_rowid='id',
+            tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS blobs_fts_insert AFTER INSERT ON blobs BEGIN
+            INSERT INTO blobs_fts (rowid, content) VALUES (new.id, new.content);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS blobs_fts_delete AFTER DELETE ON blobs BEGIN
+            INSERT INTO blobs_fts (blobs_fts, rowid, content) VALUES ('delete', old.id, old.content);
+        END""",
+        "INSERT INTO blobs_fts (blobs_fts) VALUES ('rebuild')",
+    ]),
+    (5, "per-user usage counters maintained by triggers", [
+        """CREATE TABLE IF NOT EXISTS fs_usage (
+            owner_id INTEGER PRIMARY KEY,
+            files INTEGER DEFAULT 0,
+            directories INTEGER DEFAULT 0,
+            bytes INTEGER DEFAULT 0
+        )""",
+        """INSERT OR REPLACE INTO fs_usage (owner_id, files, directories, bytes)
+           SELECT owner_id, SUM(type != 'directory'), SUM(type = 'directory'),
+                  SUM(CASE WHEN type = 'directory' THEN 0 ELSE COALESCE(size, 0) END)
+           FROM filesystem WHERE type != 'whiteout'
+           GROUP BY owner_id""",
+        """CREATE TRIGGER IF NOT EXISTS fs_usage_insert AFTER INSERT ON filesystem
+           WHEN new.type != 'whiteout' BEGIN
+            INSERT INTO fs_usage (owner_id, files, directories, bytes)
+            VALUES (new.owner_id, new.type != 'directory', new.type = 'directory',
+                    CASE WHEN new.type = 'directory' THEN 0 ELSE COALESCE(new.size, 0) END)
+            ON CONFLICT(owner_id) DO UPDATE SET
+                files = files + excluded.files,
+                directories = directories + excluded.directories,
+                bytes = bytes + excluded.bytes;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS fs_usage_delete AFTER DELETE ON filesystem
+           WHEN old.type != 'whiteout' BEGIN
+            UPDATE fs_usage SET
+                files = files - (old.type != 'directory'),
+                directories = directories - (old.type = 'directory'),
+                bytes = bytes - CASE WHEN old.type = 'directory' THEN 0 ELSE COALESCE(old.size, 0) END
+            WHERE owner_id = old.owner_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS fs_usage_update_old AFTER UPDATE OF owner_id, type, size ON filesystem
+           WHEN old.type != 'whiteout' BEGIN
+            UPDATE fs_usage SET
+                files = files - (old.type != 'directory'),
+                directories = directories - (old.type = 'directory'),
+                bytes = bytes - CASE WHEN old.type = 'directory' THEN 0 ELSE COALESCE(old.size, 0) END
+            WHERE owner_id = old.owner_id;
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS fs_usage_update_new AFTER UPDATE OF owner_id, type, size ON filesystem
+           WHEN new.type != 'whiteout' BEGIN
+            INSERT INTO fs_usage (owner_id, files, directories, bytes)
+            VALUES (new.owner_id, new.type != 'directory', new.type = 'directory',
+                    CASE WHEN new.type = 'directory' THEN 0 ELSE COALESCE(new.size, 0) END)
+            ON CONFLICT(owner_id) DO UPDATE SET
+                files = files + excluded.files,
+                directories = directories + excluded.directories,
+                bytes = bytes + excluded.bytes;
+        END""",
+    ]),
+    (6, "store blob contents in chunks", [
+        """CREATE TABLE IF NOT EXISTS blob_chunks (
+            id INTEGER PRIMARY KEY,
+            blob_id INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            line INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            UNIQUE(blob_id, offset)
+        )""",
+        _filesystem_split_blobs,
+        "DROP TRIGGER IF EXISTS blobs_fts_insert",
+        "DROP TRIGGER IF EXISTS blobs_fts_delete",
+        "DROP TABLE IF EXISTS blobs_fts",
+        "PRAGMA legacy_alter_table = ON",
+        """CREATE TABLE blobs_chunked (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT UNIQUE NOT NULL,
+            size INTEGER DEFAULT 0,
+            refcount INTEGER DEFAULT 0,
+            lines INTEGER DEFAULT 0
+        )""",
+        "INSERT INTO blobs_chunked (id, hash, size, refcount, lines) SELECT id, hash, size, refcount, lines FROM blobs",
+        "DROP TABLE blobs",
+        "ALTER TABLE blobs_chunked RENAME TO blobs",
+        "PRAGMA legacy_alter_table = OFF",
+        "CREATE INDEX IF NOT EXISTS idx_blobs_orphaned ON blobs(id) WHERE refcount <= 0",
+        """CREATE TRIGGER IF NOT EXISTS blobs_drop_chunks AFTER DELETE ON blobs BEGIN
+            DELETE FROM blob_chunks WHERE blob_id = old.id;
+        END""",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS blobs_fts USING fts5(
+            data,
+            content='blob_chunks',
+            content_rowid='id',
+            tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS blob_chunks_fts_insert AFTER INSERT ON blob_chunks BEGIN
+            INSERT INTO blobs_fts (rowid, data) VALUES (new.id, new.data);
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS blob_chunks_fts_delete AFTER DELETE ON blob_chunks BEGIN
+            INSERT INTO blobs_fts (blobs_fts, rowid, data) VALUES ('delete', old.id, old.data);
+        END""",
+        "INSERT INTO blobs_fts (blobs_fts) VALUES ('rebuild')",
+    ]),
+    (7, "transparently compressed blob chunks", [
+        "ALTER TABLE blobs ADD COLUMN codec TEXT",
+        "CREATE INDEX IF NOT EXISTS idx_blobs_unevaluated ON blobs(id) WHERE codec IS NULL",
+        "DROP TRIGGER IF EXISTS blob_chunks_fts_insert",
+        "DROP TRIGGER IF EXISTS blob_chunks_fts_delete",
+        "DROP TABLE IF EXISTS blobs_fts",
+        "CREATE VIEW IF NOT EXISTS blob_text AS SELECT id, inflate(data) AS data FROM blob_chunks",
+        """CREATE VIRTUAL TABLE IF NOT EXISTS blobs_fts USING fts5(
+            data,
+            content='blob_text',
+            content_rowid='id',
+            tokenize='trigram'
+        )""",
+        """CREATE TRIGGER IF NOT EXISTS blob_chunks_fts_insert AFTER INSERT ON blob_chunks BEGIN
+            INSERT INTO blobs_fts (rowid, data) VALUES (new.id, inflate(new.data));
+        END""",
+        """CREATE TRIGGER IF NOT EXISTS blob_chunks_fts_delete AFTER DELETE ON blob_chunks BEGIN
+            INSERT INTO blobs_fts (blobs_fts, rowid, data) VALUES ('delete', old.id, inflate(old.data));
+        END""",
+        "INSERT INTO blobs_fts (blobs_fts) VALUES ('rebuild')",
+    ]),
+    (8, "index blob chunks by line", [
+        "CREATE INDEX IF NOT EXISTS idx_blob_chunks_line ON blob_chunks(blob_id, line)",
+    ]),
+]
+
+register_function('inflate', 1, decompress)
+
+
+USERS_MIGRATIONS = [
+    (1, "initial user schema", [
+        """CREATE TABLE IF NOT EXISTS users (
+            discord_id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            role TEXT DEFAULT 'user',
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_login TIMESTAMP,
+            failed_login_attempts INTEGER DEFAULT 0,
+            locked_until TIMESTAMP
+        )""",
+        """CREATE TABLE IF NOT EXISTS login_history (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            discord_id INTEGER,
+            username TEXT,
+            action TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            success INTEGER DEFAULT 1
+        )""",
+        """CREATE TABLE IF NOT EXISTS password_reset_tokens (
+            discord_id INTEGER PRIMARY KEY,
+            reset_code TEXT NOT NULL,
+            expires_at TIMESTAMP NOT NULL,
+            attempts INTEGER DEFAULT 0
+        )""",
+    ]),
+    (2, "index login history by time", [
+        "CREATE INDEX IF NOT EXISTS idx_login_history_timestamp ON login_history(timestamp)",
+    ]),
+]
+
+
+CHANNELS_MIGRATIONS = [
+    (1, "initial trusted channel schema", [
+        """CREATE TABLE IF NOT EXISTS trusted_channels (
+            channel_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            channel_name TEXT,
+            added_by INTEGER,
+            added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )""",
+    ]),
+]
+
+
+MODERATION_MIGRATIONS = [
+    (1, "initial moderation schema", [
+        """CREATE TABLE IF NOT EXISTS cases (
+            case_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            guild_id INTEGER NOT NULL,
+            user_id INTEGER NOT NULL,
+            moderator_id INTEGER NOT NULL,
+            action_type TEXT NOT NULL,
+            reason TEXT,
+            duration TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            expires_at DATETIME,
+            active INTEGER DEFAULT 1
+        )""",
+        """CREATE TABLE IF NOT EXISTS warnings (
+            user_id INTEGER PRIMARY KEY,
+            guild_id INTEGER NOT NULL,
+            warn_count INTEGER DEFAULT 0,
+            last_warn_at DATETIME
+        )""",
+        """CREATE TABLE IF NOT EXISTS mod_logs (
+            log_id INTEGER PRIMARY KEY AUTOINCREMENT,
+            case_id INTEGER,
+            guild_id INTEGER NOT NULL,
+            action TEXT NOT NULL,
+            details TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(case_id) REFERENCES cases(case_id)
+        )""",
+    ]),
+    (2, "index cases by guild and user", [
+        "CREATE INDEX IF NOT EXISTS idx_cases_guild_user ON cases(guild_id, user_id)",
+    ]),
+]
+
+
+APT_MIGRATIONS = [
+    (1, "initial apt schema", [
+        """CREATE TABLE IF NOT EXISTS installed_packages (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            guild_id INTEGER NOT NULL,
+            package_name TEXT NOT NULL,
+            version TEXT NOT NULL,
+            installed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(user_id, guild_id, package_name)
+        )""",
+        """CREATE TABLE IF NOT EXISTS package_stats (
+            package_name TEXT PRIMARY KEY,
+            install_count INTEGER DEFAULT 0,
+            last_installed DATETIME
+        )""",
+    ]),
+]
+
+
+MIGRATIONS = {
+    "Data/tickets.db": TICKETS_MIGRATIONS,
+    "Data/terminal_fs.db": FILESYSTEM_MIGRATIONS,
+    "Data/terminal_users.db": USERS_MIGRATIONS,
+    "Data/terminal_channels.db": CHANNELS_MIGRATIONS,
+    "Data/moderation.db": MODERATION_MIGRATIONS,
+    "Data/apt.db": APT_MIGRATIONS,
+}
+
+_migrated = set()
+_migrate_lock = asyncio.Lock()
+
+
+async def get_schema_version(db) -> int:
+    """Return the highest applied migration version (0 for an untracked database)"""
+    try:
+        cursor = await db.execute("SELECT MAX(version) FROM schema_version")
+    except sqlite3.OperationalError:
+        return 0
+    result = await cursor.fetchone()
+    return result[0] or 0
+
+
+async def migrate(db_path: str) -> int:
+    """
+    Bring a database up to its latest schema version.
+    Runs at most once per process; later calls return immediately.
+    Returns: number of migrations applied
+    """
+    if db_path in _migrated:
+        return 0
+
+    migrations = MIGRATIONS.get(db_path)
+    if migrations is None:
+        raise KeyError(f"No migrations registered for {db_path}")
+
+    async with _migrate_lock:
+        if db_path in _migrated:
+            return 0
+
+        manager = get_database(db_path)
+        latest = migrations[-1][0]
+
+        async with manager.read() as db:
+            current = await get_schema_version(db)
+
+        applied = 0
+        if current < latest:
+            db = await manager.connect(autocommit=True)
+            try:
+                await db.execute("""
+                    CREATE TABLE IF NOT EXISTS schema_version (
+                        version INTEGER PRIMARY KEY,
+                        description TEXT,
+                        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                    )
+                """)
+                current = await get_schema_version(db)
+
+                for version, description, steps in migrations:
+                    if version <= current:
+                        continue
+
+                    await db.execute("BEGIN")
+                    try:
+                        for step in steps:
+                            if callable(step):
+                                await step(db)
+                            else:
+                                await db.execute(step)
+
+                        await db.execute(
+                            "INSERT INTO schema_version (version, description) VALUES (?, ?)",
+                            (version, description)
+                        )
+                        await db.commit()
+                    except BaseException:
+                        await db.rollback()
+                        raise
+
+                    applied += 1
+                    print(f"✅ {db_path}: applied migration {version} ({description})")
+            finally:
+                await db.close()
+
+        _migrated.add(db_path)
+        return applied
+
+
+async def migrate_all():
+    """Run migrations for every registered database (called once at startup)"""
+    for db_path in MIGRATIONS:
+        await migrate(db_path)
@@ -1,7 +1,8 @@
-import aiosqlite
 import discord
 from datetime import datetime, timedelta
 import json
+from .database import get_database
+from .migrations import migrate
 
 class ModerationManager:
     """Handles moderation database and logic"""
@@ -9,56 +10,16 @@ class ModerationManager:
     def __init__(self, bot):
         self.bot = bot
         self.db_path = "Data/moderation.db"
+        self.db = get_database(self.db_path)
 
     async def setup_database(self):
-        """Initialize moderation database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS cases (
-                    case_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    guild_id INTEGER NOT NULL,
-                    user_id INTEGER NOT NULL,
-                    moderator_id INTEGER NOT NULL,
-                    action_type TEXT NOT NULL,
-                    reason TEXT,
-                    duration TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    expires_at DATETIME,
-                    active INTEGER DEFAULT 1
-                )
-            """)
-
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS warnings (
-                    user_id INTEGER PRIMARY KEY,
-                    guild_id INTEGER NOT NULL,
-                    warn_count INTEGER DEFAULT 0,
-                    last_warn_at DATETIME
-                )
-            """)
-
-            
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS mod_logs (
-                    log_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    case_id INTEGER,
-                    guild_id INTEGER NOT NULL,
-                    action TEXT NOT NULL,
-                    details TEXT,
-                    timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                    FOREIGN KEY(case_id) REFERENCES cases(case_id)
-                )
-            """)
-
-            await db.commit()
-            print("✅ Moderation database initialized")
+        """Initialize moderation database (runs pending migrations once)"""
+        await migrate(self.db_path)
 
     async def create_case(self, guild_id: int, user_id: int, moderator_id: int,
                          action_type: str, reason: str = None, duration: str = None) -> int:
         """Create a new moderation case"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             expires_at = None
             if duration:
                 expires_at = self._parse_duration(duration)
@@ -68,7 +29,6 @@ class ModerationManager:
                 VALUES (?, ?, ?, ?, ?, ?, ?)
             """, (guild_id, user_id, moderator_id, action_type, reason, duration, expires_at))
 
-            await db.commit()
             case_id = cursor.lastrowid
 
             
@@ -79,7 +39,7 @@ class ModerationManager:
 
     async def add_warning(self, guild_id: int, user_id: int) -> int:
         """Add a warning to a user and return new warn count"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             
             cursor = await db.execute("""
                 SELECT warn_count FROM warnings WHERE user_id = ? AND guild_id = ?
@@ -101,12 +61,11 @@ class ModerationManager:
                     VALUES (?, ?, ?, ?)
                 """, (user_id, guild_id, new_count, datetime.now()))
 
-            await db.commit()
             return new_count
 
     async def remove_warning(self, guild_id: int, user_id: int) -> tuple[bool, int]:
         """Remove a warning from a user, returns (success, new_count)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             cursor = await db.execute("""
                 SELECT warn_count FROM warnings WHERE user_id = ? AND guild_id = ?
             """, (user_id, guild_id))
@@ -123,12 +82,11 @@ class ModerationManager:
                 WHERE user_id = ? AND guild_id = ?
             """, (new_count, datetime.now(), user_id, guild_id))
 
-            await db.commit()
             return True, new_count
 
     async def get_warning_count(self, guild_id: int, user_id: int) -> int:
         """Get warning count for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT warn_count FROM warnings WHERE user_id = ? AND guild_id = ?
             """, (user_id, guild_id))
@@ -138,7 +96,7 @@ class ModerationManager:
 
     async def get_user_cases(self, guild_id: int, user_id: int, limit: int = 10) -> list:
         """Get moderation history for a user"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT case_id, action_type, reason, moderator_id, timestamp, duration, active
                 FROM cases
@@ -151,7 +109,7 @@ class ModerationManager:
 
     async def get_all_logs(self, guild_id: int, limit: int = 50) -> list:
         """Get all moderation logs for terminal logging"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("""
                 SELECT log_id, case_id, action, details, timestamp
                 FROM mod_logs
@@ -164,20 +122,18 @@ class ModerationManager:
 
     async def deactivate_case(self, case_id: int):
         """Deactivate a case (for unbans, unmutes, etc.)"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             await db.execute("""
                 UPDATE cases SET active = 0 WHERE case_id = ?
             """, (case_id,))
-            await db.commit()
 
     async def _log_action(self, case_id: int, guild_id: int, action: str, details: str):
         """Internal: Log an action to mod_logs"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             await db.execute("""
                 INSERT INTO mod_logs (case_id, guild_id, action, details)
                 VALUES (?, ?, ?, ?)
             """, (case_id, guild_id, action, details))
-            await db.commit()
 
     def _parse_duration(self, duration_str: str) -> str:
         """Parse duration string (e.g., '1d', '2h', '30m') to ISO datetime"""
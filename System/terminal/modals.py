@@ -151,6 +151,7 @@ class SudoModal(discord.ui.Modal):
         if success:
             
             TerminalLogger.log_sudo(server, channel, user, cmd_string, True)
+            self.user_manager.grant_sudo(discord_id, self.channel_id)
 
             
             response = await self.execute_callback(discord_id, self.command, self.args, self.channel_id, self.guild)
@@ -170,7 +171,7 @@ class SudoModal(discord.ui.Modal):
 
 class RootModal(discord.ui.Modal):
     """Modal for root password confirmation (only for terminal admins)"""
-    def __init__(self, user_manager, sudo_manager, execute_callback, command, args, channel_id, guild=None):
+    def __init__(self, user_manager, sudo_manager, execute_callback, command, args, channel_id, guild=None, attachments=None):
         super().__init__(title=f"Root - Execute '{command}'")
         self.user_manager = user_manager
         self.sudo_manager = sudo_manager
@@ -179,6 +180,7 @@ class RootModal(discord.ui.Modal):
         self.args = args
         self.channel_id = channel_id
         self.guild = guild
+        self.attachments = attachments or []
 
         self.password = discord.ui.InputText(
             label="Enter your admin password to confirm",
@@ -209,14 +211,17 @@ class RootModal(discord.ui.Modal):
         if success:
             
             TerminalLogger.log_sudo(server, channel, user, f"ROOT: {cmd_string}", True)
+            self.user_manager.grant_sudo(discord_id, self.channel_id)
 
             
-            response = await self.execute_callback(discord_id, self.command, self.args, self.channel_id, self.guild)
+            await interaction.response.defer()
+            response = await self.execute_callback(discord_id, self.command, self.args, self.channel_id, self.guild,
+                                                   self.attachments)
 
             
             TerminalLogger.log_output(server, channel, user, response, success=True)
 
-            await interaction.response.send_message(
+            await interaction.followup.send(
                 f"✅ Root command executed\n{response}"
             )
         else:
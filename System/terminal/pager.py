@@ -0,0 +1,60 @@
+import discord
+from .permissions import format_code_block
+
+
+class PagerView(discord.ui.View):
+    """Button-driven pager (less): only the page on screen is fetched from the filesystem"""
+
+    def __init__(self, owner_id: int, title: str, fetch_page, total_pages: int, timeout: float = 300):
+        super().__init__(timeout=timeout, disable_on_timeout=True)
+        self.owner_id = owner_id
+        self.title = title
+        self.fetch_page = fetch_page
+        self.total_pages = max(1, total_pages)
+        self.page = 0
+        self._update_buttons()
+
+    async def render(self) -> str:
+        """Message content for the current page"""
+        text = await self.fetch_page(self.page)
+        return f"📄 **{self.title}** — page {self.page + 1}/{self.total_pages}\n" + format_code_block(text or "(empty file)")
+
+    def _update_buttons(self):
+        """Disable the buttons that would leave the file"""
+        self.first_page.disabled = self.previous_page.disabled = self.page == 0
+        self.next_page.disabled = self.last_page.disabled = self.page >= self.total_pages - 1
+
+    async def _show(self, interaction: discord.Interaction, page: int):
+        """Switch to a page and redraw the message"""
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ This pager belongs to another user", ephemeral=True)
+            return
+
+        self.page = max(0, min(page, self.total_pages - 1))
+        self._update_buttons()
+        await interaction.response.edit_message(content=await self.render(), view=self)
+
+    @discord.ui.button(emoji="⏮️", style=discord.ButtonStyle.secondary)
+    async def first_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        await self._show(interaction, 0)
+
+    @discord.ui.button(emoji="◀️", style=discord.ButtonStyle.primary)
+    async def previous_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        await self._show(interaction, self.page - 1)
+
+    @discord.ui.button(emoji="▶️", style=discord.ButtonStyle.primary)
+    async def next_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        await self._show(interaction, self.page + 1)
+
+    @discord.ui.button(emoji="⏭️", style=discord.ButtonStyle.secondary)
+    async def last_page(self, button: discord.ui.Button, interaction: discord.Interaction):
+        await self._show(interaction, self.total_pages - 1)
+
+    @discord.ui.button(emoji="✖️", style=discord.ButtonStyle.danger)
+    async def close(self, button: discord.ui.Button, interaction: discord.Interaction):
+        if interaction.user.id != self.owner_id:
+            await interaction.response.send_message("❌ This pager belongs to another user", ephemeral=True)
+            return
+
+        self.stop()
+        await interaction.response.edit_message(view=None)
@@ -1,5 +1,6 @@
 import discord
 from functools import wraps
+from .hashing import HasherBusy
 
 class PermissionManager:
     """Manages command permissions and role checks"""
@@ -99,9 +100,7 @@ class SudoManager:
         Verify password for sudo command (available to ALL users)
         Returns: (success: bool, message: str)
         """
-        import aiosqlite
-
-        async with aiosqlite.connect(self.user_manager.db_path) as db:
+        async with self.user_manager.db.read() as db:
             cursor = await db.execute("""
                 SELECT password_hash FROM users WHERE discord_id = ?
             """, (discord_id,))
@@ -110,22 +109,23 @@ class SudoManager:
             if not result:
                 return False, "User not found"
 
-            password_hash = result[0]
+        password_hash = result[0]
 
+        try:
             
-            if not self.user_manager.verify_password(password, password_hash):
+            if not await self.user_manager.verify_password(password, password_hash):
                 return False, "Incorrect password"
+        except HasherBusy as e:
+            return False, str(e)
 
-            return True, "Password verified"
+        return True, "Password verified"
 
     async def verify_root_password(self, discord_id: int, password: str) -> tuple[bool, str]:
         """
         Verify password for root command (only for terminal admins)
         Returns: (success: bool, message: str)
         """
-        import aiosqlite
-
-        async with aiosqlite.connect(self.user_manager.db_path) as db:
+        async with self.user_manager.db.read() as db:
             cursor = await db.execute("""
                 SELECT password_hash, role FROM users WHERE discord_id = ?
             """, (discord_id,))
@@ -134,17 +134,20 @@ class SudoManager:
             if not result:
                 return False, "User not found"
 
-            password_hash, role = result
+        password_hash, role = result
 
+        try:
             
-            if not self.user_manager.verify_password(password, password_hash):
+            if not await self.user_manager.verify_password(password, password_hash):
                 return False, "Incorrect password"
+        except HasherBusy as e:
+            return False, str(e)
 
-            
-            if role != 'admin':
-                return False, "Your account does not have root privileges (terminal admin required)"
+        
+        if role != 'admin':
+            return False, "Your account does not have root privileges (terminal admin required)"
 
-            return True, "Root access granted"
+        return True, "Root access granted"
 
 
 def format_output(text: str, success: bool = True) -> str:
@@ -160,6 +163,11 @@ def format_error(text: str) -> str:
     return format_output(f"Error: {text}", success=False)
 
 
+def is_error(text: str) -> bool:
+    """Whether a command reply was produced by format_error"""
+    return bool(text) and text.startswith("```\n[") and "] ❌ " in text[:24]
+
+
 def format_code_block(text: str, language: str = "") -> str:
     """Format text in code block"""
     return f"```{language}\n{text}\n```"
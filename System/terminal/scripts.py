@@ -0,0 +1,161 @@
+"""
+Terminal scripts: executable files holding one command line per line.
+
+`run <file>` (or `./file`) feeds every line through the shell inside a single
+filesystem write unit, so a script costs one transaction and its changes
+commit together. The first failing line, the step limit or the time limits
+abort the script and roll back everything it changed. Like a subshell, a
+script's `cd` does not outlive it.
+
+The write unit holds the filesystem writer that every user shares, so it is
+held for at most script_max_lock_seconds, and messages that script lines send
+to the channel (the pager of a long `cat`) are queued and only sent once the
+write unit is over.
+"""
+import asyncio
+from .shell import ShellError, parse
+from .permissions import format_output, format_error
+from .commands import command
+
+BLOCKED_COMMANDS = {
+    'register', 'login', 'logout', 'passwd', 'resetpw', 'sudo', 'root',
+    'less', 'upload', 'download', 'run', 'clear', 'cls'
+}
+
+
+class ScriptAborted(Exception):
+    """Stops a script; the filesystem write unit is rolled back"""
+
+    def __init__(self, line_number: int, reason: str):
+        super().__init__(reason)
+        self.line_number = line_number
+        self.reason = reason
+
+
+class DeferredChannel:
+    """The invoking channel as script lines see it: sends are queued until flush()"""
+
+    def __init__(self, channel):
+        self.channel = channel
+        self.id = channel.id
+        self.pending = []
+
+    async def send(self, *args, **kwargs):
+        self.pending.append((args, kwargs))
+
+    async def flush(self):
+        """Send the queued messages"""
+        pending, self.pending = self.pending, []
+        for args, kwargs in pending:
+            await self.channel.send(*args, **kwargs)
+
+
+class ScriptMessage:
+    """The invoking message with its channel replaced by a DeferredChannel"""
+
+    def __init__(self, message, channel: DeferredChannel):
+        self._message = message
+        self.channel = channel
+
+    def __getattr__(self, name):
+        return getattr(self._message, name)
+
+
+class ScriptRunner:
+    """Executes script files for `run`"""
+
+    def __init__(self, terminal_core):
+        self.core = terminal_core
+        self.fs = terminal_core.filesystem
+        self.um = terminal_core.user_manager
+        settings = self.fs.config['settings']
+        self.max_steps = settings.get('script_max_steps', 200)
+        self.max_seconds = settings.get('script_max_seconds', 10)
+        self.max_lock_seconds = settings.get('script_max_lock_seconds', 2)
+        self.max_output = settings.get('script_max_output_chars', 6000)
+
+    @command('run', category='filesystem', usage='run <script> | ./script',
+             description='Run an executable script file, one command line per line', context=('message',))
+    async def cmd_run(self, discord_id: int, args: list, message=None) -> str:
+        """Run an executable script file"""
+        session = self.um.get_session(discord_id)
+        if not session:
+            return format_error("Not logged in")
+
+        if not args:
+            return format_error("Usage: run <script>  (or ./script)")
+
+        path = self.fs.resolve_path(session['current_dir'], args[0])
+        info = await self.fs.stat(discord_id, path)
+        if info is None:
+            return format_error(f"File not found: {path}")
+        if info.type != 'file':
+            return format_error(f"{path} is not a script")
+        if not info.executable:
+            return format_error(f"Permission denied: {path} is not executable (chmod 755 {args[0]})")
+
+        success, content = await self.fs.read_file(discord_id, path)
+        if not success:
+            return format_error(content)
+
+        steps = [(number, line.strip()) for number, line in enumerate(content.split('\n'), 1)
+                 if line.strip() and not line.strip().startswith('#')]
+        if len(steps) > self.max_steps:
+            return format_error(f"Script has {len(steps)} steps (limit is {self.max_steps})")
+
+        replies = []
+        current_dir = session['current_dir']
+        channel = DeferredChannel(message.channel) if message is not None else None
+        script_message = ScriptMessage(message, channel) if message is not None else None
+        locked = False
+        try:
+            async with asyncio.timeout(self.max_seconds):
+                async with self.fs.batch(discord_id):
+                    locked = True
+                    async with asyncio.timeout(self.max_lock_seconds):
+                        for number, line in steps:
+                            self._check_line(number, line)
+                            status, reply = await self.core.shell.run_line(script_message, line)
+                            if reply:
+                                replies.append(reply)
+                            if not status:
+                                raise ScriptAborted(number, "command failed")
+        except ScriptAborted as e:
+            replies.append(format_error(f"{path}: aborted at line {e.line_number} ({e.reason}), no changes were saved"))
+        except TimeoutError:
+            if locked:
+                replies.append(format_error(f"{path}: exceeded {self.max_lock_seconds}s, no changes were saved"))
+            else:
+                replies.append(format_error(f"{path}: filesystem busy for {self.max_seconds}s, nothing was run"))
+        else:
+            replies.append(format_output(f"{path}: {len(steps)} steps completed, changes saved"))
+        finally:
+            self.um.update_current_directory(discord_id, current_dir)
+
+        if channel is not None:
+            await channel.flush()
+        return self._join(replies)
+
+    def _check_line(self, number: int, line: str):
+        """Reject lines that cannot run inside a script"""
+        try:
+            chain = parse(line)
+        except ShellError as e:
+            raise ScriptAborted(number, str(e))
+
+        for _, pipeline in chain:
+            for command in pipeline.commands:
+                if command.name in BLOCKED_COMMANDS or '/' in command.name:
+                    raise ScriptAborted(number, f"'{command.name}' cannot be used in scripts")
+
+    def _join(self, replies: list) -> str:
+        """Aggregate replies, dropping the oldest ones beyond the output limit (the summary is always kept)"""
+        kept = [replies[-1]]
+        size = len(replies[-1])
+        for reply in reversed(replies[:-1]):
+            size += len(reply) + 1
+            if size > self.max_output:
+                kept.append("... earlier output omitted")
+                break
+            kept.append(reply)
+        return '\n'.join(reversed(kept))
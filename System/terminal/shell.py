@@ -0,0 +1,473 @@
+"""
+Terminal shell: quoting, pipes, redirection and command chaining.
+
+A message is parsed into pipelines joined by `;`, `&&` and `||`. A pipeline of
+one plain command is routed exactly like before; anything with a `|` or a
+`>`/`>>` redirect runs on the stream commands below, which pass lines along as
+async generators. `cat big | grep x | head` therefore never holds more than
+the lines in flight, and a consumer that stops early closes everything
+upstream of it. The whole line produces one aggregated reply.
+"""
+import re
+import tempfile
+from collections import deque
+from contextlib import aclosing
+from .filesystem import FilesystemError
+from .permissions import format_output, format_error, format_code_block, is_error
+from .commands import command
+
+OPERATORS = ('&&', '||', '>>', '|', '>', ';')
+REDIRECTS = ('>', '>>')
+SPOOL_MEMORY = 1048576
+
+_WORD = re.compile(r"\s*([^\s;&|>]*)")
+
+
+class ShellError(Exception):
+    """A command line that cannot be parsed or a stream command that failed"""
+
+
+GREP_USAGE = 'grep [-i] [-v] [-n] [-c] [-l] [-E] <pattern> [path...]'
+
+
+def parse_grep_args(args: list) -> tuple[set, list]:
+    """Split grep arguments into (options, [pattern, paths...]). Raises: ShellError with the usage"""
+    options = set()
+    positional = []
+    for arg in args:
+        if arg.startswith('-') and len(arg) > 1 and not positional:
+            options.update(arg[1:])
+        else:
+            positional.append(arg)
+
+    if not positional or not options <= set('ivnclE'):
+        raise ShellError(f"Usage: {GREP_USAGE}")
+    return options, positional
+
+
+class SimpleCommand:
+    __slots__ = ('name', 'args')
+
+    def __init__(self, name: str, args: list):
+        self.name = name
+        self.args = args
+
+
+class Pipeline:
+    __slots__ = ('commands', 'redirect')
+
+    def __init__(self, commands: list, redirect: tuple = None):
+        self.commands = commands
+        self.redirect = redirect
+
+
+def leading_word(line: str, start: int = 0) -> tuple[str, int]:
+    """
+    The first word at or after start (skipping whitespace, ending at whitespace
+    or an operator) and the index just after it, in one scan of just that word
+    """
+    match = _WORD.match(line, start)
+    return match.group(1), match.end()
+
+
+def tokenize(line: str) -> list:
+    """
+    Split a command line into ('word', text) and ('op', operator) tokens.
+    Single quotes are literal, double quotes allow \\" and \\\\, a backslash
+    outside quotes escapes the next character.
+    """
+    tokens = []
+    word = None
+    i = 0
+
+    while i < len(line):
+        char = line[i]
+
+        if char.isspace():
+            if word is not None:
+                tokens.append(('word', word))
+                word = None
+            i += 1
+            continue
+
+        operator = next((op for op in OPERATORS if line.startswith(op, i)), None)
+        if operator:
+            if word is not None:
+                tokens.append(('word', word))
+                word = None
+            tokens.append(('op', operator))
+            i += len(operator)
+            continue
+
+        word = word or ''
+        if char == "'":
+            end = line.find("'", i + 1)
+            if end == -1:
+                raise ShellError("Unterminated single quote")
+            word += line[i + 1:end]
+            i = end + 1
+        elif char == '"':
+            i += 1
+            while i < len(line) and line[i] != '"':
+                if line[i] == '\\' and i + 1 < len(line) and line[i + 1] in '"\\':
+                    i += 1
+                word += line[i]
+                i += 1
+            if i >= len(line):
+                raise ShellError("Unterminated double quote")
+            i += 1
+        elif char == '\\' and i + 1 < len(line):
+            word += line[i + 1]
+            i += 2
+        else:
+            word += char
+            i += 1
+
+    if word is not None:
+        tokens.append(('word', word))
+    return tokens
+
+
+def parse(line: str) -> list:
+    """Parse a command line. Returns: [(connector, Pipeline)] with connector None for the first pipeline"""
+    chain = []
+    connector = None
+    commands = []
+    words = []
+    redirect = None
+    tokens = tokenize(line)
+    i = 0
+
+    def finish_command():
+        if not words:
+            raise ShellError("Syntax error: missing command")
+        name = words[0] if '/' in words[0] else words[0].lower()
+        commands.append(SimpleCommand(name, words[1:]))
+        words.clear()
+
+    while i < len(tokens):
+        kind, value = tokens[i]
+
+        if kind == 'word':
+            if redirect is not None:
+                raise ShellError(f"Syntax error near '{value}'")
+            words.append(value)
+        elif value == '|':
+            if redirect is not None:
+                raise ShellError("Syntax error: '|' after a redirect")
+            finish_command()
+        elif value in REDIRECTS:
+            if i + 1 >= len(tokens) or tokens[i + 1][0] != 'word':
+                raise ShellError(f"Syntax error: missing file after '{value}'")
+            finish_command()
+            redirect = (value, tokens[i + 1][1])
+            i += 1
+        else:
+            if redirect is None:
+                finish_command()
+            chain.append((connector, Pipeline(commands, redirect)))
+            connector, commands, redirect = value, [], None
+        i += 1
+
+    
+    if redirect is None and (words or commands or connector in ('&&', '||')):
+        finish_command()
+    if commands:
+        chain.append((connector, Pipeline(commands, redirect)))
+    return chain
+
+
+class Shell:
+    """Runs parsed command lines for the terminal"""
+
+    def __init__(self, terminal_core):
+        self.core = terminal_core
+        self.fs = terminal_core.filesystem
+        self.um = terminal_core.user_manager
+        self.stream_commands = {
+            'cat': self._cat,
+            'echo': self._echo,
+            'grep': self._grep,
+            'head': self._head,
+            'tail': self._tail,
+            'wc': self._wc
+        }
+
+    async def execute(self, message, line: str) -> str:
+        """Run a whole command line and return one aggregated reply (None if nothing to say)"""
+        _, reply = await self.run_line(message, line)
+        return reply
+
+    async def run_line(self, message, line: str) -> tuple[bool, str]:
+        """Run a whole command line. Returns: (status of the last pipeline that ran, aggregated reply)"""
+        try:
+            chain = parse(line)
+        except ShellError as e:
+            return False, format_error(str(e))
+
+        replies = []
+        status = True
+        for connector, pipeline in chain:
+            if (connector == '&&' and not status) or (connector == '||' and status):
+                continue
+
+            status, reply = await self._run_pipeline(message, pipeline)
+            if reply:
+                replies.append(reply)
+
+        return status, '\n'.join(replies) or None
+
+    async def _run_pipeline(self, message, pipeline: Pipeline) -> tuple[bool, str]:
+        """(success, reply) for one pipeline"""
+        if '/' in pipeline.commands[0].name:
+            first = pipeline.commands[0]
+            pipeline.commands[0] = SimpleCommand('run', [first.name] + first.args)
+
+        for command in pipeline.commands:
+            if command.name not in self.core.registry:
+                return False, format_error(f"{command.name}: command not found")
+
+        command = pipeline.commands[0]
+        if len(pipeline.commands) == 1 and pipeline.redirect is None:
+            reply = await self.core.route_command(message, command.name, command.args)
+            return not is_error(reply), reply
+
+        discord_id = message.author.id
+        session = self.um.get_session(discord_id)
+        if not session:
+            return False, format_error("You must be logged in. Use 'register' or 'login'")
+
+        try:
+            stream = None
+            for command in pipeline.commands:
+                handler = self.stream_commands.get(command.name)
+                if handler is None:
+                    raise ShellError(f"{command.name} cannot be used in a pipe or redirect")
+                stream = handler(discord_id, session, command.args, stream)
+
+            if pipeline.redirect:
+                return True, await self._redirect(discord_id, session, stream, *pipeline.redirect)
+            return True, await self._collect(stream)
+        except ShellError as e:
+            return False, format_error(str(e))
+
+    @command('wc', category='filesystem', usage='wc [-l] [-w] [-c] [file...]',
+             description='Count lines, words and characters of files or piped input')
+    async def cmd_wc(self, discord_id: int, args: list) -> str:
+        """wc outside a pipeline"""
+        try:
+            return await self._collect(self._wc(discord_id, self.um.get_session(discord_id), args, None))
+        except ShellError as e:
+            return format_error(str(e))
+
+    async def _collect(self, stream) -> str:
+        """Render a stream as the reply, reading no further than the inline limit"""
+        limit = self.fs.config['settings'].get('cat_inline_max_chars', 1800)
+        lines = []
+        size = 0
+        truncated = False
+
+        async with aclosing(stream):
+            async for line in stream:
+                size += len(line) + 1
+                if size > limit:
+                    truncated = True
+                    break
+                lines.append(line)
+
+        text = format_code_block('\n'.join(lines) if lines else "(no output)")
+        if truncated:
+            text += "\n... output truncated, redirect it into a file to keep all of it"
+        return text
+
+    async def _redirect(self, discord_id: int, session: dict, stream, mode: str, target: str) -> str:
+        """Write (>) or append (>>) a stream to a file through a spooled temp file"""
+        path = self.fs.resolve_path(session['current_dir'], target)
+
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY) as spool:
+            separator = ''
+            if mode == '>>':
+                info = await self.fs.stat(discord_id, path)
+                if info is not None and not info.is_directory:
+                    last = ''
+                    async with aclosing(self._file_text(discord_id, path)) as chunks:
+                        async for chunk in chunks:
+                            spool.write(chunk.encode('utf-8'))
+                            last = chunk
+                    separator = '\n' if last and not last.endswith('\n') else ''
+
+            async with aclosing(stream):
+                async for line in stream:
+                    spool.write((separator + line).encode('utf-8'))
+                    separator = '\n'
+
+            spool.seek(0)
+            success, result = await self.fs.write_stream(discord_id, path, spool)
+
+        if not success:
+            raise ShellError(result)
+        return format_output(f"Content written to {target}")
+
+    async def _file_text(self, discord_id: int, path: str):
+        """A file's chunks (FilesystemError becomes ShellError)"""
+        try:
+            async for chunk in self.fs.iter_chunks(discord_id, path):
+                yield chunk
+        except FilesystemError as e:
+            raise ShellError(str(e))
+
+    async def _file_lines(self, discord_id: int, session: dict, target: str):
+        """Lines of a file, split incrementally from its chunks"""
+        path = self.fs.resolve_path(session['current_dir'], target)
+        buffer = ''
+        async with aclosing(self._file_text(discord_id, path)) as chunks:
+            async for chunk in chunks:
+                parts = (buffer + chunk).split('\n')
+                buffer = parts.pop()
+                for part in parts:
+                    yield part
+        if buffer:
+            yield buffer
+
+    async def _input(self, discord_id: int, session: dict, files: list, stdin, usage: str):
+        """Lines of the named files, or of stdin when no file is given"""
+        if files:
+            for target in files:
+                async with aclosing(self._file_lines(discord_id, session, target)) as lines:
+                    async for line in lines:
+                        yield line
+        elif stdin is not None:
+            async with aclosing(stdin):
+                async for line in stdin:
+                    yield line
+        else:
+            raise ShellError(usage)
+
+    async def _cat(self, discord_id: int, session: dict, args: list, stdin):
+        """cat [file...]"""
+        async with aclosing(self._input(discord_id, session, args, stdin, "Usage: cat <filename>")) as lines:
+            async for line in lines:
+                yield line
+
+    async def _echo(self, discord_id: int, session: dict, args: list, stdin):
+        """echo [text...] (ignores its input)"""
+        if stdin is not None:
+            await stdin.aclose()
+        yield ' '.join(args)
+
+    async def _grep(self, discord_id: int, session: dict, args: list, stdin):
+        """grep [-i] [-v] [-n] [-c] [-l] [-E] <pattern> [path...]"""
+        options, positional = parse_grep_args(args)
+
+        pattern = positional[0]
+        try:
+            matcher = re.compile(pattern if 'E' in options else re.escape(pattern),
+                                 re.IGNORECASE if 'i' in options else 0)
+        except re.error as e:
+            raise ShellError(f"Invalid regular expression: {e}")
+
+        total = 0
+        for files in [[name] for name in positional[1:]] or [[]]:
+            count = 0
+            source = self._input(discord_id, session, files, stdin, "grep: no input (give a file or pipe into it)")
+            async with aclosing(source) as lines:
+                async for number, line in _enumerate(lines, 1):
+                    if bool(matcher.search(line)) == ('v' in options):
+                        continue
+                    count += 1
+                    if 'l' in options:
+                        break
+                    if 'c' not in options:
+                        yield f"{number}:{line}" if 'n' in options else line
+
+            total += count
+            if 'l' in options and count:
+                yield files[0] if files else "(standard input)"
+
+        if 'c' in options and 'l' not in options:
+            yield str(total)
+
+    def _line_count(self, args: list, command: str) -> tuple[int, list]:
+        """Parse -n N / -N for head and tail. Returns: (count, remaining args)"""
+        count = 10
+        rest = []
+        i = 0
+        while i < len(args):
+            if args[i] == '-n' and i + 1 < len(args) and args[i + 1].isdigit():
+                count = int(args[i + 1])
+                i += 1
+            elif args[i].startswith('-') and args[i][1:].isdigit():
+                count = int(args[i][1:])
+            elif args[i].startswith('-'):
+                raise ShellError(f"Usage: {command} [-n lines] [file]")
+            else:
+                rest.append(args[i])
+            i += 1
+        return count, rest
+
+    async def _head(self, discord_id: int, session: dict, args: list, stdin):
+        """head [-n N] [file]"""
+        count, files = self._line_count(args, 'head')
+        if count <= 0:
+            if stdin is not None:
+                await stdin.aclose()
+            return
+
+        source = self._input(discord_id, session, files, stdin, "Usage: head [-n lines] [file]")
+        async with aclosing(source) as lines:
+            async for number, line in _enumerate(lines, 1):
+                yield line
+                if number >= count:
+                    break
+
+    async def _tail(self, discord_id: int, session: dict, args: list, stdin):
+        """tail [-n N] [file] (a file is read from its last chunks only)"""
+        count, files = self._line_count(args, 'tail')
+
+        if len(files) == 1:
+            if stdin is not None:
+                await stdin.aclose()
+            path = self.fs.resolve_path(session['current_dir'], files[0])
+            success, result = await self.fs.read_lines(discord_id, path, -count, count)
+            if not success:
+                raise ShellError(result)
+            for line in result[0]:
+                yield line
+            return
+
+        last = deque(maxlen=count)
+        async with aclosing(self._input(discord_id, session, files, stdin, "Usage: tail [-n lines] [file]")) as lines:
+            async for line in lines:
+                last.append(line)
+        for line in last:
+            yield line
+
+    async def _wc(self, discord_id: int, session: dict, args: list, stdin):
+        """wc [-l] [-w] [-c] [file...]"""
+        options = set()
+        files = []
+        for arg in args:
+            if arg.startswith('-') and len(arg) > 1:
+                options.update(arg[1:])
+            else:
+                files.append(arg)
+        if not options <= set('lwc'):
+            raise ShellError("Usage: wc [-l] [-w] [-c] [file...]")
+
+        lines = words = chars = 0
+        async with aclosing(self._input(discord_id, session, files, stdin, "Usage: wc [-l] [-w] [-c] [file...]")) as source:
+            async for line in source:
+                lines += 1
+                words += len(line.split())
+                chars += len(line) + 1
+
+        counts = {'l': lines, 'w': words, 'c': chars}
+        yield ' '.join(str(counts[flag]) for flag in 'lwc' if not options or flag in options)
+
+
+async def _enumerate(lines, start: int = 0):
+    """enumerate() for async iterators"""
+    number = start
+    async for line in lines:
+        yield number, line
+        number += 1
@@ -0,0 +1,134 @@
+import tempfile
+import zlib
+import aiohttp
+import discord
+from pathlib import Path
+from .filesystem import FilesystemError
+
+SPOOL_MEMORY = 1048576
+
+
+class TransferError(Exception):
+    """An upload or download that cannot be completed"""
+
+
+class FileTransfer:
+    """Bridges Discord attachments and the virtual filesystem without holding whole files in memory"""
+
+    def __init__(self, filesystem):
+        self.fs = filesystem
+        settings = filesystem.config['settings']
+        self.upload_max_bytes = settings.get('upload_max_bytes', 10485760)
+        self.download_max_bytes = settings.get('download_max_bytes', 8388608)
+        self.read_size = settings.get('transfer_read_size', 65536)
+
+    async def receive(self, owner_id: int, path: str, attachment: discord.Attachment) -> tuple[bool, str]:
+        """Stream an attachment (gunzipping .gz uploads) into a file"""
+        try:
+            spool = await self.spool_attachment(attachment)
+        except TransferError as e:
+            return False, str(e)
+
+        with spool:
+            spool.seek(0)
+            return await self.fs.write_stream(owner_id, path, spool, self.read_size)
+
+    async def spool_attachment(self, attachment: discord.Attachment, max_bytes: int = None):
+        """Download an attachment into a spooled temp file, enforcing max_bytes (default upload_max_bytes) on the decoded size"""
+        max_bytes = self.upload_max_bytes if max_bytes is None else max_bytes
+        compressed = attachment.filename.lower().endswith('.gz')
+        if not compressed and attachment.size > max_bytes:
+            raise TransferError(f"File too large: {attachment.size:,} bytes (limit is {max_bytes:,})")
+
+        inflater = zlib.decompressobj(31) if compressed else None
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        written = 0
+
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.get(attachment.url) as response:
+                    if response.status != 200:
+                        raise TransferError(f"Could not fetch attachment (HTTP {response.status})")
+
+                    async for piece in response.content.iter_chunked(self.read_size):
+                        if inflater is not None:
+                            try:
+                                piece = inflater.decompress(piece, max_bytes - written + 1)
+                            except zlib.error:
+                                raise TransferError("Attachment is not valid gzip data")
+
+                        written += len(piece)
+                        if written > max_bytes:
+                            raise TransferError(f"File too large (limit is {max_bytes:,} bytes)")
+                        spool.write(piece)
+
+            if inflater is not None and not inflater.eof:
+                raise TransferError("Attachment is a truncated gzip stream")
+        except aiohttp.ClientError as e:
+            spool.close()
+            raise TransferError(f"Could not fetch attachment: {e}")
+        except TransferError:
+            spool.close()
+            raise
+
+        return spool
+
+    async def send(self, owner_id: int, path: str, compress: bool = False) -> discord.File:
+        """
+        Spool a file into a discord.File under its own name, or gzipped (as
+        name.gz) when compress is set or the raw file would exceed
+        download_max_bytes. Raises TransferError if it cannot be sent.
+        """
+        info = await self.fs.stat(owner_id, path)
+        if info is None:
+            raise TransferError(f"File not found: {path}")
+        if info.is_directory:
+            raise TransferError(f"{path} is a directory")
+
+        compress = compress or info.size > self.download_max_bytes
+        spool = await self._spool(owner_id, path, compress)
+        if spool is None:
+            compress = True
+            spool = await self._spool(owner_id, path, compress)
+
+        spool.seek(0)
+        name = Path(path).name + ('.gz' if compress else '')
+        return discord.File(spool, filename=name)
+
+    async def _spool(self, owner_id: int, path: str, compress: bool):
+        """
+        A file's bytes (gzipped if compress) in a spooled temp file, or None
+        if the raw bytes exceed download_max_bytes.
+        Raises TransferError if even the gzipped file is too large.
+        """
+        deflater = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        spool = tempfile.SpooledTemporaryFile(max_size=SPOOL_MEMORY)
+        written = 0
+
+        try:
+            async for chunk in self.fs.iter_chunks(owner_id, path):
+                data = chunk.encode('utf-8')
+                if deflater is not None:
+                    data = deflater.compress(data)
+
+                written += len(data)
+                if written > self.download_max_bytes:
+                    if deflater is None:
+                        spool.close()
+                        return None
+                    raise TransferError(f"File too large to send (limit is {self.download_max_bytes:,} bytes)")
+                spool.write(data)
+
+            if deflater is not None:
+                data = deflater.flush()
+                if written + len(data) > self.download_max_bytes:
+                    raise TransferError(f"File too large to send (limit is {self.download_max_bytes:,} bytes)")
+                spool.write(data)
+        except FilesystemError as e:
+            spool.close()
+            raise TransferError(str(e))
+        except TransferError:
+            spool.close()
+            raise
+
+        return spool
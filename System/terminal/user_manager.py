@@ -1,90 +1,60 @@
-import aiosqlite
-import bcrypt
-import json
+import asyncio
+import time
+import weakref
 import discord
 from datetime import datetime, timedelta
 from pathlib import Path
+from .database import get_database
+from .config import CONFIG, ADMINS_PATH
+from .hashing import PasswordHasher, HasherBusy
+from .migrations import migrate
 
 class UserManager:
     def __init__(self, bot):
         self.bot = bot
         self.db_path = "Data/terminal_users.db"
+        self.db = get_database(self.db_path)
         self.config_path = "Data/terminal_config.json"
-        self.admin_config_path = "Data/terminal_admins.json"
-        self.config = self.load_config()
+        self.admin_config_path = ADMINS_PATH
         self.sessions = {}  
+        settings = self.config['settings']
+        self.hasher = PasswordHasher(settings.get('password_hash_workers', 2), settings.get('password_hash_queue', 16))
+        self._password_locks = weakref.WeakValueDictionary()
 
-    def load_config(self):
-        """Load configuration from JSON"""
-        with open(self.config_path, 'r', encoding='utf-8') as f:
-            return json.load(f)
-
-    def save_config(self):
-        """Save configuration to JSON"""
-        with open(self.config_path, 'w', encoding='utf-8') as f:
-            json.dump(self.config, f, indent=2)
+    @property
+    def config(self):
+        """Current terminal configuration snapshot (read-only)"""
+        return CONFIG.get(self.config_path)
 
     def load_admin_config(self):
-        """Load admin configuration from JSON"""
-        try:
-            with open(self.admin_config_path, 'r', encoding='utf-8') as f:
-                config = json.load(f)
-                return config.get('admins', [])
-        except FileNotFoundError:
-            return []
+        """Admin entries from the admin configuration"""
+        return CONFIG.get(self.admin_config_path, {'admins': []}).get('admins', ())
 
     def is_admin_by_discord_id(self, discord_id: int) -> bool:
         """Check if user is admin from JSON config"""
-        admins = self.load_admin_config()
-        return any(admin['discord_id'] == discord_id for admin in admins)
+        return CONFIG.is_admin(discord_id)
 
     async def setup_database(self):
-        """Initialize user database"""
-        async with aiosqlite.connect(self.db_path) as db:
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS users (
-                    discord_id INTEGER PRIMARY KEY,
-                    username TEXT UNIQUE NOT NULL,
-                    password_hash TEXT NOT NULL,
-                    role TEXT DEFAULT 'user',
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    last_login TIMESTAMP,
-                    failed_login_attempts INTEGER DEFAULT 0,
-                    locked_until TIMESTAMP
-                )
-            """)
+        """Initialize user database (runs pending migrations once)"""
+        await migrate(self.db_path)
 
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS login_history (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    discord_id INTEGER,
-                    username TEXT,
-                    action TEXT,
-                    timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    success INTEGER DEFAULT 1
-                )
-            """)
+    async def hash_password(self, password: str) -> str:
+        """Hash password using bcrypt on the hashing pool (raises HasherBusy)"""
+        return await self.hasher.hash(password)
 
-            await db.execute("""
-                CREATE TABLE IF NOT EXISTS password_reset_tokens (
-                    discord_id INTEGER PRIMARY KEY,
-                    reset_code TEXT NOT NULL,
-                    expires_at TIMESTAMP NOT NULL,
-                    attempts INTEGER DEFAULT 0
-                )
-            """)
-
-            await db.commit()
-            print("✅ User database initialized")
-
-    def hash_password(self, password: str) -> str:
-        """Hash password using bcrypt"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
-
-    def verify_password(self, password: str, password_hash: str) -> bool:
-        """Verify password against hash"""
-        return bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    async def verify_password(self, password: str, password_hash: str) -> bool:
+        """Verify password against hash on the hashing pool (raises HasherBusy)"""
+        return await self.hasher.verify(password, password_hash)
+
+    def password_lock(self, discord_id: int) -> asyncio.Lock:
+        """
+        Lock serializing the password checks of one account, so concurrent
+        attempts cannot all read the same failed-attempt count
+        """
+        lock = self._password_locks.get(discord_id)
+        if lock is None:
+            lock = self._password_locks[discord_id] = asyncio.Lock()
+        return lock
 
     async def register_user(self, discord_id: int, username: str, password: str, role: str = 'user') -> tuple[bool, str]:
         """
@@ -104,9 +74,12 @@ class UserManager:
             return False, f"Password must be at least {min_length} characters long"
 
         
-        password_hash = self.hash_password(password)
+        try:
+            password_hash = await self.hash_password(password)
+        except HasherBusy as e:
+            return False, str(e)
 
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             
             cursor = await db.execute("SELECT discord_id FROM users WHERE discord_id = ?", (discord_id,))
             if await cursor.fetchone():
@@ -127,14 +100,11 @@ class UserManager:
                     INSERT INTO users (discord_id, username, password_hash, role)
                     VALUES (?, ?, ?, ?)
                 """, (discord_id, username, password_hash, role))
-                await db.commit()
 
-                
                 await db.execute("""
                     INSERT INTO login_history (discord_id, username, action)
                     VALUES (?, ?, 'register')
                 """, (discord_id, username))
-                await db.commit()
 
                 return True, f"Account created successfully! Username: {username}\nUse 'login' to access the terminal."
 
@@ -146,63 +116,10 @@ class UserManager:
         Login user with username and password validation
         Returns: (success: bool, message: str)
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            cursor = await db.execute("""
-                SELECT username, password_hash, role, failed_login_attempts, locked_until
-                FROM users WHERE discord_id = ?
-            """, (discord_id,))
-            user_data = await cursor.fetchone()
-
-            if not user_data:
-                return False, "No account found. Use 'register' to create one."
-
-            db_username, password_hash, role, failed_attempts, locked_until = user_data
-
-            
-            if db_username != username:
-                return False, f"Incorrect username. Your account is registered as '{db_username}'"
-
-            
-            if locked_until:
-                lock_time = datetime.fromisoformat(locked_until)
-                if datetime.now() < lock_time:
-                    remaining = (lock_time - datetime.now()).seconds // 60
-                    return False, f"Account locked. Try again in {remaining} minutes."
-                else:
-                    
-                    await db.execute("UPDATE users SET locked_until = NULL, failed_login_attempts = 0 WHERE discord_id = ?", (discord_id,))
-                    await db.commit()
-
-            
-            if not self.verify_password(password, password_hash):
-                failed_attempts += 1
-                await db.execute("UPDATE users SET failed_login_attempts = ? WHERE discord_id = ?", (failed_attempts, discord_id))
-
-                max_attempts = self.config['settings']['max_failed_login_attempts']
-                if failed_attempts >= max_attempts:
-                    
-                    lock_until = datetime.now() + timedelta(minutes=15)
-                    await db.execute("UPDATE users SET locked_until = ? WHERE discord_id = ?", (lock_until, discord_id))
-                    await db.commit()
-                    return False, f"Account locked due to {max_attempts} failed login attempts. Try again in 15 minutes."
-
-                await db.commit()
-                await db.execute("INSERT INTO login_history (discord_id, username, action, success) VALUES (?, ?, 'login', 0)", (discord_id, username))
-                await db.commit()
-
-                remaining = max_attempts - failed_attempts
-                return False, f"Incorrect password. {remaining} attempts remaining."
+        error, username, role = await self._authenticate(discord_id, password, username)
+        if error:
+            return False, error
 
-            
-            await db.execute("UPDATE users SET failed_login_attempts = 0, last_login = ? WHERE discord_id = ?", (datetime.now(), discord_id))
-            await db.commit()
-
-            
-            await db.execute("INSERT INTO login_history (discord_id, username, action) VALUES (?, ?, 'login')", (discord_id, username))
-            await db.commit()
-
-        
         self.sessions[discord_id] = {
             'username': username,
             'role': role,
@@ -222,72 +139,74 @@ class UserManager:
         Login user and create session (legacy method for backwards compatibility)
         Returns: (success: bool, message: str)
         """
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            cursor = await db.execute("""
-                SELECT username, password_hash, role, failed_login_attempts, locked_until
-                FROM users WHERE discord_id = ?
-            """, (discord_id,))
-            user_data = await cursor.fetchone()
+        return await self.login_user_with_username(discord_id, None, password, guild)
+
+    async def _authenticate(self, discord_id: int, password: str, username: str = None) -> tuple:
+        """
+        Check a login attempt (username is only compared when given), counting
+        failures and locking the account. The password is checked outside the
+        write transaction so other writers are not held up by bcrypt.
+        Returns: (error message or None, username, role)
+        """
+        async with self.password_lock(discord_id):
+            async with self.db.read() as db:
+                
+                cursor = await db.execute("""
+                    SELECT username, password_hash, role, failed_login_attempts, locked_until
+                    FROM users WHERE discord_id = ?
+                """, (discord_id,))
+                user_data = await cursor.fetchone()
 
             if not user_data:
-                return False, "No account found. Use 'register' to create one."
+                return "No account found. Use 'register' to create one.", None, None
+
+            db_username, password_hash, role, failed_attempts, locked_until = user_data
 
-            username, password_hash, role, failed_attempts, locked_until = user_data
+            
+            if username is not None and db_username != username:
+                return f"Incorrect username. Your account is registered as '{db_username}'", None, None
 
             
+            lock_expired = False
             if locked_until:
                 lock_time = datetime.fromisoformat(locked_until)
                 if datetime.now() < lock_time:
                     remaining = (lock_time - datetime.now()).seconds // 60
-                    return False, f"Account locked. Try again in {remaining} minutes."
-                else:
-                    
-                    await db.execute("UPDATE users SET locked_until = NULL, failed_login_attempts = 0 WHERE discord_id = ?", (discord_id,))
-                    await db.commit()
+                    return f"Account locked. Try again in {remaining} minutes.", None, None
+                lock_expired = True
 
-            
-            if not self.verify_password(password, password_hash):
-                failed_attempts += 1
-                await db.execute("UPDATE users SET failed_login_attempts = ? WHERE discord_id = ?", (failed_attempts, discord_id))
+            try:
+                valid = await self.verify_password(password, password_hash)
+            except HasherBusy as e:
+                return str(e), None, None
 
-                max_attempts = self.config['settings']['max_failed_login_attempts']
-                if failed_attempts >= max_attempts:
+            async with self.db.write() as db:
+                if lock_expired:
                     
-                    lock_until = datetime.now() + timedelta(minutes=15)
-                    await db.execute("UPDATE users SET locked_until = ? WHERE discord_id = ?", (lock_until, discord_id))
-                    await db.commit()
-                    return False, f"Account locked due to {max_attempts} failed login attempts. Try again in 15 minutes."
+                    await db.execute("UPDATE users SET locked_until = NULL, failed_login_attempts = 0 WHERE discord_id = ?", (discord_id,))
 
-                await db.commit()
-                await db.execute("INSERT INTO login_history (discord_id, username, action, success) VALUES (?, ?, 'login', 0)", (discord_id, username))
-                await db.commit()
+                if not valid:
+                    failed_attempts += 1
+                    await db.execute("UPDATE users SET failed_login_attempts = ? WHERE discord_id = ?", (failed_attempts, discord_id))
 
-                remaining = max_attempts - failed_attempts
-                return False, f"Incorrect password. {remaining} attempts remaining."
+                    max_attempts = self.config['settings']['max_failed_login_attempts']
+                    if failed_attempts >= max_attempts:
+                        
+                        lock_until = datetime.now() + timedelta(minutes=15)
+                        await db.execute("UPDATE users SET locked_until = ? WHERE discord_id = ?", (lock_until, discord_id))
+                        return f"Account locked due to {max_attempts} failed login attempts. Try again in 15 minutes.", None, None
 
-            
-            await db.execute("UPDATE users SET failed_login_attempts = 0, last_login = ? WHERE discord_id = ?", (datetime.now(), discord_id))
-            await db.commit()
+                    await db.execute("INSERT INTO login_history (discord_id, username, action, success) VALUES (?, ?, 'login', 0)", (discord_id, db_username))
 
-            
-            await db.execute("INSERT INTO login_history (discord_id, username, action) VALUES (?, ?, 'login')", (discord_id, username))
-            await db.commit()
+                    remaining = max_attempts - failed_attempts
+                    return f"Incorrect password. {remaining} attempts remaining.", None, None
 
-        
-        self.sessions[discord_id] = {
-            'username': username,
-            'role': role,
-            'login_time': datetime.now(),
-            'current_dir': f'/home/{username}'
-        }
+                
+                await db.execute("UPDATE users SET failed_login_attempts = 0, last_login = ? WHERE discord_id = ?", (datetime.now(), discord_id))
 
-        
-        member = guild.get_member(discord_id)
-        if member:
-            await self.assign_discord_role(member, role)
+                await db.execute("INSERT INTO login_history (discord_id, username, action) VALUES (?, ?, 'login')", (discord_id, db_username))
 
-        return True, f"Welcome back, {username}! You are now logged in.\nCurrent directory: /home/{username}"
+        return None, db_username, role
 
     async def logout_user(self, discord_id: int, guild: discord.Guild) -> tuple[bool, str]:
         """
@@ -309,9 +228,8 @@ class UserManager:
             await self.remove_discord_role(member, role)
 
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             await db.execute("INSERT INTO login_history (discord_id, username, action) VALUES (?, ?, 'logout')", (discord_id, username))
-            await db.commit()
 
         return True, f"Goodbye, {username}! You have been logged out."
 
@@ -346,9 +264,39 @@ class UserManager:
         """Get user session data"""
         return self.sessions.get(discord_id)
 
+    def grant_sudo(self, discord_id: int, channel_id: int):
+        """
+        Open the sudo/root grace window (sudo_grace_minutes, 0 disables) of a
+        user in a channel after a successful password check. Grants live in
+        the session, so logout and session expiry drop them.
+        """
+        session = self.sessions.get(discord_id)
+        minutes = self.config['settings'].get('sudo_grace_minutes', 5)
+        if session is not None and minutes > 0:
+            session.setdefault('sudo_until', {})[channel_id] = time.monotonic() + minutes * 60
+
+    def has_sudo_grace(self, discord_id: int, channel_id: int) -> bool:
+        """Whether sudo/root may skip the password check for a user in a channel"""
+        session = self.sessions.get(discord_id)
+        if session is None or channel_id not in session.get('sudo_until', {}):
+            return False
+
+        timeout = timedelta(minutes=self.config['settings']['session_timeout_minutes'])
+        if (session['sudo_until'][channel_id] <= time.monotonic()
+                or datetime.now() - session['login_time'] > timeout):
+            del session['sudo_until'][channel_id]
+            return False
+        return True
+
+    def revoke_sudo(self, discord_id: int):
+        """Close every sudo/root grace window of a user (password or role changed)"""
+        session = self.sessions.get(discord_id)
+        if session is not None:
+            session.pop('sudo_until', None)
+
     async def get_user_role(self, discord_id: int) -> str:
         """Get user role from database"""
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.read() as db:
             cursor = await db.execute("SELECT role FROM users WHERE discord_id = ?", (discord_id,))
             result = await cursor.fetchone()
             return result[0] if result else None
@@ -359,24 +307,30 @@ class UserManager:
         if len(new_password) < min_length:
             return False, f"New password must be at least {min_length} characters long"
 
-        async with aiosqlite.connect(self.db_path) as db:
-            cursor = await db.execute("SELECT password_hash FROM users WHERE discord_id = ?", (discord_id,))
-            result = await cursor.fetchone()
+        async with self.password_lock(discord_id):
+            async with self.db.read() as db:
+                cursor = await db.execute("SELECT password_hash FROM users WHERE discord_id = ?", (discord_id,))
+                result = await cursor.fetchone()
 
             if not result:
                 return False, "User not found"
 
             password_hash = result[0]
 
-            
-            if not self.verify_password(old_password, password_hash):
-                return False, "Incorrect current password"
+            try:
+                
+                if not await self.verify_password(old_password, password_hash):
+                    return False, "Incorrect current password"
 
-            
-            new_hash = self.hash_password(new_password)
-            await db.execute("UPDATE users SET password_hash = ? WHERE discord_id = ?", (new_hash, discord_id))
-            await db.commit()
+                
+                new_hash = await self.hash_password(new_password)
+            except HasherBusy as e:
+                return False, str(e)
 
+            async with self.db.write() as db:
+                await db.execute("UPDATE users SET password_hash = ? WHERE discord_id = ?", (new_hash, discord_id))
+
+            self.revoke_sudo(discord_id)
             return True, "Password changed successfully"
 
     async def check_session_timeout(self):
@@ -412,7 +366,7 @@ class UserManager:
         import string
 
         
-        async with aiosqlite.connect(self.db_path) as db:
+        async with self.db.write() as db:
             cursor = await db.execute("SELECT username FROM users WHERE discord_id = ?", (discord_id,))
             user = await cursor.fetchone()
 
@@ -428,7 +382,6 @@ class UserManager:
                 INSERT OR REPLACE INTO password_reset_tokens (discord_id, reset_code, expires_at, attempts)
                 VALUES (?, ?, ?, 0)
             """, (discord_id, reset_code, expires_at))
-            await db.commit()
 
             return True, reset_code
 
@@ -442,59 +395,63 @@ class UserManager:
         if len(new_password) < min_length:
             return False, f"New password must be at least {min_length} characters long"
 
-        async with aiosqlite.connect(self.db_path) as db:
-            
-            cursor = await db.execute("""
-                SELECT reset_code, expires_at, attempts FROM password_reset_tokens
-                WHERE discord_id = ?
-            """, (discord_id,))
-            token_data = await cursor.fetchone()
+        async with self.password_lock(discord_id):
+            async with self.db.write() as db:
+                
+                cursor = await db.execute("""
+                    SELECT reset_code, expires_at, attempts FROM password_reset_tokens
+                    WHERE discord_id = ?
+                """, (discord_id,))
+                token_data = await cursor.fetchone()
 
-            if not token_data:
-                return False, "No reset request found. Use 'resetpw' to request a reset."
+                if not token_data:
+                    return False, "No reset request found. Use 'resetpw' to request a reset."
 
-            stored_code, expires_at, attempts = token_data
+                stored_code, expires_at, attempts = token_data
 
-            
-            expiry_time = datetime.fromisoformat(expires_at)
-            if datetime.now() > expiry_time:
-                await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ?", (discord_id,))
-                await db.commit()
-                return False, "Reset code expired. Use 'resetpw' to request a new one."
+                
+                expiry_time = datetime.fromisoformat(expires_at)
+                if datetime.now() > expiry_time:
+                    await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ?", (discord_id,))
+                    return False, "Reset code expired. Use 'resetpw' to request a new one."
 
-            
-            if attempts >= 3:
-                await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ?", (discord_id,))
-                await db.commit()
-                return False, "Too many failed attempts. Use 'resetpw' to request a new code."
+                
+                if attempts >= 3:
+                    await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ?", (discord_id,))
+                    return False, "Too many failed attempts. Use 'resetpw' to request a new code."
 
-            
-            if code != stored_code:
-                attempts += 1
-                await db.execute("UPDATE password_reset_tokens SET attempts = ? WHERE discord_id = ?", (attempts, discord_id))
-                await db.commit()
-                remaining = 3 - attempts
-                return False, f"Incorrect reset code. {remaining} attempts remaining."
+                
+                if code != stored_code:
+                    attempts += 1
+                    await db.execute("UPDATE password_reset_tokens SET attempts = ? WHERE discord_id = ?", (attempts, discord_id))
+                    remaining = 3 - attempts
+                    return False, f"Incorrect reset code. {remaining} attempts remaining."
 
             
-            new_hash = self.hash_password(new_password)
-            await db.execute("""
-                UPDATE users
-                SET password_hash = ?, failed_login_attempts = 0, locked_until = NULL
-                WHERE discord_id = ?
-            """, (new_hash, discord_id))
+            try:
+                new_hash = await self.hash_password(new_password)
+            except HasherBusy as e:
+                return False, str(e)
 
-            
-            await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ?", (discord_id,))
-            await db.commit()
+            async with self.db.write() as db:
+                
+                cursor = await db.execute("DELETE FROM password_reset_tokens WHERE discord_id = ? AND reset_code = ?",
+                                          (discord_id, code))
+                if cursor.rowcount == 0:
+                    return False, "Reset code is no longer valid. Use 'resetpw' to request a new one."
 
-            
-            cursor = await db.execute("SELECT username FROM users WHERE discord_id = ?", (discord_id,))
-            username = (await cursor.fetchone())[0]
-            await db.execute("""
-                INSERT INTO login_history (discord_id, username, action)
-                VALUES (?, ?, 'password_reset')
-            """, (discord_id, username))
-            await db.commit()
+                await db.execute("""
+                    UPDATE users
+                    SET password_hash = ?, failed_login_attempts = 0, locked_until = NULL
+                    WHERE discord_id = ?
+                """, (new_hash, discord_id))
+
+                cursor = await db.execute("SELECT username FROM users WHERE discord_id = ?", (discord_id,))
+                username = (await cursor.fetchone())[0]
+                await db.execute("""
+                    INSERT INTO login_history (discord_id, username, action)
+                    VALUES (?, ?, 'password_reset')
+                """, (discord_id, username))
 
-            return True, "Password reset successfully! You can now login with your new password."
+        self.revoke_sudo(discord_id)
+        return True, "Password reset successfully! You can now login with your new password."
@@ -1,5 +1,5 @@
 import discord
-from discord.ext import commands
+from discord.ext import commands, tasks
 from .terminal.user_manager import UserManager
 from .terminal.filesystem import VirtualFilesystem
 from .terminal.permissions import PermissionManager, SudoManager, format_output, format_error, format_code_block
@@ -8,6 +8,11 @@ from .terminal.admin_commands import AdminCommands
 from .terminal.channel_manager import ChannelManager
 from .terminal.modals import RegisterModal, LoginModal, SudoModal, RootModal, PasswdModal, ResetPasswordModal
 from .terminal.logger_manager import TerminalLogger
+from .terminal.shell import Shell, leading_word
+from .terminal.aliases import AliasTrie
+from .terminal.scripts import ScriptRunner
+from .terminal.config import CONFIG
+from .terminal.commands import REGISTRY, Dispatcher, command, PUBLIC, SHELL, SUDO, ROOT
 import asyncio
 
 class TerminalCore(commands.Cog):
@@ -18,24 +23,22 @@ class TerminalCore(commands.Cog):
 
         
         self.user_manager = UserManager(bot)
-        self.filesystem = VirtualFilesystem(bot)
+        self.filesystem = VirtualFilesystem(bot, self.user_manager)
         self.permission_manager = PermissionManager(self.user_manager)
         self.sudo_manager = SudoManager(self.user_manager)
         self.channel_manager = ChannelManager()
 
         
-        self.basic_commands = BasicCommands(self.filesystem, self.user_manager)
-        self.admin_commands = AdminCommands(self.user_manager, self.filesystem, self.permission_manager, bot)
-
-        
-        self.valid_commands = {
-            'register', 'login', 'logout', 'passwd', 'resetpw', 'help',
-            'ls', 'cd', 'pwd', 'mkdir', 'touch', 'cat', 'rm', 'echo', 'clear', 'cls', 'whoami', 'tree',
-            'mv', 'cp', 'chmod', 'find', 'grep', 'du',
-            'sudo', 'root', 'useradd', 'userdel', 'usermod', 'users', 'logs', 'channel',
-            'warn', 'kick', 'ban', 'unban', 'timeout', 'untimeout', 'delwarn', 'modlog',
-            'role', 'apt'
-        }
+        self.shell = Shell(self)
+        self.registry = REGISTRY
+        self.dispatcher = Dispatcher(self.user_manager, bot)
+        self.dispatcher.bind('TerminalCore', lambda: self)
+        self.dispatcher.bind('Shell', lambda: self.shell)
+        self.dispatcher.bind('BasicCommands', lambda: BasicCommands(self.filesystem, self.user_manager))
+        self.dispatcher.bind('AdminCommands', lambda: AdminCommands(self.user_manager, self.filesystem,
+                                                                    self.permission_manager, bot))
+        self.dispatcher.bind('ScriptRunner', lambda: ScriptRunner(self))
+        self.aliases = AliasTrie(self.user_manager.config.get('command_aliases'))
 
         print("🖥️  Terminal Core initialized")
 
@@ -45,8 +48,67 @@ class TerminalCore(commands.Cog):
         await self.user_manager.setup_database()
         await self.filesystem.setup_database()
         await self.channel_manager.setup_database()
+
+        
+        if not self.blob_gc.is_running():
+            interval = self.filesystem.config['settings'].get('blob_gc_interval_minutes', 10)
+            self.blob_gc.change_interval(minutes=interval)
+            self.blob_gc.start()
+        if not self.blob_compression.is_running():
+            interval = self.filesystem.compression.get('backfill_interval_minutes', 15)
+            self.blob_compression.change_interval(minutes=interval)
+            self.blob_compression.start()
+        if not self.config_watch.is_running():
+            interval = self.user_manager.config['settings'].get('config_watch_seconds', 5)
+            self.config_watch.change_interval(seconds=interval)
+            self.config_watch.start()
+
         print("✅ Terminal System ready!")
 
+    def cog_unload(self):
+        """Stop background tasks when the cog is unloaded"""
+        self.blob_gc.cancel()
+        self.blob_compression.cancel()
+        self.config_watch.cancel()
+        self.user_manager.hasher.close()
+
+    @tasks.loop(minutes=10)
+    async def blob_gc(self):
+        """Garbage-collect file content blobs that are no longer referenced"""
+        try:
+            removed = await self.filesystem.collect_garbage()
+            if removed:
+                print(f"🧹 Removed {removed} orphaned file blobs")
+        except Exception as e:
+            print(f"⚠️ Blob garbage collection failed: {e}")
+
+    @tasks.loop(minutes=15)
+    async def blob_compression(self):
+        """Compress file content blobs stored before compression was enabled"""
+        try:
+            compressed, saved = await self.filesystem.compress_blobs()
+            if compressed:
+                print(f"🗜️ Compressed {compressed} file blobs ({saved:,} bytes saved)")
+        except Exception as e:
+            print(f"⚠️ Blob compression failed: {e}")
+
+    @tasks.loop(seconds=5)
+    async def config_watch(self):
+        """Reload config files that changed on disk"""
+        try:
+            reloaded = await CONFIG.refresh()
+            if reloaded:
+                print(f"🔄 Reloaded {', '.join(reloaded)}")
+        except Exception as e:
+            print(f"⚠️ Config reload failed: {e}")
+
+    def _alias_trie(self) -> AliasTrie:
+        """Compiled command aliases, recompiled when the config was reloaded with another alias table"""
+        aliases = self.user_manager.config.get('command_aliases')
+        if self.aliases.source is not aliases:
+            self.aliases = AliasTrie(aliases)
+        return self.aliases
+
     @commands.Cog.listener()
     async def on_message(self, message: discord.Message):
         """Handle terminal commands"""
@@ -63,26 +125,23 @@ class TerminalCore(commands.Cog):
             return
 
         
-        content = message.content.strip()
-        if not content:
+        content = message.content
+        word, end = leading_word(content)
+        if not word:
             return
 
         
-        config = self.user_manager.config
-        for alias, actual_command in config.get('command_aliases', {}).items():
-            if content.startswith(alias):
-                content = content.replace(alias, actual_command, 1)
+        aliases = self._alias_trie()
+        if aliases.starts_alias(word):
+            content = aliases.expand(content, word, end)
+            word, end = leading_word(content)
 
-        parts = content.split()
-        command = parts[0].lower()
-        args = parts[1:] if len(parts) > 1 else []
+        command = word.lower()
 
         
-        if command not in self.valid_commands:
+        if command not in self.registry and not command.startswith('./'):
             return
-
-        
-        server, channel_name, user, guild_id, channel_id, user_id = TerminalLogger.get_context_info(message)
+        content = content.strip()
 
         
         content_preview = content.lower()
@@ -91,21 +150,28 @@ class TerminalCore(commands.Cog):
         if not is_channel_command:
             if not await self.channel_manager.is_trusted_channel(message.channel.id):
                 
+                cooldown = self.user_manager.config['settings'].get('untrusted_notice_cooldown_seconds', 60)
+                if not self.channel_manager.should_notify_untrusted(message.channel.id, cooldown):
+                    return
+
                 error_msg = format_error(f"This channel is not trusted for terminal commands.\n"
                                 f"Ask an admin to run: `root channel trust` in this channel first.")
                 await message.channel.send(error_msg)
 
                 
+                server, channel_name, user, guild_id, channel_id, user_id = TerminalLogger.get_context_info(message)
                 TerminalLogger.log_input(server, channel_name, user, content, guild_id, channel_id, user_id)
                 TerminalLogger.log_output(server, channel_name, user, "Channel not trusted - command rejected", success=False)
                 return
 
         
+        server, channel_name, user, guild_id, channel_id, user_id = TerminalLogger.get_context_info(message)
+        
         TerminalLogger.log_input(server, channel_name, user, content, guild_id, channel_id, user_id)
 
         
         try:
-            response = await self.route_command(message, command, args)
+            response = await self.shell.execute(message, content)
             if response:
                 
                 TerminalLogger.log_output(server, channel_name, user, response, success=True)
@@ -127,113 +193,20 @@ class TerminalCore(commands.Cog):
             print(f"Error executing command '{command}': {e}")
 
     async def route_command(self, message: discord.Message, command: str, args: list) -> str:
-        """Route command to appropriate handler"""
-        discord_id = message.author.id
-
-        
-        if command == 'register':
-            return await self.cmd_register(message, args)
-
-        elif command == 'login':
-            return await self.cmd_login(message, args)
-
-        elif command == 'help':
-            return await self.basic_commands.cmd_help(discord_id, args)
-
-        
-        if not self.user_manager.is_logged_in(discord_id):
-            return format_error("You must be logged in. Use 'register' or 'login'")
-
-        
-        if command == 'logout':
-            return await self.cmd_logout(message, args)
-
-        elif command == 'passwd':
-            return await self.cmd_passwd(message, args)
-
-        elif command == 'resetpw':
-            return await self.cmd_resetpw(message, args)
-
-        
-        elif command == 'ls':
-            return await self.basic_commands.cmd_ls(discord_id, args)
-
-        elif command == 'cd':
-            return await self.basic_commands.cmd_cd(discord_id, args)
-
-        elif command == 'pwd':
-            return await self.basic_commands.cmd_pwd(discord_id, args)
-
-        elif command == 'mkdir':
-            return await self.basic_commands.cmd_mkdir(discord_id, args)
-
-        elif command == 'touch':
-            return await self.basic_commands.cmd_touch(discord_id, args)
-
-        elif command == 'cat':
-            return await self.basic_commands.cmd_cat(discord_id, args)
-
-        elif command == 'rm':
-            return await self.basic_commands.cmd_rm(discord_id, args)
-
-        elif command == 'echo':
-            return await self.basic_commands.cmd_echo(discord_id, args)
-
-        elif command == 'clear' or command == 'cls':
-            return format_error(f"Permission denied. Use 'sudo {command}' to execute this command.")
-
-        elif command == 'whoami':
-            return await self.basic_commands.cmd_whoami(discord_id, args)
-
-        elif command == 'tree':
-            return await self.basic_commands.cmd_tree(discord_id, args)
-
-        elif command == 'mv':
-            return await self.basic_commands.cmd_mv(discord_id, args)
-
-        elif command == 'cp':
-            return await self.basic_commands.cmd_cp(discord_id, args)
-
-        elif command == 'chmod':
-            return await self.basic_commands.cmd_chmod(discord_id, args)
-
-        elif command == 'find':
-            return await self.basic_commands.cmd_find(discord_id, args)
-
-        elif command == 'grep':
-            return await self.basic_commands.cmd_grep(discord_id, args)
-
-        elif command == 'du':
-            return await self.basic_commands.cmd_du(discord_id, args)
-
-        
-        elif command == 'apt':
-            return format_error("Permission denied. Use 'sudo apt' to execute APT commands.")
-
-        
-        elif command == 'sudo':
-            return await self.cmd_sudo(message, args)
-
-        
-        elif command == 'root':
-            return await self.cmd_root(message, args)
-
-        
-        elif command in ['useradd', 'userdel', 'usermod', 'users', 'logs']:
-            return format_error(f"Permission denied. Use 'root {command}' if you have terminal admin rights.")
-
-        
-        elif command in ['warn', 'kick', 'ban', 'unban', 'timeout', 'untimeout', 'delwarn', 'modlog']:
-            return format_error(f"Permission denied. Use 'root {command}' if you have terminal admin rights.")
-
-        
-        elif command == 'role':
-            return format_error("Permission denied. Use 'root role' if you have terminal admin rights.")
-
-        else:
-            return format_error(f"Unknown command: {command}\nType 'help' for available commands")
-
-    async def cmd_register(self, message: discord.Message, args: list) -> str:
+        """Dispatch a command typed directly (sudo and root commands only get a hint)"""
+        if self.registry.get(SHELL, command) is None:
+            if self.registry.get(SUDO, command) is not None:
+                return format_error(f"Permission denied. Use 'sudo {command}' to execute this command.")
+            if self.registry.get(ROOT, command) is not None:
+                return format_error(f"Permission denied. Use 'root {command}' if you have terminal admin rights.")
+
+        return await self.dispatcher.dispatch(SHELL, command, message.author.id, args, message=message,
+                                              channel=message.channel, channel_id=message.channel.id,
+                                              guild=message.guild, attachments=message.attachments)
+
+    @command('register', auth=PUBLIC, category='user', description='Register a new account (opens modal)',
+             context=('message',))
+    async def cmd_register(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Register new user"""
         
         class RegisterButton(discord.ui.View):
@@ -254,9 +227,9 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def cmd_login(self, message: discord.Message, args: list) -> str:
+    @command('login', auth=PUBLIC, category='user', description='Login to terminal (opens modal)', context=('message',))
+    async def cmd_login(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Login user"""
-        discord_id = message.author.id
 
         
         if self.user_manager.is_logged_in(discord_id):
@@ -281,13 +254,15 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def cmd_logout(self, message: discord.Message, args: list) -> str:
+    @command('logout', category='user', description='Logout from terminal', context=('message',))
+    async def cmd_logout(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Logout user"""
-        discord_id = message.author.id
         success, msg = await self.user_manager.logout_user(discord_id, message.guild)
         return format_output(msg) if success else format_error(msg)
 
-    async def cmd_passwd(self, message: discord.Message, args: list) -> str:
+    @command('passwd', category='user', usage='passwd <new_password>', description='Change your password',
+             context=('message',))
+    async def cmd_passwd(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Change password"""
         if not args:
             return format_error("Usage: passwd <new_password>")
@@ -319,9 +294,10 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def cmd_resetpw(self, message: discord.Message, args: list) -> str:
+    @command('resetpw', category='user', description='Reset forgotten password (sends code to DM)',
+             context=('message',))
+    async def cmd_resetpw(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Reset password (for forgotten passwords)"""
-        discord_id = message.author.id
 
         
         success, code = await self.user_manager.generate_reset_code(discord_id)
@@ -359,12 +335,14 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def cmd_sudo(self, message: discord.Message, args: list) -> str:
+    @command('sudo', category='sudo', usage='sudo <command> [args]', description='Execute privileged commands (clear, apt)',
+             context=('message',))
+    async def cmd_sudo(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Execute command with sudo (available to all users)"""
+        available = ', '.join(self.registry.names(SUDO))
         if not args:
-            return format_error("Usage: sudo <command> [args...]\nAvailable: clear, apt")
+            return format_error(f"Usage: sudo <command> [args...]\nAvailable: {available}")
 
-        discord_id = message.author.id
         command = args[0]
         cmd_args = args[1:] if len(args) > 1 else []
 
@@ -374,9 +352,13 @@ class TerminalCore(commands.Cog):
             return format_error("You must be logged in to use sudo")
 
         
-        valid_sudo_commands = ['clear', 'cls', 'apt']
-        if command not in valid_sudo_commands:
-            return format_error(f"'{command}' is not a sudo command.\nAvailable sudo commands: clear, apt\nFor admin commands, use 'root' instead.")
+        if self.registry.get(SUDO, command) is None:
+            return format_error(f"'{command}' is not a sudo command.\nAvailable sudo commands: {available}\nFor admin commands, use 'root' instead.")
+
+        
+        if self.user_manager.has_sudo_grace(discord_id, message.channel.id):
+            self._log_cached_sudo(message, f"{command} {' '.join(cmd_args)}".strip())
+            return await self.execute_sudo_command(discord_id, command, cmd_args, message.channel.id, message.guild)
 
         
         class SudoButton(discord.ui.View):
@@ -420,12 +402,13 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def cmd_root(self, message: discord.Message, args: list) -> str:
+    @command('root', category='admin', usage='root <command>', description='Execute admin-only commands with root privileges',
+             context=('message',))
+    async def cmd_root(self, discord_id: int, args: list, message: discord.Message = None) -> str:
         """Execute command with root (only for terminal admins)"""
         if not args:
             return format_error("Usage: root <command> [args...]\nAvailable: warn, kick, ban, role, useradd, etc.")
 
-        discord_id = message.author.id
         command = args[0]
         cmd_args = args[1:] if len(args) > 1 else []
 
@@ -434,9 +417,18 @@ class TerminalCore(commands.Cog):
         if role != 'admin':
             return format_error("You do not have root privileges (terminal admin required)")
 
+        if self.registry.get(ROOT, command) is None:
+            return format_error(f"'{command}' is not a root command.\nAvailable root commands: {', '.join(self.registry.names(ROOT))}")
+
+        
+        if self.user_manager.has_sudo_grace(discord_id, message.channel.id):
+            self._log_cached_sudo(message, f"ROOT: {command} {' '.join(cmd_args)}".strip())
+            return await self.execute_admin_command(discord_id, command, cmd_args, message.channel.id,
+                                                    message.guild, message.attachments)
+
         
         class RootButton(discord.ui.View):
-            def __init__(self, user_manager, sudo_manager, execute_callback, command, cmd_args, channel_id, guild):
+            def __init__(self, user_manager, sudo_manager, execute_callback, command, cmd_args, channel_id, guild, attachments):
                 super().__init__(timeout=120)
                 self.user_manager = user_manager
                 self.sudo_manager = sudo_manager
@@ -445,6 +437,7 @@ class TerminalCore(commands.Cog):
                 self.cmd_args = cmd_args
                 self.channel_id = channel_id
                 self.guild = guild
+                self.attachments = attachments
 
             @discord.ui.button(label="Confirm with Admin Password", style=discord.ButtonStyle.danger, emoji="⚠️")
             async def confirm_root(self, button: discord.ui.Button, interaction: discord.Interaction):
@@ -455,7 +448,8 @@ class TerminalCore(commands.Cog):
                     self.command,
                     self.cmd_args,
                     self.channel_id,
-                    self.guild
+                    self.guild,
+                    self.attachments
                 )
                 await interaction.response.send_modal(modal)
 
@@ -466,7 +460,8 @@ class TerminalCore(commands.Cog):
             command,
             cmd_args,
             message.channel.id,
-            message.guild
+            message.guild,
+            message.attachments
         )
 
         cmd_display = f"{command} {' '.join(cmd_args)}" if cmd_args else command
@@ -476,106 +471,29 @@ class TerminalCore(commands.Cog):
         )
         return None  
 
-    async def execute_admin_command(self, discord_id: int, command: str, args: list, channel_id: int = None, guild: discord.Guild = None) -> str:
-        """Execute admin command"""
-        if command == 'useradd':
-            return await self.admin_commands.cmd_useradd(discord_id, args)
-        elif command == 'userdel':
-            return await self.admin_commands.cmd_userdel(discord_id, args)
-        elif command == 'usermod':
-            return await self.admin_commands.cmd_usermod(discord_id, args)
-        elif command == 'users':
-            return await self.admin_commands.cmd_users(discord_id, args)
-        elif command == 'logs':
-            return await self.admin_commands.cmd_logs(discord_id, args)
-        elif command == 'passwd' and args:  
-            return await self.admin_commands.cmd_passwd_admin(discord_id, args)
-        elif command == 'channel':
-            return await self.cmd_channel(discord_id, args, channel_id)
-        
-        elif command in ['warn', 'kick', 'ban', 'unban', 'timeout', 'untimeout', 'delwarn', 'modlog']:
-            return await self.execute_mod_command(discord_id, command, args, guild)
-        
-        elif command == 'role':
-            return await self.execute_role_command(discord_id, command, args, guild, channel_id)
-        else:
-            return format_error(f"Unknown admin command: {command}")
-
-    async def execute_mod_command(self, discord_id: int, command: str, args: list, guild: discord.Guild) -> str:
-        """Execute moderation command"""
-        if not guild:
-            return format_error("Moderation commands can only be used in a server")
-
-        
-        mod_cog = self.bot.get_cog("Moderation")
-        if not mod_cog:
-            return format_error("Moderation system not loaded")
-
-        
-        if command == 'warn':
-            return await mod_cog.cmd_warn(discord_id, args, guild)
-        elif command == 'kick':
-            return await mod_cog.cmd_kick(discord_id, args, guild)
-        elif command == 'ban':
-            return await mod_cog.cmd_ban(discord_id, args, guild)
-        elif command == 'unban':
-            return await mod_cog.cmd_unban(discord_id, args, guild)
-        elif command == 'timeout':
-            return await mod_cog.cmd_timeout(discord_id, args, guild)
-        elif command == 'untimeout':
-            return await mod_cog.cmd_untimeout(discord_id, args, guild)
-        elif command == 'delwarn':
-            return await mod_cog.cmd_delwarn(discord_id, args, guild)
-        elif command == 'modlog':
-            return await mod_cog.cmd_modlog(discord_id, args, guild)
-        else:
-            return format_error(f"Unknown moderation command: {command}")
-
-    async def execute_role_command(self, discord_id: int, command: str, args: list, guild: discord.Guild, channel_id: int = None) -> str:
-        """Execute role management command"""
-        if not guild:
-            return format_error("Role commands can only be used in a server")
-
-        
-        role_cog = self.bot.get_cog("Roles")
-        if not role_cog:
-            return format_error("Role management system not loaded")
+    def _log_cached_sudo(self, message: discord.Message, cmd_string: str):
+        """Log a sudo/root command run without the password modal (confirmed recently in this channel)"""
+        server, channel_name, user, *_ = TerminalLogger.get_context_info(message)
+        TerminalLogger.log_sudo(server, channel_name, user, f"{cmd_string} (cached credentials)", True)
 
-        
-        channel = None
-        if channel_id:
-            channel = self.bot.get_channel(channel_id)
-
-        return await role_cog.cmd_role(discord_id, args, guild, channel)
+    async def execute_admin_command(self, discord_id: int, command: str, args: list, channel_id: int = None,
+                                    guild: discord.Guild = None, attachments: list = None) -> str:
+        """Execute admin command"""
+        return await self._dispatch_elevated(ROOT, discord_id, command, args, channel_id, guild, attachments)
 
     async def execute_sudo_command(self, discord_id: int, command: str, args: list, channel_id: int = None, guild: discord.Guild = None) -> str:
         """Execute sudo command (available to all users)"""
-        
-        if command == 'clear' or command == 'cls':
-            channel = self.bot.get_channel(channel_id) if channel_id else None
-            if not channel:
-                return format_error("Channel not found")
-            return await self.basic_commands.cmd_clear(discord_id, args, channel)
-
-        
-        elif command == 'apt':
-            return await self.execute_apt_command(discord_id, args, guild)
+        return await self._dispatch_elevated(SUDO, discord_id, command, args, channel_id, guild)
 
-        else:
-            return format_error(f"Unknown sudo command: {command}")
-
-    async def execute_apt_command(self, discord_id: int, args: list, guild: discord.Guild) -> str:
-        """Execute APT package manager command"""
-        if not guild:
-            return format_error("APT commands can only be used in a server")
-
-        
-        apt_cog = self.bot.get_cog("APT")
-        if not apt_cog:
-            return format_error("APT system not loaded")
-
-        return await apt_cog.cmd_apt(discord_id, args, guild)
+    async def _dispatch_elevated(self, scope: str, discord_id: int, command: str, args: list, channel_id: int = None,
+                                 guild: discord.Guild = None, attachments: list = None) -> str:
+        """Run a sudo/root command once its password was confirmed (the context comes from the modal)"""
+        channel = self.bot.get_channel(channel_id) if channel_id else None
+        return await self.dispatcher.dispatch(scope, command, discord_id, args, channel=channel, channel_id=channel_id,
+                                              guild=guild, attachments=attachments or [])
 
+    @command('channel', scope=ROOT, category='admin', usage='root channel <trust|untrust|list>',
+             description='Manage trusted channels', context=('channel_id',))
     async def cmd_channel(self, discord_id: int, args: list, channel_id: int = None) -> str:
         """Channel management commands (admin only)"""
 
@@ -630,6 +548,15 @@ class TerminalCore(commands.Cog):
         else:
             return format_error(f"Unknown channel action: {action}\nAvailable: trust, untrust, list")
 
+    @command('reload', scope=ROOT, category='admin', usage='root reload',
+             description='Reload configuration files from disk')
+    async def cmd_reload(self, discord_id: int, args: list) -> str:
+        """Re-read every loaded config file now"""
+        reloaded = await CONFIG.refresh(force=True)
+        if not reloaded:
+            return format_error("No config file could be reloaded")
+        return format_output(f"Reloaded {len(reloaded)} config files:\n" + '\n'.join(reloaded))
+
 
 def setup(bot):
     bot.add_cog(TerminalCore(bot))
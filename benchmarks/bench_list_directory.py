@@ -0,0 +1,101 @@
+"""
+Benchmark: VirtualFilesystem.list_directory on large user trees.
+
+Builds a throwaway database with FILES_PER_USER files per user, then times
+`ls` on the root, a large directory and a small directory using the indexed
+parent_path lookup, next to the old `path LIKE` subtree scan for comparison.
+
+Run from the repository root:
+    python benchmarks/bench_list_directory.py [files_per_user]
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from System.terminal import migrations
+from System.terminal.database import get_database, close_databases
+from System.terminal.filesystem import VirtualFilesystem
+
+USERS = 2
+FILES_PER_USER = 100_000
+FILES_PER_DIR = 1_000
+ROUNDS = 20
+
+
+async def populate(fs: VirtualFilesystem, owner_id: int, files: int):
+    """Bulk-insert /home/u<owner>/dNNN/fNNNN.txt plus a small /etc"""
+    home = f"/home/u{owner_id}"
+    rows = [(owner_id, '/', None, '/', 'directory'),
+            (owner_id, '/home', '/', 'home', 'directory'),
+            (owner_id, home, '/home', f"u{owner_id}", 'directory'),
+            (owner_id, '/etc', '/', 'etc', 'directory'),
+            (owner_id, '/etc/hostname', '/etc', 'hostname', 'file')]
+
+    for d in range(files // FILES_PER_DIR):
+        directory = f"{home}/d{d:03d}"
+        rows.append((owner_id, directory, home, f"d{d:03d}", 'directory'))
+        for f in range(FILES_PER_DIR):
+            rows.append((owner_id, f"{directory}/f{f:04d}.txt", directory, f"f{f:04d}.txt", 'file'))
+
+    async with fs.db.write() as db:
+        await db.executemany("""
+            INSERT INTO filesystem (owner_id, path, parent_path, name, type)
+            VALUES (?, ?, ?, ?, ?)
+        """, rows)
+
+
+async def legacy_list(fs: VirtualFilesystem, owner_id: int, path: str) -> list:
+    """The pre-parent_path query: LIKE over the whole subtree"""
+    pattern = '/%' if path == '/' else f"{path}/%"
+    async with fs.db.read() as db:
+        cursor = await db.execute("""
+            SELECT name, type, size, permissions, modified_at, executable
+            FROM filesystem
+            WHERE owner_id = ? AND path LIKE ? AND path NOT LIKE ?
+            ORDER BY type DESC, name ASC
+        """, (owner_id, pattern, pattern.replace('%', '%/%')))
+        return await cursor.fetchall()
+
+
+async def timed(label: str, func, *args):
+    """Run func ROUNDS times and print the mean wall time"""
+    await func(*args)
+    start = time.perf_counter()
+    for _ in range(ROUNDS):
+        result = await func(*args)
+    elapsed = (time.perf_counter() - start) / ROUNDS * 1000
+    entries = result[1] if isinstance(result, tuple) else result
+    print(f"  {label:<38} {elapsed:9.3f} ms  ({len(entries)} entries)")
+
+
+async def main(files_per_user: int):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "terminal_fs.db")
+        migrations.MIGRATIONS[db_path] = migrations.FILESYSTEM_MIGRATIONS
+        await migrations.migrate(db_path)
+
+        fs = VirtualFilesystem(bot=None)
+        fs.db_path = db_path
+        fs.db = get_database(db_path)
+
+        start = time.perf_counter()
+        for owner_id in range(1, USERS + 1):
+            await populate(fs, owner_id, files_per_user)
+        print(f"Populated {USERS} users x {files_per_user} files in {time.perf_counter() - start:.1f}s\n")
+
+        owner_id = 1
+        home = f"/home/u{owner_id}"
+        for path in ['/', home, f"{home}/d000", '/etc']:
+            print(f"ls {path}")
+            await timed("parent_path index", fs.list_directory, owner_id, path, True)
+            await timed("LIKE subtree scan (old)", legacy_list, fs, owner_id, path)
+
+        await close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else FILES_PER_USER))
@@ -0,0 +1,120 @@
+"""
+Benchmark: the path TerminalCore.on_message takes for ordinary chat messages.
+
+Every non-bot guild message reaches on_message, and almost none of them are
+terminal commands. This replays a synthetic chat log (1 to 60 words per
+message, none of them commands) through the real listener and through the
+old prelude, which looped over every alias with startswith/replace and split
+the whole message with a regex before checking the command set. Both are
+timed with the shipped aliases and with a large alias table. Messages like
+"later" or "clearly" also show the old prefix matching expanding aliases
+inside ordinary words.
+
+Run from the repository root:
+    python benchmarks/bench_message_reject.py [messages]
+"""
+import asyncio
+import os
+import random
+import re
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from System.terminal_core import TerminalCore
+from System.terminal.aliases import AliasTrie
+
+MESSAGES = 200_000
+ROUNDS = 3
+WORDS = ("the", "a", "lol", "ok", "so", "is", "anyone", "here", "did", "you", "see", "that", "match", "yesterday",
+         "gg", "what", "time", "server", "later", "llama", "class", "really", "nice", "thanks", "wait", "for",
+         "me", "picture", "clearly", "last", "night", "and", "then", "we", "went", "home", "sure", "lsd", "...")
+
+
+class Author:
+    bot = False
+
+
+class Channel:
+    id = 1
+
+
+class Message:
+    __slots__ = ('content', 'author', 'channel')
+
+    def __init__(self, content: str):
+        self.content = content
+        self.author = Author()
+        self.channel = Channel()
+
+
+def chat_log(count: int) -> list:
+    """Messages of 1-60 words"""
+    rng = random.Random(7)
+    return [' '.join(rng.choice(WORDS) for _ in range(rng.choice((1, 3, 8, 20, 60)))) for _ in range(count)]
+
+
+def legacy_is_command(content: str, aliases: dict, valid_commands) -> bool:
+    """The old on_message prelude, up to the command check"""
+    content = content.strip()
+    if not content:
+        return False
+
+    for alias, actual_command in aliases.items():
+        if content.startswith(alias):
+            content = content.replace(alias, actual_command, 1)
+
+    command = re.split(r"[\s;&|>]", content, maxsplit=1)[0].lower()
+    return command in valid_commands or command.startswith('./')
+
+
+async def timed(label: str, func, log: list):
+    """Replay the log ROUNDS times and print the best per-message time"""
+    best = None
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for message in log:
+            await func(message)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    per_message = best / len(log) * 1e6
+    print(f"  {label:<34} {per_message:8.3f} us/message  ({len(log) / best:,.0f} messages/s)")
+
+
+async def main(count: int):
+    core = TerminalCore(None)
+    accepted = []
+
+    async def trusted(channel_id):
+        accepted.append(channel_id)
+        return False
+
+    core.channel_manager.is_trusted_channel = trusted
+    log = [Message(text) for text in chat_log(count)]
+    names = {cmd.name for cmd in core.registry if cmd.group is None} | {'cls'}
+
+    shipped = dict(core.user_manager.config.get('command_aliases') or {})
+    large = dict(shipped)
+    large.update({f"alias{i}": f"ls -l dir{i}" for i in range(200)})
+
+    for label, aliases in (("shipped aliases", shipped), ("200 extra aliases", large)):
+        trie = AliasTrie(aliases)
+        core._alias_trie = lambda: trie
+        print(f"{count:,} chat messages, {label} ({len(aliases)})")
+
+        async def legacy(message):
+            if message.content.startswith('!') or message.content.startswith('/'):
+                return
+            legacy_is_command(message.content, aliases, names)
+
+        await timed("old prelude (startswith loop)", legacy, log)
+        await timed("on_message (trie, first word)", core.on_message, log)
+        print()
+
+    if accepted:
+        print(f"warning: {len(accepted)} chat messages were taken for commands")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else MESSAGES))
@@ -3,7 +3,6 @@ import datetime
 
 import discord
 from discord.ext import commands
-import aiosqlite
 from discord.commands import slash_command, Option
 import pyfiglet
 import re
@@ -12,11 +11,20 @@ import os
 import chat_exporter
 import io
 from Data.permissons import admin
+from System.terminal.database import get_database, close_databases, start_checkpoints
+from System.terminal.migrations import migrate_all
 from config import TOKEN
 
+
+class Bot(commands.Bot):
+    async def close(self):
+        await close_databases()
+        await super().close()
+
+
 pyfiglet.print_figlet('GSv2.0')
-bot = commands.Bot(command_prefix='!', debug_guilds=None, intents=discord.Intents.all())
-conn: aiosqlite.Connection = None
+bot = Bot(command_prefix='!', debug_guilds=None, intents=discord.Intents.all())
+tickets_db = get_database("Data/tickets.db")
 
 TICKET_CATEGORIES = {
     "allgemein": {
@@ -79,8 +87,6 @@ if __name__ == '__main__':
 
 @bot.event
 async def on_ready():
-    await setup_database()
-    print("Database connection established!")
     bot.add_view(menu())
     bot.add_view(TutorialView())
     bot.add_view(Ticketweiterleitung())
@@ -93,107 +99,11 @@ async def setup_hook():
     chat_exporter.init_exporter(bot)
 
 async def setup_database():
-    global conn
-    conn = await aiosqlite.connect("Data/tickets.db")
-
-    
-    await conn.execute(
-        """CREATE TABLE IF NOT EXISTS tickets (
-            channel_id INTEGER PRIMARY KEY,
-            user_id INTEGER NOT NULL,
-            blocked INTEGER DEFAULT 0,
-            priority INTEGER DEFAULT 0,
-            claimed_by INTEGER,
-            claimed_at TIMESTAMP
-        )""")
-    table_info = await conn.execute_fetchall("PRAGMA table_info(tickets)")
-    if not any(column[1] == "category" for column in table_info):  
-        await conn.execute("""
-            ALTER TABLE tickets 
-            ADD COLUMN category TEXT DEFAULT 'allgemein'
-        """)
-
-    
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS category_stats (
-            category TEXT PRIMARY KEY,
-            total_tickets INTEGER DEFAULT 0,
-            avg_resolution_time INTEGER DEFAULT 0,
-            last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS ticket_queue (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    
-    await conn.execute("""
-        CREATE TABLE IF NOT EXISTS pending_tickets (
-            user_id INTEGER PRIMARY KEY,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    
-    table_info = await conn.execute("PRAGMA table_info(tickets)")
-    table_info = await table_info.fetchall()
-    if not any(column[1] == "category" for column in table_info):
-        await conn.execute("""
-               ALTER TABLE tickets 
-               ADD COLUMN category TEXT DEFAULT 'allgemein'
-           """)
-
-    cursor = await conn.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name='ticket_stats'")
-    table_exists = await cursor.fetchone()
-
-    if not table_exists:
-        await conn.execute(
-            """CREATE TABLE ticket_stats (
-                team_member_id INTEGER PRIMARY KEY,
-                tickets_handled INTEGER DEFAULT 0,
-                tickets_closed INTEGER DEFAULT 0,
-                avg_response_time REAL DEFAULT 0,
-                total_response_time REAL DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )""")
-    else:
-        
-        cursor = await conn.execute("PRAGMA table_info(ticket_stats)")
-        columns = await cursor.fetchall()
-        if not any(column[1] == "total_response_time" for column in columns):
-            
-            await conn.execute(
-                "ALTER TABLE ticket_stats ADD COLUMN total_response_time REAL DEFAULT 0")
-            print("Added total_response_time column to ticket_stats table")
-
-    cursor = await conn.execute("PRAGMA table_info(ticket_stats)")
-    columns = await cursor.fetchall()
-
-    await conn.execute("""
-            CREATE TABLE IF NOT EXISTS ticket_feedback (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                ticket_id INTEGER,
-                user_id INTEGER,
-                team_member_id INTEGER,
-                rating INTEGER,
-                feedback_text TEXT,
-                created_at DATETIME
-            )
-        """)
-
-    if not any(column[1] == "avg_rating" for column in columns):
-        await conn.execute("ALTER TABLE ticket_stats ADD COLUMN avg_rating REAL DEFAULT 0")
-        await conn.execute("ALTER TABLE ticket_stats ADD COLUMN total_ratings INTEGER DEFAULT 0")
-
-    await conn.commit()
-    print("Database setup completed successfully!")
+    await migrate_all()
+    await get_database("Data/modmail.db").open()
+    await tickets_db.open()
+    start_checkpoints(bot.loop)
+    print("Database connection established!")
 
 
 
@@ -221,7 +131,7 @@ async def send_feedback_request(channel, ticket_id: str, team_member_id: int):
     await channel.send(embed=embed, view=view)
 
 async def update_team_member_stats(self, rating: int):
-    async with conn as db:
+    async with tickets_db.write() as db:
         cursor = await db.execute("""
                 SELECT avg_rating, total_ratings 
                 FROM ticket_stats 
@@ -244,63 +154,34 @@ async def update_team_member_stats(self, rating: int):
                 SET avg_rating = ?, total_ratings = ?
                 WHERE team_member_id = ?
             """, (round(new_avg, 2), new_total, self.team_member_id))
-        await db.commit()
 
 async def update_ticket_stats(team_member_id: int, action_type: str = None, response_time: float = None):
-    global conn
-
-    if conn is None:
-        print("No database connection! Attempting to reconnect...")
-        await setup_database()
+    handled = 1 if action_type == "handle" else 0
+    closed = 1 if action_type == "close" else 0
 
     try:
-        cursor = await conn.execute(
-            """SELECT tickets_handled, tickets_closed, avg_response_time, 
-                    COALESCE(total_response_time, 0) as total_response_time 
-               FROM ticket_stats WHERE team_member_id = ?""",
-            (team_member_id,))
-        stats = await cursor.fetchone()
-
-        print(f"Current stats for team member {team_member_id}: {stats}")
-
-        if stats is None:
-            print(f"Creating new stats entry for team member {team_member_id}")
-            await conn.execute(
-                """INSERT INTO ticket_stats 
+        async with tickets_db.write() as db:
+            await db.execute(
+                """INSERT OR IGNORE INTO ticket_stats 
                    (team_member_id, tickets_handled, tickets_closed, avg_response_time, total_response_time) 
                    VALUES (?, 0, 0, 0, 0)""",
                 (team_member_id,))
-            stats = (0, 0, 0, 0)
-
-        if action_type == "handle":
-            print(f"Updating handled tickets for {team_member_id}")
-            await conn.execute(
-                "UPDATE ticket_stats SET tickets_handled = tickets_handled + 1 WHERE team_member_id = ?",
-                (team_member_id,))
-        elif action_type == "close":
-            print(f"Updating closed tickets for {team_member_id}")
-            await conn.execute(
-                "UPDATE ticket_stats SET tickets_closed = tickets_closed + 1 WHERE team_member_id = ?",
-                (team_member_id,))
-
-        if response_time is not None:
-            new_total_time = stats[3] + response_time
-            new_handled = stats[0] + 1
-            new_avg = new_total_time / new_handled if new_handled > 0 else 0
 
-            print(f"Updating response time stats for {team_member_id}")
-            print(f"New average: {new_avg}, New total time: {new_total_time}")
-
-            await conn.execute(
+            cursor = await db.execute(
                 """UPDATE ticket_stats 
-                   SET avg_response_time = ?, total_response_time = ? 
-                   WHERE team_member_id = ?""",
-                (round(new_avg, 2), new_total_time, team_member_id))
-        await conn.commit()
-
-        cursor = await conn.execute("SELECT * FROM ticket_stats WHERE team_member_id = ?", (team_member_id,))
-        result = await cursor.fetchone()
-        print(f"Updated stats: {result}")
+                   SET tickets_handled = tickets_handled + :handled,
+                       tickets_closed = tickets_closed + :closed,
+                       avg_response_time = CASE WHEN :response_time IS NULL THEN avg_response_time
+                           ELSE ROUND((COALESCE(total_response_time, 0) + :response_time) / (tickets_handled + 1), 2) END,
+                       total_response_time = CASE WHEN :response_time IS NULL THEN total_response_time
+                           ELSE COALESCE(total_response_time, 0) + :response_time END
+                   WHERE team_member_id = :team_member_id
+                   RETURNING tickets_handled, tickets_closed, avg_response_time, total_response_time""",
+                {"handled": handled, "closed": closed, "response_time": response_time,
+                 "team_member_id": team_member_id})
+            result = await cursor.fetchone()
+
+        print(f"Updated stats for team member {team_member_id}: {result}")
 
     except Exception as e:
         print(f"Error updating ticket stats: {e}")
@@ -309,17 +190,19 @@ async def update_ticket_stats(team_member_id: int, action_type: str = None, resp
         print(f"Response time: {response_time}")
 
 async def has_ticket(user_id):
-    cursor = await conn.execute("SELECT * FROM tickets WHERE user_id = ?", (user_id,))
-    row = await cursor.fetchone()
+    async with tickets_db.read() as db:
+        cursor = await db.execute("SELECT * FROM tickets WHERE user_id = ?", (user_id,))
+        row = await cursor.fetchone()
     return bool(row)
 
 async def create_or_queue_ticket(user_id, message):
-    cursor = await conn.execute("SELECT COUNT(*) FROM tickets")
-    ticket_count = await cursor.fetchone()
+    async with tickets_db.read() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM tickets")
+        ticket_count = await cursor.fetchone()
 
     if ticket_count[0] >= 5:
-        await conn.execute("INSERT INTO ticket_queue (user_id) VALUES (?)", (user_id,))
-        await conn.commit()
+        async with tickets_db.write() as db:
+            await db.execute("INSERT INTO ticket_queue (user_id) VALUES (?)", (user_id,))
         await message.channel.send(
             "Es sind momentan zu viele Tickets offen. Dein Ticket wurde in die Warteschlange gestellt und wird erstellt, sobald ein Platz frei wird.")
     else:
@@ -328,36 +211,32 @@ async def create_or_queue_ticket(user_id, message):
 
 
 async def get_open_ticket_count():
-    cursor = await conn.execute("SELECT COUNT(*) FROM tickets")
-    count = await cursor.fetchone()
+    async with tickets_db.read() as db:
+        cursor = await db.execute("SELECT COUNT(*) FROM tickets")
+        count = await cursor.fetchone()
     return count[0]
 
 
-async def close_database():
-    global conn
-    if conn:
-        await conn.close()
-        print("Database connection closed!")
-
-
 async def close_ticket(channel_id):
-    cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (channel_id,))
-    row = await cursor.fetchone()
+    async with tickets_db.read() as db:
+        cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (channel_id,))
+        row = await cursor.fetchone()
     if row is None:
         return
     user_id = row[0]
 
-    await conn.execute("DELETE FROM tickets WHERE channel_id = ?", (channel_id,))
-    await conn.commit()
+    async with tickets_db.write() as db:
+        await db.execute("DELETE FROM tickets WHERE channel_id = ?", (channel_id,))
 
-    cursor = await conn.execute("SELECT id, user_id FROM ticket_queue ORDER BY id ASC LIMIT 1")
-    row = await cursor.fetchone()
+    async with tickets_db.read() as db:
+        cursor = await db.execute("SELECT id, user_id FROM ticket_queue ORDER BY id ASC LIMIT 1")
+        row = await cursor.fetchone()
 
     if row:
         queued_ticket_id, queued_user_id = row
         await create_ticket(queued_user_id, None)
-        await conn.execute("DELETE FROM ticket_queue WHERE id = ?", (queued_ticket_id,))
-        await conn.commit()
+        async with tickets_db.write() as db:
+            await db.execute("DELETE FROM ticket_queue WHERE id = ?", (queued_ticket_id,))
 
     print(f"Ticket {channel_id} wurde geschlossen und ein Ticket aus der Warteschlange erstellt.")
 
@@ -375,11 +254,11 @@ async def create_ticket(user_id, message):
     channel = await category.create_text_channel(channel_name)
 
     
-    await conn.execute("""
-        INSERT INTO tickets (user_id, channel_id, category) 
-        VALUES (?, ?, ?)
-    """, (user_id, channel.id, ticket_category))
-    await conn.commit()
+    async with tickets_db.write() as db:
+        await db.execute("""
+            INSERT INTO tickets (user_id, channel_id, category) 
+            VALUES (?, ?, ?)
+        """, (user_id, channel.id, ticket_category))
 
     
     user_embed = discord.Embed(
@@ -450,8 +329,8 @@ async def ticket_stats(
         self,
         ctx: discord.ApplicationContext,
         user: discord.User = None):
-    async with aiosqlite.connect(self.db_path) as db:
-        if user:
+    if user:
+        async with tickets_db.read() as db:
             cursor = await db.execute("""
                 SELECT 
                     team_member_id,
@@ -467,28 +346,28 @@ async def ticket_stats(
             """, (user.id,))
             stats = await cursor.fetchone()
 
-            if not stats:
-                await ctx.respond(f"Keine Statistiken für {user.mention} verfügbar.")
-                return
+        if not stats:
+            await ctx.respond(f"Keine Statistiken für {user.mention} verfügbar.")
+            return
 
-            embed = discord.Embed(
-                title=f"📊 Ticket-Statistiken für {user.name}",
-                color=user.color or discord.Color.blue(),
-                timestamp=datetime.datetime.now())
-            embed.set_thumbnail(url=user.display_avatar.url)
+        embed = discord.Embed(
+            title=f"📊 Ticket-Statistiken für {user.name}",
+            color=user.color or discord.Color.blue(),
+            timestamp=datetime.datetime.now())
+        embed.set_thumbnail(url=user.display_avatar.url)
 
-            
-            avg_rating = stats[5]
-            total_ratings = stats[6]
-            stars = "⭐" * round(avg_rating)
+        
+        avg_rating = stats[5]
+        total_ratings = stats[6]
+        stars = "⭐" * round(avg_rating)
 
-            embed.description = (
-                f"📝 Bearbeitet: **{stats[1]}**\n"
-                f"✅ Geschlossen: **{stats[2]}**\n"
-                f"⏱️ Ø Reaktionszeit: **{stats[3]:.1f}** Min\n"
-                f"⭐ Bewertung: **{avg_rating:.1f}** ({total_ratings} {'Bewertung' if total_ratings == 1 else 'Bewertungen'})\n"
-                f"{stars}\n"
-                f"⏰ Gesamtzeit: **{stats[4]:.1f}** Min")
+        embed.description = (
+            f"📝 Bearbeitet: **{stats[1]}**\n"
+            f"✅ Geschlossen: **{stats[2]}**\n"
+            f"⏱️ Ø Reaktionszeit: **{stats[3]:.1f}** Min\n"
+            f"⭐ Bewertung: **{avg_rating:.1f}** ({total_ratings} {'Bewertung' if total_ratings == 1 else 'Bewertungen'})\n"
+            f"{stars}\n"
+            f"⏰ Gesamtzeit: **{stats[4]:.1f}** Min")
 
 
 @ticket_stats.error
@@ -507,8 +386,9 @@ async def dbinfo(ctx):
 
     """Show database structure"""
     try:
-        cursor = await conn.execute("PRAGMA table_info(ticket_stats)")
-        columns = await cursor.fetchall()
+        async with tickets_db.read() as db:
+            cursor = await db.execute("PRAGMA table_info(ticket_stats)")
+            columns = await cursor.fetchall()
         column_info = "\n".join([f"Column: {col[1]}, Type: {col[2]}" for col in columns])
         await ctx.send(f"Ticket Stats Table Structure:\n{column_info}")
     except Exception as e:
@@ -523,19 +403,21 @@ async def on_message(message: discord.Message):
     
     if isinstance(message.channel, discord.DMChannel):
         
-        cursor = await conn.execute("SELECT * FROM pending_tickets WHERE user_id = ?", (message.author.id,))
-        pending_ticket = await cursor.fetchone()
+        async with tickets_db.read() as db:
+            cursor = await db.execute("SELECT * FROM pending_tickets WHERE user_id = ?", (message.author.id,))
+            pending_ticket = await cursor.fetchone()
 
         if pending_ticket:
             
-            await conn.execute("DELETE FROM pending_tickets WHERE user_id = ?", (message.author.id,))
-            await conn.commit()
+            async with tickets_db.write() as db:
+                await db.execute("DELETE FROM pending_tickets WHERE user_id = ?", (message.author.id,))
 
             
             await create_or_queue_ticket(message.author.id, message)
             return
-        cursor = await conn.execute("SELECT channel_id FROM tickets WHERE user_id = ?", (message.author.id,))
-        ticket = await cursor.fetchone()
+        async with tickets_db.read() as db:
+            cursor = await db.execute("SELECT channel_id FROM tickets WHERE user_id = ?", (message.author.id,))
+            ticket = await cursor.fetchone()
 
         if not ticket:
             if message.content.lower() != "ticket":
@@ -562,8 +444,9 @@ async def on_message(message: discord.Message):
 
     
     elif message.channel.category_id == category_id and not isinstance(message.channel, discord.DMChannel):
-        cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (message.channel.id,))
-        row = await cursor.fetchone()
+        async with tickets_db.read() as db:
+            cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (message.channel.id,))
+            row = await cursor.fetchone()
 
         if row:
             user_id = row[0]
@@ -589,8 +472,9 @@ async def on_message(message: discord.Message):
     elif isinstance(message.channel, discord.DMChannel):
         
         if message.content.lower() == "ticket":
-            cursor = await conn.execute("SELECT channel_id FROM tickets WHERE user_id = ?", (message.author.id,))
-            ticket = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT channel_id FROM tickets WHERE user_id = ?", (message.author.id,))
+                ticket = await cursor.fetchone()
 
             if not ticket:
                 
@@ -619,9 +503,9 @@ async def on_message(message: discord.Message):
                 await channel.send(embed=team_embed, view=TutorialView())
 
                 
-                await conn.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
-                                   (message.author.id, channel.id))
-                await conn.commit()
+                async with tickets_db.write() as db:
+                    await db.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
+                                     (message.author.id, channel.id))
                 return
             else:
                 await message.channel.send("Du hast bereits ein offenes Ticket!")
@@ -665,8 +549,9 @@ class Ticketweiterleitung(discord.ui.View):
     )
     async def select_callback(self, select, interaction):
         if select.values[0] == "admin":
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            user_id_tuple = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+                user_id_tuple = await cursor.fetchone()
             user_id = user_id_tuple[0]
             user = bot.get_user(user_id)
             admin = '<@&1234626364737585244>'  
@@ -683,8 +568,9 @@ class Ticketweiterleitung(discord.ui.View):
 
 
         if select.values[0] == "moderator":
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            user_id_tuple = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+                user_id_tuple = await cursor.fetchone()
             user_id = user_id_tuple[0]
             user = bot.get_user(user_id)
             moderator = '<@&1234626368160006265>'
@@ -699,8 +585,9 @@ class Ticketweiterleitung(discord.ui.View):
             await interaction.response.send_message("Das Ticket wurde an einen Moderator weitergeleitet!")
 
         if select.values[0] == "developer":
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            user_id_tuple = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+                user_id_tuple = await cursor.fetchone()
             user_id = user_id_tuple[0]
             user = bot.get_user(user_id)
             developer = '<@&1234626366079635557>'
@@ -715,8 +602,9 @@ class Ticketweiterleitung(discord.ui.View):
             await interaction.response.send_message("Das Ticket wurde an einen Developer weitergeleitet!")
 
         if select.values[0] == "management":
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            user_id_tuple = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+                user_id_tuple = await cursor.fetchone()
             user_id = user_id_tuple[0]
             user = bot.get_user(user_id)
             management = '<@&1234626372249587794>'
@@ -800,8 +688,9 @@ class Ticketmenu(discord.ui.View):
         custom_id="select",)
     async def select_callback(self, select, interaction):
         if select.values[0] == "block":
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            user_id_tuple = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+                user_id_tuple = await cursor.fetchone()
             user_id = user_id_tuple[0]
             user = bot.get_user(user_id)
             if user is None:
@@ -812,8 +701,8 @@ class Ticketmenu(discord.ui.View):
                 description=f"Du wurdest vom Support ausgeschlossen!",)
             await user.send(embed=embed)
             await interaction.response.send_message("Der User wurde blockiert!")
-            await conn.execute("DELETE FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            await conn.commit()
+            async with tickets_db.write() as db:
+                await db.execute("DELETE FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
             await asyncio.sleep(5)
             await interaction.message.channel.delete()
 
@@ -823,10 +712,11 @@ class Ticketmenu(discord.ui.View):
                 await interaction.response.send_message("Nur Admins können Tickets direkt schließen!", ephemeral=True)
                 return
 
-            cursor = await conn.execute("SELECT user_id, claimed_by, claimed_at FROM tickets WHERE channel_id = ?",
-                                        (interaction.channel.id,))
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id, claimed_by, claimed_at FROM tickets WHERE channel_id = ?",
+                                          (interaction.channel.id,))
 
-            ticket_data = await cursor.fetchone()
+                ticket_data = await cursor.fetchone()
 
             if ticket_data is None:
                 await interaction.response.send_message("Kein passendes Ticket gefunden.")
@@ -875,8 +765,8 @@ class Ticketmenu(discord.ui.View):
                 log_embed.set_footer(text=f"Ticket-Log • {guild.name}")
                 await log_channel.send(embed=log_embed, file=transcript_file)
 
-            await conn.execute("DELETE FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
-            await conn.commit()
+            async with tickets_db.write() as db:
+                await db.execute("DELETE FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
 
             user = bot.get_user(user_id)
             if user is None:
@@ -906,27 +796,29 @@ class Ticketmenu(discord.ui.View):
             await interaction.message.channel.delete()
 
             
-            cursor = await conn.execute("SELECT user_id FROM ticket_queue ORDER BY created_at LIMIT 1")
-            queued_ticket = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM ticket_queue ORDER BY created_at LIMIT 1")
+                queued_ticket = await cursor.fetchone()
 
             if queued_ticket:
                 queued_user_id = queued_ticket[0]
-                await conn.execute("DELETE FROM ticket_queue WHERE user_id = ?", (queued_user_id,))
-                await conn.commit()
+                async with tickets_db.write() as db:
+                    await db.execute("DELETE FROM ticket_queue WHERE user_id = ?", (queued_user_id,))
 
                 channel = await category.create_text_channel(f"ticket-{user.name}")
-                await conn.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
-                                   (queued_user_id, channel.id))
-                await conn.commit()
+                async with tickets_db.write() as db:
+                    await db.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
+                                     (queued_user_id, channel.id))
 
                 teamping = '<@&1234626371050012684>'
                 await channel.send(teamping)
                 await channel.send(f"Neues Ticket für User {user.mention} aus der Warteschlange.")
 
         elif select.values[0] == "claim":
-            cursor = await conn.execute("SELECT user_id, claimed_by FROM tickets WHERE channel_id = ?",
-                                        (interaction.channel.id,))
-            ticket_data = await cursor.fetchone()
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id, claimed_by FROM tickets WHERE channel_id = ?",
+                                          (interaction.channel.id,))
+                ticket_data = await cursor.fetchone()
 
             if not ticket_data:
                 await interaction.response.send_message("Ticket nicht gefunden!", ephemeral=True)
@@ -939,11 +831,11 @@ class Ticketmenu(discord.ui.View):
                 return
 
             
-            await conn.execute(
-                "UPDATE tickets SET claimed_by = ?, claimed_at = ? WHERE channel_id = ?",
-                (interaction.user.id, datetime.datetime.now(), interaction.channel.id)
-            )
-            await conn.commit()
+            async with tickets_db.write() as db:
+                await db.execute(
+                    "UPDATE tickets SET claimed_by = ?, claimed_at = ? WHERE channel_id = ?",
+                    (interaction.user.id, datetime.datetime.now(), interaction.channel.id)
+                )
 
             
             await update_ticket_stats(interaction.user.id, "handle")
@@ -960,9 +852,10 @@ class Ticketmenu(discord.ui.View):
 
         elif select.values[0] == "close_request":
 
-            cursor = await conn.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
+            async with tickets_db.read() as db:
+                cursor = await db.execute("SELECT user_id FROM tickets WHERE channel_id = ?", (interaction.channel.id,))
 
-            user_id_tuple = await cursor.fetchone()
+                user_id_tuple = await cursor.fetchone()
 
             if not user_id_tuple:
                 await interaction.response.send_message("Ticket nicht gefunden!", ephemeral=True)
@@ -998,11 +891,12 @@ class Ticketmenu(discord.ui.View):
 
                         if channel:
                             
-                            cursor = await conn.execute(
-                                "SELECT claimed_by, claimed_at FROM tickets WHERE channel_id = ?",
-                                (self.channel_id,))
+                            async with tickets_db.read() as db:
+                                cursor = await db.execute(
+                                    "SELECT claimed_by, claimed_at FROM tickets WHERE channel_id = ?",
+                                    (self.channel_id,))
 
-                            ticket_data = await cursor.fetchone()
+                                ticket_data = await cursor.fetchone()
 
                             if ticket_data:
                                 claimed_by, claimed_at = ticket_data
@@ -1015,8 +909,8 @@ class Ticketmenu(discord.ui.View):
                                             claimed_at)).total_seconds() / 60
                                         await update_ticket_stats(claimed_by, None, response_time)
 
-                            await conn.execute("DELETE FROM tickets WHERE channel_id = ?", (self.channel_id,))
-                            await conn.commit()
+                            async with tickets_db.write() as db:
+                                await db.execute("DELETE FROM tickets WHERE channel_id = ?", (self.channel_id,))
 
                             close_embed = discord.Embed(
                                 title="Ticket wird geschlossen",
@@ -1073,21 +967,22 @@ class Ticketmenu(discord.ui.View):
 
                 async def handle_queued_tickets(self, guild):
                     try:
-                        cursor = await conn.execute("SELECT user_id FROM ticket_queue ORDER BY created_at LIMIT 1")
-                        queued_ticket = await cursor.fetchone()
+                        async with tickets_db.read() as db:
+                            cursor = await db.execute("SELECT user_id FROM ticket_queue ORDER BY created_at LIMIT 1")
+                            queued_ticket = await cursor.fetchone()
 
                         if queued_ticket:
                             queued_user_id = queued_ticket[0]
-                            await conn.execute("DELETE FROM ticket_queue WHERE user_id = ?", (queued_user_id,))
-                            await conn.commit()
+                            async with tickets_db.write() as db:
+                                await db.execute("DELETE FROM ticket_queue WHERE user_id = ?", (queued_user_id,))
 
                             category = guild.get_channel(category_id)
                             queued_user = await bot.fetch_user(queued_user_id)
                             new_channel = await category.create_text_channel(f"ticket-{queued_user.name}")
 
-                            await conn.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
-                                               (queued_user_id, new_channel.id))
-                            await conn.commit()
+                            async with tickets_db.write() as db:
+                                await db.execute("INSERT INTO tickets (user_id, channel_id) VALUES (?, ?)",
+                                                 (queued_user_id, new_channel.id))
 
                             teamping = '<@&1234626371050012684>'
                             await new_channel.send(teamping)
@@ -1161,10 +1056,8 @@ class DMMenu(discord.ui.View):
                 return
 
             
-            await conn.execute("""CREATE TABLE IF NOT EXISTS pending_tickets 
-                                    (user_id INTEGER PRIMARY KEY, timestamp DATETIME DEFAULT CURRENT_TIMESTAMP)""")
-            await conn.execute("INSERT OR REPLACE INTO pending_tickets (user_id) VALUES (?)", (interaction.user.id,))
-            await conn.commit()
+            async with tickets_db.write() as db:
+                await db.execute("INSERT OR REPLACE INTO pending_tickets (user_id) VALUES (?)", (interaction.user.id,))
 
             embed = discord.Embed(
                 title="📝 Ticket erstellen",
@@ -1317,7 +1210,7 @@ class FeedbackModal(discord.ui.Modal):
             await interaction.message.edit(view=self.original_view)
 
     async def save_feedback(self, user_id: int, rating: int, feedback_text: str = None):
-        async with aiosqlite.connect("tickets.db") as db:
+        async with tickets_db.write() as db:
             await db.execute("""
                 INSERT INTO ticket_feedback 
                 (ticket_id, user_id, team_member_id, rating, feedback_text, created_at)
@@ -1330,7 +1223,6 @@ class FeedbackModal(discord.ui.Modal):
                 feedback_text,
                 datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             ))
-            await db.commit()
 
 
 class FeedbackView(discord.ui.View):
@@ -1364,7 +1256,7 @@ class FeedbackView(discord.ui.View):
         await interaction.response.send_modal(modal)
 
     async def update_team_member_stats(self, rating: int):
-        async with aiosqlite.connect("tickets.db") as db:
+        async with tickets_db.write() as db:
             
             cursor = await db.execute("""
                 SELECT avg_rating, total_ratings 
@@ -1390,7 +1282,6 @@ class FeedbackView(discord.ui.View):
                 SET avg_rating = ?, total_ratings = ?
                 WHERE team_member_id = ?
             """, (round(new_avg, 2), new_total, self.team_member_id))
-            await db.commit()
 
 
 @bot.event
@@ -0,0 +1,105 @@
+"""
+Regression tests for the literal that grep's full-text prefilter searches for.
+
+A literal that a match does not have to contain makes the prefilter drop real
+matches, so every literal is checked against strings the pattern matches.
+"""
+import asyncio
+import os
+import re
+import shutil
+import sys
+import tempfile
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from System.terminal.filesystem import VirtualFilesystem
+from System.terminal import migrations
+from System.terminal.database import close_databases
+
+CASES = [
+    (r'\bword\b', 'word here', 'word'),
+    (r'\dabc', '7abc', 'abc'),
+    (r'a(bc)?d', 'ad', 'a'),
+    (r'(foo)*bar', 'bar', 'bar'),
+    (r'ab{0,2}cde', 'acde', 'cde'),
+    (r'ab?cde', 'acde', 'cde'),
+    (r'a*bcd', 'bcd', 'bcd'),
+    (r'foo\.bar', 'foo.bar', 'foo.bar'),
+    (r'[]x]yz', ']yz', 'yz'),
+    (r'\x41bcd', 'Abcd', ''),
+    (r'foo|bar', 'bar', ''),
+    (r'(?x) a b c', 'abc', ''),
+]
+
+
+class RequiredLiteralTest(unittest.TestCase):
+    def test_literals(self):
+        for pattern, text, expected in CASES:
+            with self.subTest(pattern=pattern):
+                literal = VirtualFilesystem._required_literal(pattern)
+                self.assertEqual(literal, expected)
+                match = re.search(pattern, text)
+                self.assertIsNotNone(match)
+                self.assertIn(literal, match.group(0))
+
+
+class GrepContentTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.mkdtemp()
+        os.mkdir(os.path.join(self.tmp, 'Data'))
+        for name in ('terminal_config.json', 'database_config.json'):
+            source = os.path.join(ROOT, 'Data', name)
+            if os.path.exists(source):
+                shutil.copy(source, os.path.join(self.tmp, 'Data', name))
+        os.chdir(self.tmp)
+        migrations._migrated.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        shutil.rmtree(self.tmp)
+
+    def grep(self, content: str, *searches):
+        """Create ~/notes.txt with content and run grep_content(pattern, **options) for each search"""
+        async def run():
+            fs = VirtualFilesystem(None)
+            try:
+                await fs.setup_database()
+                await fs.initialize_user_filesystem(42, 'bob')
+                await fs.create_file(42, '/home/bob/notes.txt', content)
+                return [await fs.grep_content(42, pattern, '/home/bob', **options) for pattern, options in searches]
+            finally:
+                await close_databases()
+
+        return asyncio.run(run())
+
+    def test_word_boundary_pattern_finds_line(self):
+        [(results, truncated)] = self.grep('word here\nnothing\n', (r'\bword\b', {'regex': True}))
+        self.assertFalse(truncated)
+        self.assertEqual([path for path, *_ in results], ['/home/bob/notes.txt'])
+
+    def test_line_spanning_chunk_boundary(self):
+        long_line = 'a' * 16380 + 'NEEDLE' + 'b' * 100
+        found = self.grep(long_line + '\nNEEDLE again\n',
+                          ('NEEDLE', {}), ('NEEDLE', {'mode': 'count'}), (r'a{5}NEEDLE', {'regex': True}),
+                          ('DL', {}), ('NEEDLE', {'invert': True, 'mode': 'count'}))
+
+        (results, _), (counts, _), (regex, _), (short, _), (inverted, _) = found
+        self.assertEqual([(i, len(line)) for i, line in results[0][1]], [(1, 203), (2, 12)])
+        self.assertEqual(counts[0][2], 2)
+        self.assertEqual(regex[0][2], 1)
+        self.assertEqual(short[0][2], 2)
+        self.assertEqual(inverted, [])
+
+
+    def test_ignore_case_short_non_ascii_literal(self):
+        found = self.grep('GRÖSSE ÄÖ\nnone\n', ('äö', {'ignore_case': True}), ('äö', {}), ('ÄÖ', {}))
+        self.assertEqual([count for (results, _) in found for _, _, count in results], [1, 1])
+        self.assertEqual(found[1][0], [])
+
+
+if __name__ == '__main__':
+    unittest.main()